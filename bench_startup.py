@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+CLI startup benchmark
+
+Times the lightweight command paths of build.py and split.py and checks
+that they do not import heavy modules (fontTools, PyYAML where not needed).
+Exits with status 1 if a check fails, so it can guard CI.
+
+Usage:
+    uv run python bench_startup.py
+    uv run python bench_startup.py --runs 20 --budget-ms 300
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Set, Tuple
+
+ROOT = Path(__file__).parent
+
+# (label, script arguments, modules that must not be imported)
+COMMANDS: List[Tuple[str, List[str], Set[str]]] = [
+    ("build.py --help", ["build.py", "--help"], {"fontTools", "yaml"}),
+    ("build.py --dry-run", ["build.py", "--dry-run"], {"fontTools"}),
+    ("split.py --help", ["split.py", "--help"], {"fontTools", "yaml"}),
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def imported_modules(args: List[str]) -> Tuple[Set[str], List[Tuple[int, str]]]:
+    """Run a command with -X importtime.
+
+    Returns:
+        Tuple of (top-level package names, [(cumulative us, module)] of
+        top-level imports)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    packages = set()
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(1)), match.group(2), match.group(3)
+        packages.add(module.split(".")[0])
+        if len(indent) == 1:
+            top_level.append((cumulative, module))
+    top_level.sort(reverse=True)
+    return packages, top_level
+
+
+def time_command(args: List[str], runs: int) -> float:
+    """Median wall time of a command in milliseconds."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark CLI startup and check for heavy imports",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="Runs per command (default: 10)",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Fail if a command's median time exceeds this (default: no limit)",
+    )
+    args = parser.parse_args()
+
+    baseline = time_command(["-c", "pass"], args.runs)
+    print(f"Python interpreter startup: {baseline:.0f} ms\n")
+    print(f"{'command':<22} {'median':>8} {'over baseline':>14}  heaviest imports")
+
+    failures = []
+    for label, command, forbidden in COMMANDS:
+        median = time_command(command, args.runs)
+        packages, top_level = imported_modules(command)
+        heaviest = ", ".join(f"{module} {us / 1000:.0f}ms" for us, module in top_level[:3])
+        print(f"{label:<22} {median:>6.0f}ms {median - baseline:>12.0f}ms  {heaviest}")
+
+        leaked = sorted(forbidden & packages)
+        if leaked:
+            failures.append(f"{label} imports {', '.join(leaked)}")
+        if args.budget_ms is not None and median > args.budget_ms:
+            failures.append(f"{label} took {median:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("\nOK: no heavy imports on lightweight paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,141 +12,290 @@ Usage:
     uv run python build.py
     uv run python build.py --config config.yaml
     uv run python build.py --styles Regular,Medium
+    uv run python build.py --watch
+    uv run python build.py --restamp
+    uv run python build.py --ttc
+    uv run python build.py --glyph-overflow companion
+    uv run python build.py --nerd-icon-sets powerline,codicons,devicons
+    uv run python build.py --cjk-layout companion
+    uv run python build.py --from-phase icons
+    uv run python build.py --queue-dir /shared/queue --local-workers 4
+    uv run python build.py --worker --queue-dir /shared/queue
 """
 
 import argparse
-import json
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
 from pathlib import Path
-from typing import Any, Dict
-
-import yaml
+from typing import TYPE_CHECKING, Dict, List, Set
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.config import FontConfig
-from src.merge import merge_fonts, center_cjk_glyphs, scale_nerd_icons
-from src.utils import update_font_names, verify_glyph_width
-
-
-def load_config(config_path: Path) -> Dict[str, Any]:
-    """Load configuration from YAML file.
+# Only lightweight modules are imported here. fontTools-backed modules
+# (pipeline, snapshot, restamp) are imported inside the functions that
+# need them, so --help, --dry-run and manifest-only runs start fast.
+from src.builder import (
+    build_cjk_font,
+    build_job,
+    build_styles,
+    build_tasks,
+    finish_build,
+    plan_glyph_budgets,
+    prepare_snapshots,
+    write_collection_file,
+)
+from src.config import (
+    BUDGET_PRIORITIES,
+    CJK_LAYOUTS,
+    CJK_SUFFIX,
+    GLYPH_ORDERS,
+    HINTING_MODES,
+    ICON_SET_NAMES,
+    OVERFLOW_MODES,
+    PHASES,
+)
+from src.plan import BuildPlan, load_config, resolve_build_plan, write_manifest
+from src.watch import (
+    REBUILD_FULL,
+    REBUILD_NAMES,
+    changed_config_keys,
+    plan_rebuild,
+    poll_changes,
+    source_files,
+)
+
+if TYPE_CHECKING:
+    from src.jobqueue import JobQueue
+
+
+def queue_styles(plan: BuildPlan, styles: List[str], queue: "JobQueue", local_workers: int = 0) -> None:
+    """Build styles through a file-based job queue and wait for the results.
+
+    Jobs carry absolute paths, so workers on other hosts need the source
+    fonts, snapshots and output directory on the same shared filesystem.
 
     Args:
-        config_path: Path to config.yaml
+        plan: BuildPlan object
+        styles: Styles to build
+        queue: JobQueue in a shared directory
+        local_workers: Worker processes to start on this machine
 
-    Returns:
-        Configuration dictionary
+    Raises:
+        RuntimeError: If a job failed on every attempt
     """
-    if not config_path.exists():
-        return {}
+    import subprocess
+    import uuid
+
+    from src.jobqueue import config_to_dict, wait_for_jobs
+
+    run_id = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    job_ids = []
+    for build, style_plan in build_tasks(plan, styles):
+        cjk = build is build_cjk_font
+        job_id = f"{run_id}-{CJK_SUFFIX}-{style_plan.style}" if cjk else f"{run_id}-{style_plan.style}"
+        queue.submit(job_id, {
+            "cjk": cjk,
+            "style": style_plan.style,
+            "en_font_path": str(style_plan.en_font_path.resolve()),
+            "cn_input": str(Path(style_plan.cn_input).resolve()),
+            "display_name": style_plan.display_name,
+            "output_dir": str(plan.output_dir.resolve()),
+            "config": config_to_dict(plan.config),
+            "metadata": plan.metadata,
+        })
+        job_ids.append(job_id)
+    print(f"Queued {len(job_ids)} jobs in {queue.queue_dir} (run {run_id})")
+
+    workers = [
+        subprocess.Popen([
+            sys.executable, str(Path(__file__).resolve()),
+            "--worker", "--queue-dir", str(queue.queue_dir),
+            "--lease", str(queue.lease_seconds),
+            "--worker-idle-exit", "5",
+        ])
+        for _ in range(local_workers)
+    ]
+
+    def on_finish(job_id: str, state: str, job: dict) -> None:
+        if state == "done":
+            result = job["result"]
+            print(f"  Done: {job_id} by {result['worker']} ({result['seconds']:.1f}s)")
+        else:
+            print(f"  Failed: {job_id} after {job['attempts']} attempts")
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    try:
+        results = wait_for_jobs(queue, job_ids, on_finish=on_finish)
+    finally:
+        for worker in workers:
+            worker.wait()
 
+    failed = [job_id for job_id, job in results.items() if job["state"] == "failed"]
+    if failed:
+        for job_id in failed:
+            print(f"Error in {job_id}:\n{results[job_id]['errors'][-1]}")
+        raise RuntimeError(f"{len(failed)} job(s) failed: {', '.join(failed)}")
 
-def get_config_value(yaml_config: Dict[str, Any], *keys: str, default: Any = None) -> Any:
-    """Get nested value from config dictionary.
 
-    Args:
-        yaml_config: Configuration dictionary
-        keys: Nested keys to access
-        default: Default value if key not found
+def run_watch(args: argparse.Namespace, plan: BuildPlan, interval: float) -> None:
+    """Keep rebuilding affected styles when config.yaml or source fonts change.
 
-    Returns:
-        Configuration value or default
-    """
-    value = yaml_config
-    for key in keys:
-        if isinstance(value, dict):
-            value = value.get(key)
-        else:
-            return default
-        if value is None:
-            return default
-    return value
-
-
-def build_single_font(
-    style: str,
-    en_font_path: Path,
-    cn_font_path: Path,
-    display_name: str,
-    output_dir: Path,
-    config: FontConfig,
-    metadata: dict,
-) -> str:
-    """Build a single font variant.
+    CN font snapshots stay memory-mapped between rebuilds, so only the
+    affected styles pay for merging.
 
     Args:
-        style: Font style (Regular, Medium, Italic, MediumItalic)
-        en_font_path: Path to English font (e.g., JetBrains Mono NerdFont)
-        cn_font_path: Path to Chinese font (e.g., LXGW WenKai Mono)
-        display_name: Display name for the style in font metadata
-        output_dir: Output directory
-        config: FontConfig object
-        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
-
-    Returns:
-        Output file path
+        args: Parsed CLI arguments (CLI overrides stay in effect)
+        plan: Plan of the initial build
+        interval: Polling interval in seconds
     """
-    print(f"\nBuilding {config.family_name_compact}-{style}...")
-
-    # Merge fonts
-    merged_font = merge_fonts(
-        base_font_path=str(en_font_path),
-        cn_font_path=str(cn_font_path),
-        config=config,
-    )
-
-    # Monospace-specific processing
-    # Scale NerdFont icons to CJK width
-    print("  Scaling NerdFont icons...")
-    scale_nerd_icons(merged_font, config)
-
-    # Center CJK glyphs
-    print("  Centering CJK glyphs...")
-    center_cjk_glyphs(merged_font, config)
-
-    # Update font names
-    postscript_name = f"{config.family_name_compact}-{style}"
-
-    print("  Updating font metadata...")
-    update_font_names(
-        font=merged_font,
-        family_name=config.family_name,
-        style_name=display_name,
-        full_name=f"{config.family_name} {display_name}",
-        postscript_name=postscript_name,
-        version_str=f"Version {config.version}",
-        author=metadata.get("author", ""),
-        copyright_str=metadata.get("copyright", ""),
-        description=metadata.get("description", ""),
-        url=metadata.get("url", ""),
-        license_desc=metadata.get("license", ""),
-        license_url=metadata.get("license_url", ""),
-    )
-
-    # Verify glyph widths
-    print("  Verifying glyph widths...")
-    try:
-        verify_glyph_width(
-            font=merged_font,
-            expected_widths=[0, config.en_width, config.cn_width],
-            file_name=postscript_name,
-        )
-    except ValueError as e:
-        print(f"  Warning: {e}")
-
-    # Save font
-    output_path = output_dir / f"{postscript_name}.ttf"
-    merged_font.save(str(output_path))
-    merged_font.close()
-
-    print(f"  Saved: {output_path}")
-    return str(output_path)
+    from src.restamp import restamp_styles
+    from src.snapshot import load_snapshot
+
+    # Warm sources: one open snapshot per CN font, shared across rebuilds
+    warm_snapshots: Dict[Path, tuple] = {}
+    state = {"yaml_config": load_config(args.config), "plan": plan}
+
+    def warm_up(new_plan: BuildPlan) -> None:
+        prepare_snapshots(new_plan)
+        for style_plan in new_plan.styles + new_plan.cjk_fonts:
+            snapshot_path = style_plan.cn_source
+            mtime = snapshot_path.stat().st_mtime_ns
+            cached = warm_snapshots.get(snapshot_path)
+            if cached is None or cached[0] != mtime:
+                # Snapshot was (re)written because its source changed
+                if cached is not None:
+                    cached[1].close()
+                snapshot = load_snapshot(snapshot_path, config=new_plan.config)
+                warm_snapshots[snapshot_path] = (mtime, snapshot)
+            style_plan.cn_source = warm_snapshots[snapshot_path][1]
+
+    def watched_paths() -> Set[Path]:
+        return {args.config} | source_files(state["plan"])
+
+    def on_change(changed: Set[Path]) -> None:
+        print(f"\nDetected changes: {', '.join(sorted(p.name for p in changed))}")
+        try:
+            new_config = load_config(args.config)
+            new_plan = resolve_plan(args, new_config)
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+
+        changed_keys = changed_config_keys(state["yaml_config"], new_config)
+        rebuild = plan_rebuild(changed_keys, changed, state["plan"], new_plan)
+        state["yaml_config"] = new_config
+        state["plan"] = new_plan
+        if not rebuild:
+            write_collection_file(new_plan)
+            write_manifest(new_plan)
+            print("Nothing to rebuild")
+            return
+
+        full = [style for style, level in rebuild.items() if level == REBUILD_FULL]
+        names = [style for style, level in rebuild.items() if level == REBUILD_NAMES]
+        print(f"Rebuilding: {', '.join(full) or '-'}; names only: {', '.join(names) or '-'}")
+        new_plan.output_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            if full:
+                warm_up(new_plan)
+                # Warm snapshots live in this process, so build in-process
+                new_plan.parallel = 1
+                build_styles(new_plan, full)
+            if names:
+                restamp_styles(new_plan, names)
+            manifest_path = finish_build(new_plan, full + names)
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+        print(f"Generated manifest: {manifest_path}")
+
+    # Initial build of styles that have no output yet
+    missing = plan_rebuild([], [], None, plan)
+    if missing:
+        warm_up(plan)
+        plan.parallel = 1
+        build_styles(plan, list(missing))
+        finish_build(plan, list(missing))
+
+    print(f"\nWatching {args.config} and source fonts (Ctrl+C to stop)...")
+    poll_changes(watched_paths, on_change, interval=interval)
+    for _, snapshot in warm_snapshots.values():
+        snapshot.close()
+
+
+def print_plan_details(plan: BuildPlan) -> None:
+    """Print what a build would do, without loading any font."""
+    config = plan.config
+    print(f"Parallel workers: {plan.parallel}")
+    print(f"Snapshots: {plan.snapshot_dir or 'disabled'}")
+    if plan.parallel <= 1:
+        print(f"Pipelined I/O: {f'up to {plan.max_inflight} fonts in flight' if plan.pipeline else 'disabled'}")
+    print(f"Save workers: {config.save_workers}")
+    print(f"Visual scale: {config.visual_scale}")
+    print(f"Strip hinting: {config.strip_hinting}")
+    print(f"Glyph order: {config.glyph_order}")
+    print(f"NerdFont icon sets: {', '.join(config.nerd_icon_sets) or 'all'}")
+    print(f"CJK layout: {config.cjk_layout}")
+    if config.checkpoint_dir:
+        print(f"Checkpoints: {config.checkpoint_dir} (after {', '.join(config.checkpoint_after) or '-'})")
+        print(f"Resume from phase: {config.from_phase or '-'}")
+    else:
+        print("Checkpoints: disabled")
+    print(f"Glyph cache: {config.glyph_cache_dir or 'disabled'}")
+    budget_file = f", {config.budget_file}" if config.budget_priority != "ranges" else ""
+    print(
+        f"Glyph budget: {config.glyph_budget} "
+        f"(overflow: {config.glyph_overflow}, priority: {config.budget_priority}{budget_file})"
+    )
+    print(f"Preview fonts: {plan.output_dir / 'preview' if plan.previews else 'disabled'}")
+    print(f"TrueType Collection: {plan.collection_path if plan.ttc else 'disabled'}")
+    print("Outputs:")
+    for style_plan in plan.styles:
+        output_path = plan.output_path(style_plan.style)
+        state = "exists" if output_path.exists() else "missing"
+        print(f"  {output_path} ({state})")
+    for cjk_plan in plan.cjk_fonts:
+        cjk_path = plan.cjk_path(cjk_plan.style)
+        state = "exists" if cjk_path.exists() else "missing"
+        print(f"  {cjk_path} ({state}, CJK glyphs of {cjk_plan.cn_font_path.name})")
+    print("\nDry run: nothing was built")
+
+
+def resolve_plan(args: argparse.Namespace, yaml_config: dict) -> BuildPlan:
+    """Resolve the build plan from parsed CLI arguments and config."""
+    plan = resolve_build_plan(
+        yaml_config,
+        styles=args.styles,
+        fonts_dir=args.fonts_dir,
+        output_dir=args.output_dir,
+        parallel=args.parallel,
+        snapshot_dir=args.snapshot_dir,
+        snapshots=False if args.no_snapshots else None,
+        strip_hinting=args.strip_hinting,
+        glyph_order=args.glyph_order,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_after=args.checkpoint_after,
+        from_phase=args.from_phase,
+        glyph_cache_dir=args.glyph_cache_dir,
+        glyph_cache=False if args.no_glyph_cache else None,
+        glyph_budget=args.glyph_budget,
+        glyph_overflow=args.glyph_overflow,
+        budget_priority=args.budget_priority,
+        budget_file=args.budget_file,
+        nerd_icon_sets=args.nerd_icon_sets,
+        cjk_layout=args.cjk_layout,
+        pipeline=False if args.no_pipeline else None,
+        max_inflight=args.max_inflight,
+        save_workers=args.save_workers,
+        previews=False if args.no_previews else None,
+        ttc=True if args.ttc else None,
+    )
+    plan.config.hinting_report = args.hinting_report
+    plan.config.glyph_order_report = args.glyph_order_report
+    # Watch mode keeps parsed CN fonts warm through snapshots
+    if args.watch and plan.snapshot_dir is None:
+        plan.snapshot_dir = plan.output_dir.parent / "cache" / "snapshots"
+    return plan
 
 
 def main():
@@ -161,6 +310,13 @@ Examples:
   uv run python build.py
   uv run python build.py --config config.yaml
   uv run python build.py --styles Regular,Medium
+  uv run python build.py --watch
+  uv run python build.py --restamp
+  uv run python build.py --from-phase icons
+  uv run python build.py --ttc
+  uv run python build.py --glyph-overflow companion
+  uv run python build.py --nerd-icon-sets powerline,codicons,devicons,font-awesome
+  uv run python build.py --cjk-layout companion
 
 Configuration priority: CLI args > config.yaml > defaults
         """,
@@ -195,177 +351,280 @@ Configuration priority: CLI args > config.yaml > defaults
         default=None,
         help="Number of parallel workers (default: from config or 1)",
     )
+    parser.add_argument(
+        "--no-pipeline",
+        action="store_true",
+        help="Sequential builds: read, merge and save each style strictly in turn",
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=None,
+        help="Sequential builds: merged fonts alive at once while saving overlaps (default: from config or 2)",
+    )
+    parser.add_argument(
+        "--save-workers",
+        type=int,
+        default=None,
+        help="Processes compiling glyf/loca on save; 1 for a serial save, 0 for the CPU count "
+             "in sequential builds (default: from config or 0)",
+    )
+    parser.add_argument(
+        "--no-previews",
+        action="store_true",
+        help="Skip the preview WOFF2 subsets for the verification pages",
+    )
+    parser.add_argument(
+        "--ttc",
+        action="store_true",
+        help="Also pack the built styles into one TrueType Collection with shared tables",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        type=Path,
+        default=None,
+        help="Directory for parsed CN font snapshots (default: from config, disabled if unset there)",
+    )
+    parser.add_argument(
+        "--no-snapshots",
+        action="store_true",
+        help="Parse CN fonts in every build instead of using snapshots (--watch always uses them)",
+    )
+    parser.add_argument(
+        "--strip-hinting",
+        choices=HINTING_MODES,
+        default=None,
+        help="Remove TrueType hinting from transformed glyphs or the whole font (default: from config or none)",
+    )
+    parser.add_argument(
+        "--hinting-report",
+        action="store_true",
+        help="Report font size and save time before/after stripping hinting",
+    )
+    parser.add_argument(
+        "--glyph-order",
+        choices=GLYPH_ORDERS,
+        default=None,
+        help="Order of imported CJK glyphs (default: from config or source)",
+    )
+    parser.add_argument(
+        "--glyph-order-report",
+        action="store_true",
+        help="Report compressed sizes with source order vs --glyph-order",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        default=None,
+        help="Directory for phase checkpoints (default: from config, disabled if unset)",
+    )
+    parser.add_argument(
+        "--checkpoint-after",
+        type=str,
+        default=None,
+        help=f"Comma-separated phases to save a checkpoint after, or 'all' "
+             f"(phases: {', '.join(PHASES)}; default: from config or merge)",
+    )
+    parser.add_argument(
+        "--from-phase",
+        choices=PHASES + ("latest",),
+        default=None,
+        help="Resume from the latest valid checkpoint before this phase "
+             "('latest': after the last checkpointed phase)",
+    )
+    parser.add_argument(
+        "--glyph-cache-dir",
+        default=None,
+        help="Directory for the glyph-level cache of transformed glyphs (default: from config, disabled if unset or empty)",
+    )
+    parser.add_argument(
+        "--no-glyph-cache",
+        action="store_true",
+        help="Transform every glyph instead of using the glyph cache",
+    )
+    parser.add_argument(
+        "--glyph-budget",
+        type=int,
+        default=None,
+        help="Maximum glyphs per font (default: from config or 65535)",
+    )
+    parser.add_argument(
+        "--glyph-overflow",
+        choices=OVERFLOW_MODES,
+        default=None,
+        help="CJK glyphs over the glyph budget: fail, drop them, or build a supplementary font "
+             "(default: from config or error)",
+    )
+    parser.add_argument(
+        "--budget-priority",
+        choices=BUDGET_PRIORITIES,
+        default=None,
+        help="How CJK glyphs are ranked for the glyph budget (default: from config or ranges)",
+    )
+    parser.add_argument(
+        "--budget-file",
+        type=Path,
+        default=None,
+        help="Character frequency list (frequency) or sample text (profile) for --budget-priority",
+    )
+    parser.add_argument(
+        "--nerd-icon-sets",
+        type=str,
+        default=None,
+        help=f"Comma-separated NerdFont icon sets to keep, or 'all' "
+             f"(sets: {', '.join(ICON_SET_NAMES)}; default: from config or all)",
+    )
+    parser.add_argument(
+        "--cjk-layout",
+        choices=CJK_LAYOUTS,
+        default=None,
+        help="merged: CJK glyphs in every style; companion: styles without CJK glyphs plus one "
+             "CJK-only font per CN font, with fontconfig/CSS fallback snippets (default: from config or merged)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild affected styles when config.yaml or source fonts change",
+    )
+    parser.add_argument(
+        "--restamp",
+        action="store_true",
+        help="Only rewrite name/head tables of already-built fonts (metadata/version changes)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Resolve styles and paths, print the build plan and exit",
+    )
+    parser.add_argument(
+        "--manifest-only",
+        action="store_true",
+        help="Only regenerate fonts-manifest.json from existing outputs",
+    )
+    parser.add_argument(
+        "--queue-dir",
+        type=Path,
+        default=None,
+        help="Shared directory of a file-based job queue; build styles through it",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run as a queue worker: claim and build jobs from --queue-dir",
+    )
+    parser.add_argument(
+        "--local-workers",
+        type=int,
+        default=0,
+        help="Queue workers to start on this machine when coordinating (default: 0)",
+    )
+    parser.add_argument(
+        "--worker-idle-exit",
+        type=float,
+        default=0,
+        help="Stop a worker after this many idle seconds (default: 0, run forever)",
+    )
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=120.0,
+        help="Seconds without heartbeat before a claimed job is requeued (default: 120)",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="Polling interval in seconds for --watch (default: 1.0)",
+    )
 
     args = parser.parse_args()
 
+    # Queue workers get everything they need from the job files
+    if args.worker:
+        from src.jobqueue import JobQueue, run_worker
+
+        if not args.queue_dir:
+            print("Error: --worker requires --queue-dir")
+            sys.exit(1)
+        run_worker(JobQueue(args.queue_dir, lease_seconds=args.lease), build_job, idle_exit=args.worker_idle_exit)
+        return
+
     # Load YAML config
     yaml_config = load_config(args.config)
 
-    # Get styles configuration from YAML
-    styles_config = get_config_value(yaml_config, "styles") or {}
-    if not styles_config:
-        print("Error: No styles defined in config.yaml")
+    try:
+        plan = resolve_plan(args, yaml_config)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
-    # Merge config: CLI args > YAML > defaults
-    styles_str = (
-        args.styles
-        or get_config_value(yaml_config, "build", "styles")
-        or ",".join(styles_config.keys())
-    )
-    fonts_dir = (
-        args.fonts_dir
-        or Path(get_config_value(yaml_config, "fonts_dir") or "fonts")
-    )
-    output_dir = (
-        args.output_dir
-        or Path(get_config_value(yaml_config, "build", "output_dir") or "output/fonts")
-    )
-    parallel = (
-        args.parallel
-        if args.parallel is not None
-        else get_config_value(yaml_config, "build", "parallel", default=1)
-    )
-
-    # Font metadata from config
-    family_name = get_config_value(yaml_config, "font", "family_name") or "JetBrainsLxgwNerdMono"
-    version = get_config_value(yaml_config, "font", "version") or "1.0"
-    en_width = get_config_value(yaml_config, "width", "en_width", default=600)
-    cn_width = get_config_value(yaml_config, "width", "cn_width", default=1200)
-    visual_scale = get_config_value(yaml_config, "width", "visual_scale", default=1.08)
-
-    # Font metadata for name table
-    metadata = {
-        "author": get_config_value(yaml_config, "font", "author") or "",
-        "copyright": get_config_value(yaml_config, "font", "copyright") or "",
-        "description": get_config_value(yaml_config, "font", "description") or "",
-        "url": get_config_value(yaml_config, "font", "url") or "",
-        "license": get_config_value(yaml_config, "font", "license") or "",
-        "license_url": get_config_value(yaml_config, "font", "license_url") or "",
-    }
-
-    # Initialize FontConfig
-    config = FontConfig(
-        family_name=family_name,
-        family_name_compact=family_name,
-        version=version,
-        visual_scale=visual_scale,
-        en_width=en_width,
-        cn_width=cn_width,
-    )
-
-    # Parse styles to build
-    styles = [s.strip() for s in styles_str.split(",")]
-    valid_styles = list(styles_config.keys())
-
-    for style in styles:
-        if style not in valid_styles:
-            print(f"Error: Invalid style '{style}'. Valid styles: {valid_styles}")
-            sys.exit(1)
+    config = plan.config
+    styles = [s.style for s in plan.styles]
 
-    # Build font paths and validate
-    font_paths: Dict[str, Dict[str, Any]] = {}
-    for style in styles:
-        style_cfg = styles_config[style]
-        en_font = style_cfg.get("en_font")
-        cn_font = style_cfg.get("cn_font")
-        display_name = style_cfg.get("display_name", style)
+    print(f"Building {config.family_name} v{config.version}")
+    print(f"Styles: {', '.join(styles)}")
+    print(f"Source: {plan.fonts_dir}")
+    print(f"Output: {plan.output_dir}")
+    print(f"Width ratio: {config.cn_width}:{config.en_width} (2:1)")
+    print("Font mapping:")
+    for style_plan in plan.styles:
+        print(f"  {style_plan.style}:")
+        print(f"    EN: {style_plan.en_font_path.name}")
+        print(f"    CN: {style_plan.cn_font_path.name}")
 
-        if not en_font or not cn_font:
-            print(f"Error: Style '{style}' must have both 'en_font' and 'cn_font' defined")
-            sys.exit(1)
+    if args.dry_run:
+        print_plan_details(plan)
+        return
 
-        en_font_path = fonts_dir / en_font
-        cn_font_path = fonts_dir / cn_font
+    # Create output directory
+    plan.output_dir.mkdir(parents=True, exist_ok=True)
 
-        if not en_font_path.exists():
-            print(f"Error: English font not found: {en_font_path}")
-            sys.exit(1)
-        if not cn_font_path.exists():
-            print(f"Error: Chinese font not found: {cn_font_path}")
-            sys.exit(1)
+    if args.manifest_only:
+        manifest_path = write_manifest(plan)
+        print(f"Generated manifest: {manifest_path}")
+        return
 
-        font_paths[style] = {
-            "en_font_path": en_font_path,
-            "cn_font_path": cn_font_path,
-            "display_name": display_name,
-        }
+    if args.watch:
+        run_watch(args, plan, args.watch_interval)
+        return
 
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if args.restamp:
+        from src.restamp import restamp_styles
 
-    print(f"Building {config.family_name} v{config.version}")
-    print(f"Styles: {', '.join(styles)}")
-    print(f"Source: {fonts_dir}")
-    print(f"Output: {output_dir}")
-    print(f"Width ratio: {config.cn_width}:{config.en_width} (2:1)")
-    print("Font mapping:")
-    for style in styles:
-        paths = font_paths[style]
-        print(f"  {style}:")
-        print(f"    EN: {paths['en_font_path'].name}")
-        print(f"    CN: {paths['cn_font_path'].name}")
+        print("\nRe-stamping font metadata...")
+        try:
+            restamp_styles(plan, styles)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        manifest_path = finish_build(plan, styles)
+        print(f"Generated manifest: {manifest_path}")
+        return
+
+    prepare_snapshots(plan)
+    try:
+        plan_glyph_budgets(plan, styles)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     # Build fonts
-    if parallel <= 1:
-        # Sequential build
-        for style in styles:
-            paths = font_paths[style]
-            build_single_font(
-                style,
-                paths["en_font_path"],
-                paths["cn_font_path"],
-                paths["display_name"],
-                output_dir,
-                config,
-                metadata,
-            )
+    if args.queue_dir:
+        from src.jobqueue import JobQueue
+
+        try:
+            queue_styles(plan, styles, JobQueue(args.queue_dir, lease_seconds=args.lease), args.local_workers)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
     else:
-        # Parallel build
-        with ProcessPoolExecutor(max_workers=parallel) as executor:
-            futures = {}
-            for style in styles:
-                paths = font_paths[style]
-                future = executor.submit(
-                    build_single_font,
-                    style,
-                    paths["en_font_path"],
-                    paths["cn_font_path"],
-                    paths["display_name"],
-                    output_dir,
-                    config,
-                    metadata,
-                )
-                futures[future] = style
-
-            for future in as_completed(futures):
-                style = futures[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"Error building {style}: {e}")
-                    raise
-
-    # Generate font manifest for HTML verification pages
-    manifest = {
-        "family_name": config.family_name,
-        "version": config.version,
-        "fonts": []
-    }
-    for style in styles:
-        display_name = font_paths[style]["display_name"]
-        manifest["fonts"].append({
-            "style": style,
-            "display_name": display_name,
-            "filename": f"{config.family_name_compact}-{style}.ttf"
-        })
+        build_styles(plan, styles)
 
-    manifest_path = output_dir / "fonts-manifest.json"
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    # Previews, collection and the font manifest for HTML verification pages
+    manifest_path = finish_build(plan, styles)
     print(f"Generated manifest: {manifest_path}")
 
-    print(f"\nBuild complete! Fonts saved to: {output_dir}")
+    print(f"\nBuild complete! Fonts saved to: {plan.output_dir}")
 
 
 if __name__ == "__main__":
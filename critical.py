@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Critical font subsets for a static site
+
+Scan a local directory of HTML/Markdown/text files in parallel, build a
+codepoint histogram per style (bold and italic text inferred from the
+markup), and write one small WOFF2 subset per style with the characters
+the site uses, plus CSS with unicode-range and preload hints. The split
+web fonts stay imported as the fallback for every other character:
+
+    output/critical/
+        JetBrainsLxgwNerdMono-*.woff2  critical subsets
+        critical.css                   @import of the split CSS + critical @font-face rules
+        preload.html                   <link rel="preload"> hints for the <head>
+        critical.json                  codepoints, characters and sizes per style
+
+Usage:
+    uv run python critical.py --site public/
+    uv run python critical.py --site docs/ --url-prefix /fonts/critical/ --fallback-css /fonts/split/all.css
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.critical import CORPUS_SUFFIXES, corpus_files, scan_corpus, style_histograms, write_critical_subsets
+from src.plan import load_config, load_manifest_fonts, resolve_build_plan
+
+
+def main():
+    default_config_path = Path(__file__).parent / "config.yaml"
+
+    parser = argparse.ArgumentParser(
+        description="Write critical WOFF2 subsets with the characters a site uses",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--site",
+        type=Path,
+        required=True,
+        help="Directory with the site's HTML, Markdown and text files",
+    )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=default_config_path,
+        help="Path to config.yaml (default: config.yaml)",
+    )
+    parser.add_argument(
+        "--fonts-dir",
+        type=Path,
+        default=None,
+        help="Directory with built fonts and fonts-manifest.json (default: from config or output/fonts/)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("output/critical"),
+        help="Output directory (default: output/critical/)",
+    )
+    parser.add_argument(
+        "--fallback-css",
+        type=str,
+        default="../split/all.css",
+        help="Split CSS imported before the critical rules, relative to critical.css "
+             "(default: ../split/all.css; empty for none)",
+    )
+    parser.add_argument(
+        "--url-prefix",
+        type=str,
+        default="",
+        help="URL prefix of the subsets in preload.html (default: none)",
+    )
+    parser.add_argument(
+        "--preload-share",
+        type=float,
+        default=0.05,
+        help="Preload styles that render at least this share of the characters (default: 0.05)",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parallel workers (default: CPU count)",
+    )
+
+    args = parser.parse_args()
+
+    yaml_config = load_config(args.config)
+    try:
+        plan = resolve_build_plan(yaml_config, output_dir=args.fonts_dir, check_files=False)
+        fonts = load_manifest_fonts(plan.output_dir)
+        with open(plan.output_dir / "fonts-manifest.json", "r", encoding="utf-8") as f:
+            family_name = json.load(f)["family_name"]
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not args.site.is_dir():
+        print(f"Error: site directory not found: {args.site}")
+        sys.exit(1)
+
+    files = corpus_files(args.site)
+    if not files:
+        print(f"Error: no {', '.join(sorted(CORPUS_SUFFIXES))} files in {args.site}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    histogram = scan_corpus(files, parallel=args.parallel)
+    kinds = Counter(CORPUS_SUFFIXES[path.suffix.lower()] for path in files)
+    print(
+        f"Scanned {len(files)} files ({', '.join(f'{count} {kind}' for kind, count in sorted(kinds.items()))}) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    for (weight, italic), counts in sorted(histogram.items()):
+        print(
+            f"  weight {weight}{' italic' if italic else ''}: "
+            f"{sum(counts.values())} characters, {len(counts)} distinct"
+        )
+
+    histograms = style_histograms(histogram, list(fonts))
+    print("\nWriting critical subsets...")
+    subsets = write_critical_subsets(
+        histograms,
+        fonts,
+        family_name,
+        args.output_dir,
+        fallback_css=args.fallback_css,
+        url_prefix=args.url_prefix,
+        preload_share=args.preload_share,
+    )
+    for subset in subsets:
+        print(
+            f"  {subset.style}: {args.output_dir / subset.filename} ({subset.codepoints} codepoints, "
+            f"{subset.size / 1024:.1f} KB, {subset.share:.0%} of characters"
+            f"{', preloaded' if subset.preload else ''})"
+        )
+    print(f"Wrote {args.output_dir / 'critical.css'} and {args.output_dir / 'preload.html'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Glyph-level build diff
+
+Compare two built fonts (or two output directories) glyph by glyph and
+report added, removed and changed codepoints grouped by class
+(CJK, NerdFont icon, Powerline, Latin, other).
+
+Usage:
+    uv run python diff.py old/fonts output/fonts
+    uv run python diff.py old/JetBrainsLxgwNerdMono-Regular.ttf output/fonts/JetBrainsLxgwNerdMono-Regular.ttf
+    uv run python diff.py old/fonts output/fonts --json diff.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import FontConfig
+from src.diff import GLYPH_CLASSES, diff_fonts, pair_fonts
+
+
+def print_diff(font_diff, limit: int) -> None:
+    """Print a FontDiff as a terminal table."""
+    name = Path(font_diff.new_path).name
+    if font_diff.identical:
+        print(f"{name}: identical ({font_diff.unchanged} codepoints)")
+        return
+
+    print(f"{name}: {font_diff.unchanged} unchanged")
+    print(f"  {'class':<10} {'added':>8} {'removed':>8} {'changed':>8}")
+    for glyph_class in GLYPH_CLASSES:
+        counts = [
+            len(groups.get(glyph_class, []))
+            for groups in (font_diff.added, font_diff.removed, font_diff.changed)
+        ]
+        if any(counts):
+            print(f"  {glyph_class:<10} {counts[0]:>8} {counts[1]:>8} {counts[2]:>8}")
+
+    for label, groups in (("added", font_diff.added), ("removed", font_diff.removed), ("changed", font_diff.changed)):
+        for glyph_class, codepoints in groups.items():
+            sample = " ".join(f"U+{cp:04X}" for cp in codepoints[:limit])
+            more = f" ... (+{len(codepoints) - limit})" if len(codepoints) > limit else ""
+            print(f"    {label} {glyph_class}: {sample}{more}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare built fonts glyph by glyph",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("old", type=Path, help="Old font file or output directory")
+    parser.add_argument("new", type=Path, help="New font file or output directory")
+    parser.add_argument(
+        "--json",
+        type=Path,
+        default=None,
+        help="Write the full diff as JSON to this file",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="Codepoints listed per class in terminal output (default: 10)",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parallel workers (default: CPU count)",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        pairs = pair_fonts(args.old, args.new)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    config = FontConfig()
+    results = []
+    for font_diff in diff_fonts(pairs, config, parallel=args.parallel):
+        print_diff(font_diff, args.limit)
+        results.append(font_diff.to_dict())
+
+    if args.json:
+        results.sort(key=lambda r: r["new"])
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote diff: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Release packaging
+
+Stream the fonts listed in fonts-manifest.json and the split web fonts into
+the release archives, compressing files in parallel, and write SHA256SUMS:
+
+    output/release/
+        JetBrainsLxgwNerdMono.zip              all TTF weights
+        JetBrainsLxgwNerdMono-split-woff2.zip  split web fonts + CSS
+        JetBrainsLxgwNerdMono-*.ttf            single weights
+        JetBrainsLxgwNerdMono.ttc              all weights as one collection (build.py --ttc)
+        SHA256SUMS
+
+Usage:
+    uv run python package.py
+    uv run python package.py --fonts-dir output/fonts --split-dir output/split --release-dir output/release
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.package import package_release
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Package built fonts into release archives",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--fonts-dir",
+        type=Path,
+        default=Path("output/fonts"),
+        help="Directory with built fonts and fonts-manifest.json (default: output/fonts/)",
+    )
+    parser.add_argument(
+        "--split-dir",
+        type=Path,
+        default=Path("output/split"),
+        help="Directory with split web fonts (default: output/split/)",
+    )
+    parser.add_argument(
+        "--release-dir",
+        type=Path,
+        default=Path("output/release"),
+        help="Output directory for archives and checksums (default: output/release/)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Compression threads (default: CPU count)",
+    )
+    parser.add_argument(
+        "--level",
+        type=int,
+        default=9,
+        choices=range(10),
+        metavar="0-9",
+        help="Deflate compression level (default: 9)",
+    )
+
+    args = parser.parse_args()
+
+    print("Packaging release...")
+    try:
+        checksums_path = package_release(
+            args.fonts_dir,
+            args.split_dir,
+            args.release_dir,
+            workers=args.workers,
+            level=args.level,
+        )
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Wrote checksums: {checksums_path}")
+    print(f"\nRelease packaged in: {args.release_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-block coverage and table-size report
+
+Scan the built fonts listed in fonts-manifest.json and report, per Unicode
+block (Latin, each NerdFont icon set, Powerline, each CJK range, ...), the
+codepoint and glyph counts, compiled glyf bytes and codepoints missing
+relative to the source fonts, plus per-table sizes.
+
+Usage:
+    uv run python report.py
+    uv run python report.py --fonts-dir output/fonts --json report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.plan import load_config, load_manifest_fonts, resolve_build_plan
+from src.report import report_fonts
+
+
+def print_report(font_report, limit: int, tables: int) -> None:
+    """Print a FontReport as terminal tables."""
+    print(f"\n{Path(font_report.path).name}: {font_report.num_glyphs} glyphs, {font_report.size / 1024:.0f} KB")
+    print(f"  {'block':<36} {'codepoints':>10} {'glyphs':>8} {'glyf KB':>9} {'missing':>8}")
+    for name, stats in font_report.blocks.items():
+        missing = len(stats.missing) if font_report.sources_checked else "-"
+        print(
+            f"  {name:<36} {stats.codepoints:>10} {stats.glyphs:>8} "
+            f"{stats.glyf_bytes / 1024:>9.1f} {missing:>8}"
+        )
+
+    for name, stats in font_report.blocks.items():
+        if stats.missing:
+            sample = " ".join(f"U+{cp:04X}" for cp in stats.missing[:limit])
+            more = f" ... (+{len(stats.missing) - limit})" if len(stats.missing) > limit else ""
+            print(f"    missing {name}: {sample}{more}")
+
+    largest = sorted(font_report.tables.items(), key=lambda item: item[1], reverse=True)[:tables]
+    print("  tables: " + ", ".join(f"{tag} {size / 1024:.1f} KB" for tag, size in largest))
+
+
+def main():
+    default_config_path = Path(__file__).parent / "config.yaml"
+
+    parser = argparse.ArgumentParser(
+        description="Report per-block coverage and table sizes of built fonts",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=default_config_path,
+        help="Path to config.yaml (default: config.yaml)",
+    )
+    parser.add_argument(
+        "--fonts-dir",
+        type=Path,
+        default=None,
+        help="Directory with built fonts and fonts-manifest.json (default: from config or output/fonts/)",
+    )
+    parser.add_argument(
+        "--source-fonts-dir",
+        type=Path,
+        default=None,
+        help="Directory containing source fonts (default: from config or fonts/)",
+    )
+    parser.add_argument(
+        "--json",
+        type=Path,
+        default=None,
+        help="Write the full report as JSON to this file",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="Missing codepoints listed per block in terminal output (default: 10)",
+    )
+    parser.add_argument(
+        "--tables",
+        type=int,
+        default=8,
+        help="Largest tables listed per font in terminal output (default: 8)",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parallel workers (default: CPU count)",
+    )
+
+    args = parser.parse_args()
+
+    yaml_config = load_config(args.config)
+    try:
+        plan = resolve_build_plan(
+            yaml_config,
+            fonts_dir=args.source_fonts_dir,
+            output_dir=args.fonts_dir,
+            check_files=False,
+        )
+        built = load_manifest_fonts(plan.output_dir)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # Compare coverage with the source fonts when they are available
+    fonts = {}
+    for style, font_path in built.items():
+        style_plan = next((s for s in plan.styles if s.style == style), None)
+        sources = None
+        if style_plan and style_plan.en_font_path.exists() and style_plan.cn_font_path.exists():
+            sources = (str(style_plan.en_font_path), str(style_plan.cn_font_path))
+        else:
+            print(f"Source fonts for {style} not found, skipping coverage check")
+        fonts[style] = (str(font_path), sources)
+
+    results = []
+    for font_report in report_fonts(fonts, plan.config, parallel=args.parallel):
+        print_report(font_report, args.limit, args.tables)
+        results.append(font_report.to_dict())
+
+    if args.json:
+        results.sort(key=lambda r: r["style"])
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote report: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Font subsetting HTTP service
+
+Serves WOFF2 subsets of the built fonts containing exactly the requested
+characters, for pages that want a per-page font instead of split chunks.
+
+Usage:
+    uv run python serve.py
+    uv run python serve.py --fonts-dir output/fonts --port 8080
+    curl "http://localhost:8080/subset/Regular.woff2?text=中英文2:1" -o subset.woff2
+    curl http://localhost:8080/metrics
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.plan import load_manifest_fonts
+from src.subset_service import SubsetService, check_brotli_installed, serve
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve WOFF2 subsets of built fonts over HTTP",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--fonts-dir",
+        type=Path,
+        default=Path("output/fonts"),
+        help="Directory with built fonts and fonts-manifest.json (default: output/fonts/)",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to bind (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8080,
+        help="Port to listen on (default: 8080)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of subsetting worker processes (default: 2)",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=int,
+        default=64,
+        help="Maximum size of the subset LRU cache in MiB (default: 64)",
+    )
+
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("fontTools").setLevel(logging.WARNING)
+
+    if not check_brotli_installed():
+        print("Error: brotli is required for WOFF2 output. Please run 'uv sync --extra web' first.")
+        sys.exit(1)
+
+    try:
+        font_files = load_manifest_fonts(args.fonts_dir)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error loading fonts: {e}")
+        sys.exit(1)
+
+    print(f"Loaded styles: {', '.join(font_files)}")
+    service = SubsetService(
+        font_files,
+        cache_bytes=args.cache_mb << 20,
+        workers=args.workers,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
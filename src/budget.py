@@ -0,0 +1,307 @@
+"""Glyph budget: plan which CJK glyphs fit before anything is merged.
+
+Glyph IDs are 16-bit, so a font holds at most 65535 glyphs. The base font
+(Latin + NerdFont icons) already uses a good part of that, and CJK
+sources covering Extensions B-G have far more glyphs than the rest. The
+planner counts the candidates of every class from the cmaps and glyph
+orders alone (no glyph is decompiled), which takes milliseconds, and
+decides up front which CJK glyphs are imported:
+
+- everything, if the candidates fit ``glyph_budget``
+- otherwise, by ``glyph_overflow``:
+
+  - ``error``: stop before merging, with the plan in the message
+  - ``drop``: import the highest-priority glyphs that fit, drop the rest
+  - ``companion``: import the glyphs that fit and put the rest into a
+    supplementary companion font (see companion.py)
+
+Priority (``budget_priority``) ranks CJK glyphs by:
+
+- ``ranges``: small BMP blocks (punctuation, symbols, radicals,
+  Bopomofo), then the other BMP ranges (Unified Ideographs, Extension A),
+  then supplementary-plane ranges (Extensions B-G, dropped first), each
+  group in ``cjk_ranges`` order
+- ``frequency``: ``budget_file`` lists characters, most frequent first
+- ``profile``: ``budget_file`` is sample text; characters used more
+  often rank higher
+
+Characters not ranked by the file follow in ``ranges`` order. Glyphs
+keep their source order in the font whatever their priority.
+"""
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from fontTools.ttLib import TTFont
+
+from .companion import COMPANION_BASE_GLYPHS
+from .config import MAX_GLYPHS, FontConfig
+from .iconsets import plan_icon_drop
+from .merge import get_cjk_cmap_entries
+from .report import CJK_BLOCK_NAMES
+from .snapshot import FontSnapshot, is_snapshot, load_snapshot
+
+# BMP ranges smaller than this are symbol, punctuation and radical blocks
+SMALL_BLOCK = 1024
+
+
+@dataclass
+class GlyphClass:
+    """Candidate and imported glyph counts of one CJK range."""
+
+    name: str
+    candidates: int = 0
+    kept: int = 0
+
+    @property
+    def dropped(self) -> int:
+        return self.candidates - self.kept
+
+
+@dataclass
+class GlyphBudget:
+    """Glyph plan of one style build.
+
+    Attributes:
+        limit: Maximum glyphs in the font
+        overflow: What happens to glyphs over the limit (OVERFLOW_MODES)
+        priority: How CJK glyphs were ranked (BUDGET_PRIORITIES)
+        base: Glyphs of the base font (Latin + NerdFont icons)
+        icons: NerdFont icons and Powerline symbols among them
+        dropped_icons: Icons of unselected sets, not counted in base
+        classes: CJK candidates per range, in cjk_ranges order
+        kept: CJK glyphs to import, or None to import all of them
+        overflow_glyphs: CJK glyphs over the limit, highest priority first
+        seconds: Time taken to plan
+    """
+
+    limit: int
+    overflow: str
+    priority: str
+    base: int
+    icons: int
+    dropped_icons: int = 0
+    classes: List[GlyphClass] = field(default_factory=list)
+    kept: Optional[Set[str]] = None
+    overflow_glyphs: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def candidates(self) -> int:
+        """CJK glyphs the CN font could add."""
+        return sum(glyph_class.candidates for glyph_class in self.classes)
+
+    @property
+    def total(self) -> int:
+        """Glyphs the font would have with every candidate imported."""
+        return self.base + self.candidates
+
+    @property
+    def fits(self) -> bool:
+        return self.total <= self.limit
+
+    @property
+    def companion(self) -> bool:
+        """Whether overflow glyphs go into a supplementary font."""
+        return self.overflow == "companion" and bool(self.overflow_glyphs)
+
+    def summary(self) -> str:
+        """One-line plan."""
+        dropped = f", {self.dropped_icons} dropped" if self.dropped_icons else ""
+        line = (
+            f"Glyph budget: {self.base} base ({self.icons} icons{dropped}) + {self.candidates} CJK "
+            f"= {self.total} of {self.limit}"
+        )
+        if not self.fits:
+            action = {"error": "over budget", "drop": "dropping", "companion": "to supplement"}[self.overflow]
+            line += f", {action} {len(self.overflow_glyphs)} ({self.priority} priority)"
+        return f"{line} (planned in {self.seconds * 1000:.0f} ms)"
+
+    def details(self) -> List[str]:
+        """Per-range lines for a plan over budget."""
+        return [
+            f"{glyph_class.name:<34} {glyph_class.candidates:>6} candidates, "
+            f"{glyph_class.kept:>6} kept, {glyph_class.dropped:>6} over"
+            for glyph_class in self.classes
+            if glyph_class.candidates
+        ]
+
+    def check(self) -> None:
+        """Raise if the plan cannot be built.
+
+        Raises:
+            ValueError: If the base font alone exceeds the limit, if the
+                candidates do not fit and overflow is "error", or if the
+                overflow does not fit a supplementary font either
+        """
+        if self.base > self.limit:
+            raise ValueError(f"Base font has {self.base} glyphs, over the glyph budget of {self.limit}")
+        if self.fits:
+            return
+        if self.overflow == "error":
+            raise ValueError(
+                f"{self.total} glyphs would exceed the glyph budget of {self.limit} by "
+                f"{self.total - self.limit}; set build.glyph_overflow to 'drop' or 'companion'"
+            )
+        if self.overflow == "companion" and len(self.overflow_glyphs) + COMPANION_BASE_GLYPHS > MAX_GLYPHS:
+            raise ValueError(
+                f"{len(self.overflow_glyphs)} overflow glyphs do not fit a supplementary font either"
+            )
+
+
+def read_priority_file(path: str, priority: str) -> Dict[int, int]:
+    """Rank codepoints from a frequency list or sample text.
+
+    Args:
+        path: Text file (UTF-8)
+        priority: "frequency" (characters in order, most frequent first)
+            or "profile" (sample text, ranked by occurrences)
+
+    Returns:
+        Dict mapping codepoint -> rank (0 is the highest priority)
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    if priority == "profile":
+        counts = Counter(ch for ch in text if not ch.isspace())
+        ranked = sorted(counts, key=lambda ch: (-counts[ch], ord(ch)))
+    else:
+        ranked = list(dict.fromkeys(ch for ch in text if not ch.isspace()))
+    return {ord(ch): rank for rank, ch in enumerate(ranked)}
+
+
+def _range_order(config: FontConfig) -> List[int]:
+    """Index in cjk_ranges of each range, in "ranges" priority order."""
+    def tier(index: int) -> int:
+        start, end = config.cjk_ranges[index]
+        if start > 0xFFFF:
+            return 2
+        return 1 if end - start + 1 >= SMALL_BLOCK else 0
+
+    # Stable sort: cjk_ranges order within each tier
+    return sorted(range(len(config.cjk_ranges)), key=tier)
+
+
+def _range_index(codepoint: int, config: FontConfig) -> int:
+    for index, (start, end) in enumerate(config.cjk_ranges):
+        if start <= codepoint <= end:
+            return index
+    return len(config.cjk_ranges)
+
+
+def _base_counts(base_font, config: FontConfig) -> Tuple[Set[str], int, int]:
+    """Glyph names of the base font, its number of icons and of dropped icons.
+
+    Icons of unselected sets (see iconsets.py) are left out of both.
+    """
+    position = base_font.tell() if hasattr(base_font, "tell") else None
+    font = TTFont(base_font, lazy=True)
+    try:
+        cmap = font["cmap"].getBestCmap() or {}
+        dropped_codepoints, dropped = plan_icon_drop(cmap, config)
+        glyph_names = set(font.getGlyphOrder()) - dropped
+        icon_ranges = tuple(config.nerd_ranges) + (tuple(config.powerline_range),)
+        icons = {
+            glyph_name
+            for codepoint, glyph_name in cmap.items()
+            if codepoint not in dropped_codepoints and any(start <= codepoint <= end for start, end in icon_ranges)
+        }
+    finally:
+        # Closing the font would close a caller's file object
+        if position is None:
+            font.close()
+        else:
+            base_font.seek(position)
+    return glyph_names, len(icons), len(dropped)
+
+
+def plan_glyph_budget(base_font, cn_font, config: FontConfig) -> GlyphBudget:
+    """Count the glyphs a merge would produce and decide what to import.
+
+    Only cmaps and glyph orders are read, so planning takes milliseconds.
+
+    Args:
+        base_font: Base font path or file object (rewound after reading)
+        cn_font: CN font path or file object, or a snapshot of it
+            (FontSnapshot object or path to a ``.snapshot`` file)
+        config: FontConfig with the CJK ranges and budget settings
+
+    Returns:
+        GlyphBudget object
+    """
+    start = time.perf_counter()
+    base_glyph_names, icons, dropped_icons = _base_counts(base_font, config)
+
+    position = cn_font.tell() if hasattr(cn_font, "tell") else None
+    if isinstance(cn_font, FontSnapshot):
+        cn = cn_font
+    elif is_snapshot(cn_font):
+        cn = load_snapshot(cn_font, config=config)
+    else:
+        cn = TTFont(cn_font, lazy=True)
+    try:
+        cjk_cmap = get_cjk_cmap_entries(cn, config)
+        glyph_order = cn.getGlyphOrder()
+    finally:
+        # Snapshots and file objects passed in by the caller stay open
+        if position is not None:
+            cn_font.seek(position)
+        elif cn is not cn_font:
+            cn.close()
+
+    # Lowest codepoint of every glyph classifies it
+    codepoints: Dict[str, List[int]] = {}
+    for codepoint, glyph_name in cjk_cmap.items():
+        codepoints.setdefault(glyph_name, []).append(codepoint)
+
+    # Same candidates as merge_fonts, in CN font glyph order
+    candidates = [
+        glyph_name for glyph_name in glyph_order
+        if glyph_name in codepoints and glyph_name not in base_glyph_names
+    ]
+
+    budget = GlyphBudget(
+        limit=config.glyph_budget,
+        overflow=config.glyph_overflow,
+        priority=config.budget_priority,
+        base=len(base_glyph_names),
+        icons=icons,
+        dropped_icons=dropped_icons,
+        classes=[
+            GlyphClass(CJK_BLOCK_NAMES.get(tuple(cjk_range), f"CJK U+{cjk_range[0]:04X}-U+{cjk_range[1]:04X}"))
+            for cjk_range in config.cjk_ranges
+        ],
+    )
+    glyph_ranges = {
+        glyph_name: _range_index(min(codepoints[glyph_name]), config)
+        for glyph_name in candidates
+    }
+    for glyph_name in candidates:
+        budget.classes[glyph_ranges[glyph_name]].candidates += 1
+
+    room = max(budget.limit - budget.base, 0)
+    if len(candidates) > room:
+        range_rank = {index: rank for rank, index in enumerate(_range_order(config))}
+        ranks: Dict[int, int] = {}
+        if config.budget_priority != "ranges":
+            ranks = read_priority_file(config.budget_file, config.budget_priority)
+        unranked = len(ranks)
+
+        def priority(item: Tuple[int, str]) -> Tuple[int, int, int]:
+            order, glyph_name = item
+            file_rank = min((ranks.get(cp, unranked) for cp in codepoints[glyph_name]), default=unranked)
+            return file_rank, range_rank[glyph_ranges[glyph_name]], order
+
+        ranked = [glyph_name for _, glyph_name in sorted(enumerate(candidates), key=priority)]
+        budget.kept = set(ranked[:room])
+        budget.overflow_glyphs = ranked[room:]
+        for glyph_name in budget.kept:
+            budget.classes[glyph_ranges[glyph_name]].kept += 1
+    else:
+        for glyph_class in budget.classes:
+            glyph_class.kept = glyph_class.candidates
+
+    budget.seconds = time.perf_counter() - start
+    return budget
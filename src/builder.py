@@ -0,0 +1,453 @@
+"""Style builds for the build.py CLI and the async orchestrator.
+
+Builds a plan's styles sequentially, pipelined (see executor.py) or on a
+process pool, and writes the outputs that go with them (preview fonts,
+TrueType Collection). build.py adds the CLI, watch mode and the job
+queue coordinator on top; orchestrator.py schedules the same
+``build_single_font`` calls from asyncio.
+
+In the companion layout, ``build_single_font`` builds styles without CJK
+glyphs and ``build_cjk_font`` builds the CJK-only fonts; ``build_tasks``
+lists both kinds of build for a set of styles.
+
+Only lightweight modules are imported at module level. fontTools-backed
+modules (pipeline, snapshot, preview, collection) are imported inside the
+functions that need them, so importing this module stays cheap.
+"""
+
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from .config import CJK_SUFFIX, PHASES, SUPPLEMENT_SUFFIX, FontConfig
+from .plan import BuildPlan, StylePlan, write_manifest
+from .utils import write_file_atomic
+
+if TYPE_CHECKING:
+    from fontTools.ttLib import TTFont
+
+# Progress steps of build_single_font, in order
+BUILD_STEPS = ("budget",) + PHASES + ("save",)
+
+
+def build_single_font(
+    style: str,
+    en_font_path: Path,
+    cn_font_path: Path,
+    display_name: str,
+    output_dir: Path,
+    config: FontConfig,
+    metadata: dict,
+    progress: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Build a single font variant.
+
+    In the companion layout (config.cjk_layout), the style is built
+    without CJK glyphs and without a glyph budget (see build_cjk_font).
+
+    Args:
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        en_font_path: Path to English font (e.g., JetBrains Mono NerdFont)
+        cn_font_path: Path to Chinese font (e.g., LXGW WenKai Mono) or its snapshot
+        display_name: Display name for the style in font metadata
+        output_dir: Output directory
+        config: FontConfig object
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        progress: Called with each of BUILD_STEPS before it runs
+
+    Returns:
+        Output file path
+    """
+    from .pipeline import merge_latin, merge_style, merge_supplement, plan_style_budget
+
+    report = progress or (lambda step: None)
+    print(f"\nBuilding {config.family_name_compact}-{style}...")
+
+    report("budget")
+    if config.cjk_layout == "companion":
+        budget = None
+        merged_font, postscript_name = merge_latin(
+            style, en_font_path, display_name, config, metadata, progress=progress
+        )
+    else:
+        budget = plan_style_budget(en_font_path, cn_font_path, config)
+        merged_font, postscript_name = merge_style(
+            style, en_font_path, cn_font_path, display_name, config, metadata, budget, progress=progress
+        )
+    report("save")
+    output_path = save_font(merged_font, output_dir / f"{postscript_name}.ttf", config.save_workers)
+
+    supplement = None
+    if budget is not None:
+        supplement = merge_supplement(style, en_font_path, cn_font_path, display_name, config, metadata, budget)
+    supplement_path = output_dir / f"{config.family_name_compact}{SUPPLEMENT_SUFFIX}-{style}.ttf"
+    if supplement is not None:
+        save_font(supplement[0], supplement_path, config.save_workers)
+    else:
+        # Left over from a build that did not fit the budget
+        supplement_path.unlink(missing_ok=True)
+    return str(output_path)
+
+
+def build_cjk_font(
+    style: str,
+    en_font_path: Path,
+    cn_font_path: Path,
+    display_name: str,
+    output_dir: Path,
+    config: FontConfig,
+    metadata: dict,
+    progress: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Build the CJK-only font of a CN font (companion layout).
+
+    Args:
+        style: Style whose name and base font the CJK font takes (StylePlan.cjk_style)
+        en_font_path: Path to that style's English font
+        cn_font_path: Path to Chinese font (e.g., LXGW WenKai Mono) or its snapshot
+        display_name: Display name for the style in font metadata
+        output_dir: Output directory
+        config: FontConfig object of the main fonts
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        progress: Called with each of BUILD_STEPS before it runs
+
+    Returns:
+        Output file path
+    """
+    from .pipeline import merge_cjk
+
+    report = progress or (lambda step: None)
+    print(f"\nBuilding {config.family_name_compact}{CJK_SUFFIX}-{style}...")
+
+    report("budget")
+    cjk_font, postscript_name = merge_cjk(
+        style, en_font_path, cn_font_path, display_name, config, metadata, progress=progress
+    )
+    report("save")
+    return str(save_font(cjk_font, output_dir / f"{postscript_name}.ttf", config.save_workers))
+
+
+def build_tasks(plan: BuildPlan, styles: List[str]) -> List[Tuple[Callable[..., str], StylePlan]]:
+    """List the font builds for some styles of a plan.
+
+    Args:
+        plan: BuildPlan object
+        styles: Styles to build
+
+    Returns:
+        (build function, StylePlan) pairs: build_single_font for each
+        style, then build_cjk_font for each CJK-only font they fall back
+        to (companion layout). Both functions take the same arguments.
+    """
+    tasks: List[Tuple[Callable[..., str], StylePlan]] = [
+        (build_single_font, style_plan) for style_plan in plan.styles if style_plan.style in styles
+    ]
+    tasks += [(build_cjk_font, cjk_plan) for cjk_plan in plan.cjk_plans(styles)]
+    return tasks
+
+
+def save_font(font: "TTFont", output_path: Path, workers: int = 1) -> Path:
+    """Save a merged font (sorted tables for reproducible bytes) and close it.
+
+    Args:
+        font: Merged TTFont
+        output_path: Path of the TTF to write
+        workers: Processes compiling glyf/loca (1 for a serial save)
+
+    Returns:
+        Output path
+    """
+    from .pipeline import compile_font
+
+    save_start = time.perf_counter()
+    write_file_atomic(output_path, compile_font(font, workers))
+    save_seconds = time.perf_counter() - save_start
+    font.close()
+
+    size_mb = output_path.stat().st_size / (1024 * 1024)
+    print(f"  Saved: {output_path} ({size_mb:.2f} MB in {save_seconds:.2f}s)")
+    return output_path
+
+
+def prepare_snapshots(plan: BuildPlan) -> None:
+    """Snapshot each distinct CN font once and point styles at the snapshots.
+
+    Workers memory-map the snapshot instead of decompiling the CN font again.
+
+    Args:
+        plan: BuildPlan object (cn_source of each style is updated)
+    """
+    if not plan.snapshot_dir:
+        return
+
+    from .snapshot import ensure_snapshot
+
+    print("Preparing CN font snapshots...")
+    snapshots: Dict[Path, Path] = {}
+    for style_plan in plan.styles + plan.cjk_fonts:
+        cn_font_path = style_plan.cn_font_path
+        if cn_font_path not in snapshots:
+            snapshots[cn_font_path] = ensure_snapshot(cn_font_path, plan.snapshot_dir, plan.config)
+        style_plan.cn_source = snapshots[cn_font_path]
+
+
+def prefetch_sources(style_plan: StylePlan, cache: Dict[Path, bytes]) -> Tuple[Any, Any]:
+    """Read the source fonts of a style into memory (prefetch stage).
+
+    TTF sources are returned as bytes. A CN font shared by consecutive
+    styles is read once. Snapshot files are read through once to warm the
+    page cache and passed on as paths (open snapshots as they are).
+
+    Args:
+        style_plan: StylePlan object
+        cache: Last CN font read, as path -> bytes (updated in place)
+
+    Returns:
+        Tuple of (EN font source, CN font source)
+    """
+    from .snapshot import is_snapshot
+
+    en_source = style_plan.en_font_path.read_bytes()
+    cn_source = style_plan.cn_input
+    if is_snapshot(cn_source):
+        if isinstance(cn_source, (str, Path)):
+            with open(cn_source, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+        return en_source, cn_source
+
+    cn_path = Path(cn_source)
+    if cn_path not in cache:
+        cache.clear()
+        cache[cn_path] = cn_path.read_bytes()
+    return en_source, cache[cn_path]
+
+
+def build_styles_pipelined(plan: BuildPlan, tasks: List[Tuple[Callable[..., str], StylePlan]]) -> List[str]:
+    """Build styles one at a time with overlapping reads, merges and saves.
+
+    The next style's sources are read on a background thread while the
+    current style merges, and finished fonts are compiled and written on
+    another thread while the next one merges. At most plan.max_inflight
+    merged fonts are alive at once. Output bytes are the same as with
+    build_single_font.
+
+    Args:
+        plan: BuildPlan object
+        tasks: Builds to run, in order (see build_tasks)
+
+    Returns:
+        Output file paths
+    """
+    from .executor import STAGES, run_pipelined
+    from .pipeline import compile_font, merge_cjk, merge_latin, merge_style, merge_supplement, plan_style_budget
+
+    config = plan.config
+    cache: Dict[Path, bytes] = {}
+
+    def transform(task: Tuple[Callable[..., str], StylePlan], sources: Tuple[Any, Any]) -> List[tuple]:
+        build, style_plan = task
+        en_source, cn_source = sources
+        args = (style_plan.style, en_source, cn_source, style_plan.display_name, config, plan.metadata)
+        if build is build_cjk_font:
+            print(f"\nBuilding {config.family_name_compact}{CJK_SUFFIX}-{style_plan.style}...")
+            return [merge_cjk(*args)]
+        print(f"\nBuilding {config.family_name_compact}-{style_plan.style}...")
+        if config.cjk_layout == "companion":
+            return [merge_latin(style_plan.style, en_source, style_plan.display_name, config, plan.metadata)]
+        budget = plan_style_budget(en_source, cn_source, config)
+        fonts = [merge_style(*args, budget)]
+        supplement = merge_supplement(*args, budget)
+        if supplement is not None:
+            fonts.append(supplement)
+        else:
+            # Left over from a build that did not fit the budget
+            plan.supplement_path(style_plan.style).unlink(missing_ok=True)
+        return fonts
+
+    def save(task: Tuple[Callable[..., str], StylePlan], result: List[tuple]) -> str:
+        output_paths = []
+        for merged_font, postscript_name in result:
+            save_start = time.perf_counter()
+            data = compile_font(merged_font, config.save_workers)
+            merged_font.close()
+            output_path = plan.output_dir / f"{postscript_name}.ttf"
+            write_file_atomic(output_path, data)
+            save_seconds = time.perf_counter() - save_start
+            print(f"  Saved: {output_path} ({len(data) / (1024 * 1024):.2f} MB in {save_seconds:.2f}s)")
+            output_paths.append(str(output_path))
+        return output_paths[0]
+
+    outputs, stats = run_pipelined(
+        tasks,
+        prefetch=lambda task: prefetch_sources(task[1], cache),
+        transform=transform,
+        save=save,
+        max_inflight=plan.max_inflight,
+    )
+
+    overlap = stats.serial_time / stats.wall if stats.wall else 1.0
+    print(f"\nPipeline: {stats.wall:.1f}s wall for {stats.serial_time:.1f}s of stage work ({overlap:.2f}x overlap)")
+    for stage in STAGES:
+        stage_stats = stats.stages[stage]
+        print(
+            f"  {stage:<10} {stage_stats.busy:>6.1f}s busy, {stats.utilisation(stage):>4.0%} utilisation "
+            f"({stage_stats.items} items)"
+        )
+    return outputs
+
+
+def build_styles(plan: BuildPlan, styles: List[str]) -> None:
+    """Build the given styles of a plan, sequentially or in parallel.
+
+    Args:
+        plan: BuildPlan object
+        styles: Styles to build
+    """
+    tasks = build_tasks(plan, styles)
+
+    if plan.parallel <= 1 and plan.pipeline and len(tasks) > 1:
+        # Sequential merges with prefetch and saves overlapped
+        build_styles_pipelined(plan, tasks)
+    elif plan.parallel <= 1:
+        # Sequential build
+        for build, style_plan in tasks:
+            build(
+                style_plan.style,
+                style_plan.en_font_path,
+                style_plan.cn_input,
+                style_plan.display_name,
+                plan.output_dir,
+                plan.config,
+                plan.metadata,
+            )
+    else:
+        # Parallel build
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=plan.parallel) as executor:
+            futures = {}
+            for build, style_plan in tasks:
+                future = executor.submit(
+                    build,
+                    style_plan.style,
+                    style_plan.en_font_path,
+                    style_plan.cn_input,
+                    style_plan.display_name,
+                    plan.output_dir,
+                    plan.config,
+                    plan.metadata,
+                )
+                futures[future] = (
+                    style_plan.style if build is build_single_font else f"{CJK_SUFFIX}-{style_plan.style}"
+                )
+
+            for future in as_completed(futures):
+                style = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error building {style}: {e}")
+                    raise
+
+
+def build_job(payload: dict) -> dict:
+    """Build one style (or CJK-only font) from a queue job payload (see queue_styles)."""
+    from .jobqueue import config_from_dict
+
+    build = build_cjk_font if payload.get("cjk") else build_single_font
+    output_path = build(
+        payload["style"],
+        Path(payload["en_font_path"]),
+        Path(payload["cn_input"]),
+        payload["display_name"],
+        Path(payload["output_dir"]),
+        config_from_dict(payload["config"]),
+        payload["metadata"],
+    )
+    return {"output_path": output_path}
+
+
+def plan_glyph_budgets(plan: BuildPlan, styles: List[str]) -> None:
+    """Plan the glyph budget of every style before any of them is built.
+
+    In the companion layout, the styles have no CJK glyphs and the budgets
+    of their CJK-only fonts are planned instead.
+
+    Args:
+        plan: BuildPlan object
+        styles: Styles to build
+
+    Raises:
+        ValueError: If a style cannot be built within the glyph budget
+    """
+    from .pipeline import plan_cjk_budget, plan_style_budget
+
+    print("\nPlanning glyph budgets...")
+    if plan.config.cjk_layout == "companion":
+        for cjk_plan in plan.cjk_plans(styles):
+            print(f"{CJK_SUFFIX}-{cjk_plan.style}:")
+            plan_cjk_budget(cjk_plan.en_font_path, cjk_plan.cn_input, plan.config)
+        return
+    for style_plan in plan.styles:
+        if style_plan.style in styles:
+            print(f"{style_plan.style}:")
+            plan_style_budget(style_plan.en_font_path, style_plan.cn_input, plan.config)
+
+
+def write_preview_fonts(plan: BuildPlan, styles: List[str]) -> None:
+    """Write preview WOFF2 subsets of built styles for the verification pages."""
+    if not plan.previews:
+        return
+    from .preview import write_previews
+
+    print("\nWriting preview fonts...")
+    write_previews(plan, styles)
+
+
+def write_collection_file(plan: BuildPlan) -> None:
+    """Pack the built styles into a TrueType Collection and report its size."""
+    if not plan.ttc:
+        return
+    from .collection import write_collection
+
+    font_paths = {
+        style_plan.style: plan.output_path(style_plan.style)
+        for style_plan in plan.styles
+        if plan.output_path(style_plan.style).exists()
+    }
+    if not font_paths:
+        print("No built fonts to pack into a collection")
+        return
+    print("\nWriting TrueType Collection...")
+    report = write_collection(font_paths, plan.collection_path)
+    mb = 1024 * 1024
+    print(
+        f"  Collection: {report.path} ({len(report.styles)} styles, {report.size / mb:.2f} MB "
+        f"vs {report.fonts_size / mb:.2f} MB as separate TTFs, saved {report.saved / mb:.2f} MB)"
+    )
+    for table in report.shared:
+        print(f"    {table.tag:<4} shared by {len(table.styles)} styles, saved {table.saved / 1024:.1f} KB")
+
+
+def finish_build(plan: BuildPlan, styles: List[str]) -> Path:
+    """Write the outputs that follow style builds: previews, collection, manifest.
+
+    In the companion layout, the fontconfig and CSS fallback snippets are
+    written as well (see fallback.py).
+
+    Args:
+        plan: BuildPlan object
+        styles: Styles that were built
+
+    Returns:
+        Path of fonts-manifest.json
+    """
+    write_preview_fonts(plan, styles)
+    write_collection_file(plan)
+    if plan.cjk_fonts:
+        from .fallback import write_fallback_snippets
+
+        for path in write_fallback_snippets(plan):
+            print(f"Generated fallback snippet: {path}")
+    return write_manifest(plan)
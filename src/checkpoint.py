@@ -0,0 +1,214 @@
+"""Phase checkpoints: intermediate fonts saved between pipeline phases.
+
+The merge pipeline runs as named phases (see ``PHASES`` in pipeline.py).
+After any phase the intermediate font can be saved as a TTF, keyed by
+everything the phase output depends on:
+
+- the key of the previous phase, so any upstream change invalidates it
+- the config fields and build inputs the phase reads
+- the source code of the functions the phase runs
+
+The first key in the chain covers the source fonts (by SHA-256) and the
+fontTools version. A build resuming from a phase loads the checkpoint of
+the latest earlier phase whose key still matches; stale checkpoints are
+simply never found and get replaced by the next save.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import fontTools
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.standardGlyphOrder import standardGlyphOrder
+
+from .snapshot import FontSnapshot, is_snapshot, load_snapshot
+from .utils import file_sha256
+
+# Bumped whenever the checkpoint contents or key layout change
+CHECKPOINT_VERSION = 1
+
+CHECKPOINT_SUFFIX = ".ttf"
+
+
+def source_fingerprint(source: Any) -> str:
+    """Get the SHA-256 of a font source's content.
+
+    Snapshots report the SHA-256 of the font they were made from, so a
+    font and its snapshot share the same fingerprint.
+
+    Args:
+        source: Path, bytes, file object or FontSnapshot
+
+    Returns:
+        Hex digest string
+    """
+    if isinstance(source, FontSnapshot):
+        return source.source_sha256
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    if isinstance(source, (str, Path)):
+        if is_snapshot(source):
+            snapshot = load_snapshot(source)
+            try:
+                return snapshot.source_sha256
+            finally:
+                snapshot.close()
+        return file_sha256(source)
+
+    # File object: hash it and rewind for the reader
+    position = source.tell()
+    digest = hashlib.sha256(source.read()).hexdigest()
+    source.seek(position)
+    return digest
+
+
+def code_fingerprint(functions: Iterable[Callable]) -> str:
+    """Get the SHA-256 of the source code of some functions."""
+    digest = hashlib.sha256()
+    for function in functions:
+        digest.update(f"{function.__module__}.{function.__qualname__}\n".encode("utf-8"))
+        digest.update(inspect.getsource(function).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def root_key(en_fingerprint: str, cn_fingerprint: str) -> str:
+    """Get the key the phase chain starts from (source fonts and tooling)."""
+    return _digest({
+        "checkpoint_version": CHECKPOINT_VERSION,
+        "fonttools": fontTools.version,
+        "en_font": en_fingerprint,
+        "cn_font": cn_fingerprint,
+    })
+
+
+def phase_key(previous_key: str, phase: str, inputs: Dict[str, Any], code: str) -> str:
+    """Get the checkpoint key of a phase.
+
+    Args:
+        previous_key: Key of the previous phase (or root_key())
+        phase: Phase name
+        inputs: Config fields and build inputs the phase reads (JSON-serialisable)
+        code: code_fingerprint() of the functions the phase runs
+
+    Returns:
+        Hex digest string
+    """
+    return _digest({"previous": previous_key, "phase": phase, "inputs": inputs, "code": code})
+
+
+def _digest(value: Dict[str, Any]) -> str:
+    data = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class CheckpointStore:
+    """Directory of phase checkpoints, one per style and phase.
+
+    Files are named ``<style>.<phase>.<key prefix>.ttf`` (plus a ``.json``
+    sidecar); saving a new checkpoint for a style and phase removes the
+    stale one.
+
+    Args:
+        directory: Checkpoint directory (created on first save)
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    def path(self, style: str, phase: str, key: str) -> Path:
+        """Get the checkpoint path for a style, phase and key."""
+        return self.directory / f"{style}.{phase}.{key[:16]}{CHECKPOINT_SUFFIX}"
+
+    def has(self, style: str, phase: str, key: str) -> bool:
+        """Check whether a checkpoint with this key exists."""
+        return self.path(style, phase, key).exists()
+
+    def save(self, font: TTFont, style: str, phase: str, key: str) -> Path:
+        """Save an intermediate font as the checkpoint of a phase.
+
+        Saving must not change the font that keeps going through the
+        pipeline, so stored glyph bounds (later phases read glyph.xMin)
+        and head timestamps are written as they are, and the glyph names
+        the post table appends while compiling are dropped again. The
+        tables that were decompiled are listed in a sidecar file and
+        decompiled again on load, so the final save recompiles the same
+        tables as an uninterrupted build and produces the same bytes.
+
+        Args:
+            font: Intermediate TTFont
+            style: Font style
+            phase: Name of the phase that just ran
+            key: Key of that phase
+
+        Returns:
+            Path to the checkpoint
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(style, phase, key)
+        state = {
+            "loaded_tables": [tag for tag in font.keys() if font.isLoaded(tag)],
+            "post_extra_names": _post_extra_names(font),
+        }
+        extra_names = font["post"].extraNames if state["post_extra_names"] is not None else None
+
+        buffer = BytesIO()
+        recalc = (font.recalcBBoxes, font.recalcTimestamp)
+        font.recalcBBoxes = font.recalcTimestamp = False
+        try:
+            font.save(buffer, reorderTables=True)
+        finally:
+            font.recalcBBoxes, font.recalcTimestamp = recalc
+            if extra_names is not None:
+                font["post"].extraNames = extra_names
+
+        # Sidecar first: a checkpoint without it is never loaded
+        _write_atomic(path.with_suffix(".json"), json.dumps(state).encode("utf-8"))
+        _write_atomic(path, buffer.getvalue())
+
+        for stale in self.directory.glob(f"{style}.{phase}.*"):
+            if stale not in (path, path.with_suffix(".json")):
+                stale.unlink(missing_ok=True)
+        return path
+
+    def load(self, style: str, phase: str, key: str) -> Optional[TTFont]:
+        """Load the checkpoint of a phase if one with this key exists.
+
+        Returns:
+            TTFont object, or None if there is no valid checkpoint
+        """
+        path = self.path(style, phase, key)
+        sidecar = path.with_suffix(".json")
+        if not (path.exists() and sidecar.exists()):
+            return None
+        state = json.loads(sidecar.read_text(encoding="utf-8"))
+        font = TTFont(str(path))
+        for tag in state["loaded_tables"]:
+            font[tag]
+        if state["post_extra_names"] is not None:
+            post = font["post"]
+            post.extraNames = post.extraNames[:state["post_extra_names"]]
+        return font
+
+
+def _post_extra_names(font: TTFont) -> Optional[int]:
+    """Number of custom glyph names a loaded format 2 post table already has.
+
+    Compiling appends the names of new glyphs in the current glyph order;
+    an uninterrupted build appends them only at the final save, after
+    the glyph order phase.
+    """
+    if not font.isLoaded("post") or font["post"].formatType != 2.0:
+        return None
+    post = font["post"]
+    return len([name for name in post.extraNames if name not in standardGlyphOrder])
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,107 @@
+"""TrueType Collection output: all styles in one .ttc with shared tables.
+
+Styles built from the same sources end up with some byte-identical tables
+(typically cmap, GSUB/GPOS, gasp, prep/fpgm or OS/2 fields that do not
+depend on the weight). A collection stores every distinct table once and
+points each font's table directory at it, so installing or bundling all
+weights reads and maps less data than the separate TTFs.
+
+Fonts are opened lazily and their tables copied as they are, so each font
+in the collection is the same as its TTF, table for table.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from fontTools.ttLib import TTCollection, TTFont
+
+
+@dataclass
+class SharedTable:
+    """A table stored once in the collection for several fonts."""
+
+    tag: str
+    styles: List[str]
+    size: int
+
+    @property
+    def saved(self) -> int:
+        """Bytes saved compared to one copy per font."""
+        return self.size * (len(self.styles) - 1)
+
+
+@dataclass
+class CollectionReport:
+    """Size of a collection compared to its separate TTFs."""
+
+    path: Path
+    size: int
+    fonts_size: int
+    styles: List[str]
+    shared: List[SharedTable] = field(default_factory=list)
+
+    @property
+    def saved(self) -> int:
+        """Bytes saved compared to the sum of the separate TTFs."""
+        return self.fonts_size - self.size
+
+
+def shared_tables(fonts: Sequence[Tuple[str, TTFont]]) -> List[SharedTable]:
+    """Find tables with identical bytes in several fonts.
+
+    Args:
+        fonts: (style, lazily opened TTFont) pairs
+
+    Returns:
+        SharedTable list, largest saving first
+    """
+    groups: Dict[Tuple[str, str], SharedTable] = {}
+    for style, font in fonts:
+        for tag in font.reader.keys():
+            data = font.reader[tag]
+            key = (tag, hashlib.sha256(data).hexdigest())
+            group = groups.setdefault(key, SharedTable(tag=tag.strip(), styles=[], size=len(data)))
+            group.styles.append(style)
+    shared = [group for group in groups.values() if len(group.styles) > 1]
+    return sorted(shared, key=lambda group: (-group.saved, group.tag))
+
+
+def write_collection(font_paths: Dict[str, Path], output_path: Path) -> CollectionReport:
+    """Pack built TTFs into one TrueType Collection with shared tables.
+
+    Args:
+        font_paths: Dict mapping style -> TTF path, in collection order
+        output_path: Path of the .ttc to write
+
+    Returns:
+        CollectionReport object
+
+    Raises:
+        ValueError: If no fonts are given
+    """
+    if not font_paths:
+        raise ValueError("No fonts to pack into a collection")
+
+    fonts = [
+        (style, TTFont(str(path), lazy=True, recalcTimestamp=False))
+        for style, path in font_paths.items()
+    ]
+    try:
+        collection = TTCollection()
+        collection.fonts = [font for _, font in fonts]
+        shared = shared_tables(fonts)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        collection.save(str(output_path), shareTables=True)
+    finally:
+        for _, font in fonts:
+            font.close()
+
+    return CollectionReport(
+        path=output_path,
+        size=output_path.stat().st_size,
+        fonts_size=sum(path.stat().st_size for path in font_paths.values()),
+        styles=list(font_paths),
+        shared=shared,
+    )
@@ -0,0 +1,77 @@
+"""Companion fonts: CJK glyphs in a font of their own.
+
+A companion font starts from its base font cut down to ``.notdef`` and the
+space (``companion_base``), which keeps the vertical metrics, OS/2 fields,
+hinting programs and name records of the style. It then goes through the
+normal merge phases with the CJK glyphs it should hold, so its glyphs get
+exactly the same outlines and 2:1 metrics as in a merged font and line up
+with it when used as a fallback.
+
+CJK glyphs over the glyph budget go into a supplementary companion font
+(see budget.py).
+"""
+
+from dataclasses import replace
+from io import BytesIO
+
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
+
+from .config import FontConfig
+from .utils import run_subsetter
+
+# Glyphs a companion font has before any CJK glyph: .notdef and space
+COMPANION_BASE_GLYPHS = 2
+
+
+def companion_base(base_font) -> bytes:
+    """Cut a base font down to .notdef and space.
+
+    Args:
+        base_font: Base font path or file object
+
+    Returns:
+        Compiled TTF bytes, to merge CJK glyphs into
+    """
+    font = TTFont(base_font, recalcTimestamp=False)
+    full_cmaps = [(t.platformID, t.platEncID) for t in font["cmap"].tables if t.format == 12]
+    run_subsetter(
+        font, [0x20], glyph_names=True, name_languages=["*"], name_legacy=True, layout_features=[]
+    )
+
+    # The subsetter drops format 12 subtables left without supplementary
+    # codepoints, and merge_fonts only adds codepoints to existing ones
+    cmap = font["cmap"]
+    bmp_cmap = cmap.getBestCmap() or {}
+    for platform_id, encoding_id in full_cmaps:
+        if cmap.getcmap(platform_id, encoding_id) is None:
+            subtable = CmapSubtable.newSubtable(12)
+            subtable.platformID, subtable.platEncID, subtable.language = platform_id, encoding_id, 0
+            subtable.cmap = dict(bmp_cmap)
+            cmap.tables.append(subtable)
+
+    buffer = BytesIO()
+    font.save(buffer, reorderTables=True)
+    font.close()
+    return buffer.getvalue()
+
+
+def companion_config(config: FontConfig, suffix: str) -> FontConfig:
+    """Get the config of a companion font named ``<family> <suffix>``.
+
+    Checkpoints stay on; the pipeline stores them under
+    ``<suffix>-<style>`` (PhaseContext.checkpoint_name), since a companion
+    font shares its style with the font it accompanies.
+
+    Args:
+        config: FontConfig of the main fonts
+        suffix: Family name suffix (e.g. SUPPLEMENT_SUFFIX)
+
+    Returns:
+        FontConfig object
+    """
+    return replace(
+        config,
+        family_name=f"{config.family_name} {suffix}",
+        family_name_compact=f"{config.family_name_compact}{suffix}",
+    )
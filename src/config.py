@@ -3,6 +3,51 @@
 from dataclasses import dataclass
 from typing import Tuple
 
+# Hinting removal modes (see src/hinting.py)
+HINTING_MODES = ("none", "transformed", "all")
+
+# Orders for imported CJK glyphs (see src/ordering.py)
+GLYPH_ORDERS = ("source", "codepoint", "outline")
+
+# Named phases of the merge pipeline, in run order (see src/pipeline.py)
+PHASES = ("merge", "icons", "center", "hinting", "order", "names")
+
+# Glyph IDs are 16-bit: no font can hold more glyphs than this
+MAX_GLYPHS = 65535
+
+# What to do with CJK glyphs over the glyph budget (see src/budget.py)
+OVERFLOW_MODES = ("error", "drop", "companion")
+
+# How CJK glyphs are ranked when they do not all fit the glyph budget
+BUDGET_PRIORITIES = ("ranges", "frequency", "profile")
+
+# Family name suffix of the supplementary font holding overflow glyphs
+SUPPLEMENT_SUFFIX = "Supplement"
+
+# Output layouts: CJK glyphs merged into every style, or one CJK-only
+# companion font per CN font next to CJK-free styles (see src/fallback.py)
+CJK_LAYOUTS = ("merged", "companion")
+
+# Family name suffix of the CJK-only fonts of the companion layout
+CJK_SUFFIX = "CJK"
+
+# NerdFont icon sets by codepoint range (Nerd Fonts v3 glyph sets in the
+# Private Use Areas; "powerline" matches the default powerline_range)
+NERD_ICON_SETS: Tuple[Tuple[str, Tuple[Tuple[int, int], ...]], ...] = (
+    ("powerline", ((0xE0A0, 0xE0DF),)),
+    ("pomicons", ((0xE000, 0xE00A),)),
+    ("font-awesome-extension", ((0xE200, 0xE2A9),)),
+    ("weather", ((0xE300, 0xE3E3),)),
+    ("seti-ui", ((0xE5FA, 0xE6B7),)),
+    ("devicons", ((0xE700, 0xE8EF),)),
+    ("codicons", ((0xEA60, 0xEC1E),)),
+    ("font-awesome", ((0xED00, 0xF2FF),)),
+    ("font-logos", ((0xF300, 0xF381),)),
+    ("octicons", ((0xF400, 0xF533),)),
+    ("material-design", ((0xF0001, 0xF1AF0),)),
+)
+ICON_SET_NAMES = tuple(name for name, _ in NERD_ICON_SETS)
+
 
 @dataclass
 class FontConfig:
@@ -16,6 +61,48 @@ class FontConfig:
     # CJK visual scale factor (1.0 = no extra scaling, 1.08 = 8% larger)
     visual_scale: float = 1.08
 
+    # TrueType hinting removal: "none", "transformed" (rescaled CJK glyphs
+    # and icons) or "all" (whole font, including fpgm/prep/cvt)
+    strip_hinting: str = "none"
+    # Print before/after size and save time when stripping hinting
+    hinting_report: bool = False
+
+    # Order of imported CJK glyphs: "source", "codepoint" or "outline"
+    glyph_order: str = "source"
+    # Print compressed sizes with source order vs glyph_order
+    glyph_order_report: bool = False
+
+    # Phase checkpoints (see src/checkpoint.py): directory ("" disables),
+    # phases to save after, and the phase to resume from ("" runs all,
+    # "latest" resumes after the last phase with a valid checkpoint)
+    checkpoint_dir: str = ""
+    checkpoint_after: Tuple[str, ...] = ("merge",)
+    from_phase: str = ""
+
+    # Glyph-level cache of transformed glyphs (see src/glyphcache.py):
+    # directory ("" disables)
+    glyph_cache_dir: str = ""
+
+    # Glyph budget (see src/budget.py): maximum glyphs per font, what to do
+    # with CJK glyphs over it ("error", "drop" or "companion") and how to
+    # rank them ("ranges", or "frequency"/"profile" read from budget_file)
+    glyph_budget: int = MAX_GLYPHS
+    glyph_overflow: str = "error"
+    budget_priority: str = "ranges"
+    budget_file: str = ""
+
+    # NerdFont icon sets to keep (ICON_SET_NAMES, see src/iconsets.py);
+    # empty keeps every icon
+    nerd_icon_sets: Tuple[str, ...] = ()
+
+    # Output layout (CJK_LAYOUTS): "companion" builds the styles without
+    # CJK glyphs and the CJK glyphs into CJK-only fonts
+    cjk_layout: str = "merged"
+
+    # Processes compiling glyf/loca when saving (see src/glyfcompile.py);
+    # 1 saves with fontTools' serial compile
+    save_workers: int = 1
+
     # Glyph width configuration (2:1 ratio)
     en_width: int = 600  # English character width
     cn_width: int = 1200  # CJK character width (2x)
@@ -41,3 +128,12 @@ class FontConfig:
         (0x3300, 0x33FF),  # CJK Compatibility
         (0xFE30, 0xFE4F),  # CJK Compatibility Forms
     )
+
+    # NerdFont icon Unicode ranges
+    nerd_ranges: Tuple[Tuple[int, int], ...] = (
+        (0xE000, 0xF8FF),  # Private Use Area
+        (0xF0000, 0xFFFFD),  # Supplementary Private Use Area-A
+    )
+
+    # Powerline symbols range (keep original vertical bounds, no scaling)
+    powerline_range: Tuple[int, int] = (0xE0A0, 0xE0DF)
@@ -0,0 +1,373 @@
+"""Critical font subsets from a site's HTML/Markdown/text corpus.
+
+The split chunks of split.py cover every character, so a page loads
+whichever chunks its text falls into, often dozens of them. For a static
+site whose content is known, one small WOFF2 per style covering exactly
+the characters the site uses is enough for first paint.
+
+Files are scanned in parallel into a codepoint histogram per text style:
+``<b>``/``<strong>``/headings and ``font-weight`` in inline styles count
+as bold, ``<i>``/``<em>`` and ``font-style: italic`` as italic, and
+Markdown headings and ``**``/``*`` emphasis likewise. Each text style is
+mapped to the closest built style, and every style in use gets:
+
+- a critical WOFF2 subset of the codepoints it renders
+- an ``@font-face`` rule with their ``unicode-range``
+
+``critical.css`` imports the split CSS first, so the critical rules,
+declared later, are checked first by browsers; characters outside the
+critical ranges still load from the split chunks. ``preload.html`` holds
+``<link rel="preload">`` hints for the styles most of the text uses.
+"""
+
+import json
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .preview import TextExtractor
+
+# Text files scanned, by suffix
+CORPUS_SUFFIXES = {
+    ".html": "html",
+    ".htm": "html",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".txt": "text",
+}
+
+BOLD_TAGS = {"b", "strong", "th", "h1", "h2", "h3", "h4", "h5", "h6"}
+ITALIC_TAGS = {"i", "em", "cite", "dfn", "var", "address"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+# Text style as (CSS font-weight, italic)
+TextStyle = Tuple[int, bool]
+REGULAR: TextStyle = (400, False)
+
+# Files per worker task
+BATCH_SIZE = 32
+
+_FONT_WEIGHT = re.compile(r"font-weight\s*:\s*([\w-]+)", re.IGNORECASE)
+_FONT_STYLE = re.compile(r"font-style\s*:\s*([\w-]+)", re.IGNORECASE)
+_MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s")
+_MD_FENCE = re.compile(r"^\s{0,3}(```|~~~)")
+_MD_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_MD_HTML_TAG = re.compile(r"<[^>]+>")
+# Code span, or emphasis run (***, **, * and the underscore forms)
+_MD_INLINE = re.compile(r"`([^`]*)`|(\*\*\*|___|\*\*|__|\*|_)(?=\S)(.+?)(?<=\S)\2")
+
+
+def _inline_style(style: str, weight: int, italic: bool) -> TextStyle:
+    """Apply font-weight and font-style of an inline style attribute."""
+    match = _FONT_WEIGHT.search(style)
+    if match:
+        value = match.group(1).lower()
+        if value.isdigit():
+            weight = int(value)
+        elif value in ("bold", "bolder"):
+            weight = 700
+        elif value in ("normal", "lighter"):
+            weight = 400
+    match = _FONT_STYLE.search(style)
+    if match:
+        italic = match.group(1).lower() in ("italic", "oblique")
+    return weight, italic
+
+
+class StyledTextExtractor(TextExtractor):
+    """Counts the visible characters of an HTML page per text style."""
+
+    def __init__(self):
+        super().__init__()
+        self.counts: Dict[TextStyle, Counter] = {}
+        self._stack: List[Tuple[str, int, bool]] = [("", *REGULAR)]
+
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        if tag in VOID_TAGS:
+            return
+        _, weight, italic = self._stack[-1]
+        if tag in BOLD_TAGS:
+            weight = max(weight, 700)
+        if tag in ITALIC_TAGS:
+            italic = True
+        style = dict(attrs).get("style")
+        if style:
+            weight, italic = _inline_style(style, weight, italic)
+        self._stack.append((tag, weight, italic))
+
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        # Close the innermost open element with this tag (and any left unclosed in it)
+        for index in range(len(self._stack) - 1, 0, -1):
+            if self._stack[index][0] == tag:
+                del self._stack[index:]
+                break
+
+    def handle_data(self, data):
+        if not self._skip:
+            _, weight, italic = self._stack[-1]
+            self.counts.setdefault((weight, italic), Counter()).update(data)
+
+
+def _count_markdown_inline(text: str, style: TextStyle, counts: Dict[TextStyle, Counter]) -> None:
+    position = 0
+    for match in _MD_INLINE.finditer(text):
+        counts.setdefault(style, Counter()).update(text[position:match.start()])
+        if match.group(1) is not None:
+            counts.setdefault(style, Counter()).update(match.group(1))
+        else:
+            marker = match.group(2)
+            weight, italic = style
+            if len(marker) >= 2:
+                weight = max(weight, 700)
+            if len(marker) != 2:
+                italic = True
+            _count_markdown_inline(match.group(3), (weight, italic), counts)
+        position = match.end()
+    counts.setdefault(style, Counter()).update(text[position:])
+
+
+def count_markdown(text: str) -> Dict[TextStyle, Counter]:
+    """Count the characters of a Markdown document per text style.
+
+    Headings are bold and emphasis markers set bold/italic; link targets,
+    HTML tags and fence lines are not counted.
+
+    Args:
+        text: Markdown source
+
+    Returns:
+        Dict mapping text style -> character counts
+    """
+    counts: Dict[TextStyle, Counter] = {}
+    in_fence = False
+    for line in text.splitlines():
+        if _MD_FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            counts.setdefault(REGULAR, Counter()).update(line)
+            continue
+        style = (700, False) if _MD_HEADING.match(line) else REGULAR
+        line = _MD_HTML_TAG.sub("", _MD_LINK.sub(r"\1", line))
+        _count_markdown_inline(line, style, counts)
+    return counts
+
+
+def count_file(path: Path) -> Dict[TextStyle, Counter]:
+    """Count the characters of one corpus file per text style."""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    kind = CORPUS_SUFFIXES[path.suffix.lower()]
+    if kind == "html":
+        parser = StyledTextExtractor()
+        parser.feed(text)
+        parser.close()
+        return parser.counts
+    if kind == "markdown":
+        return count_markdown(text)
+    return {REGULAR: Counter(text)}
+
+
+def count_files(paths: Sequence[Path]) -> Dict[TextStyle, Counter]:
+    """Count the characters of several files (one worker task)."""
+    counts: Dict[TextStyle, Counter] = {}
+    for path in paths:
+        for style, file_counts in count_file(path).items():
+            counts.setdefault(style, Counter()).update(file_counts)
+    return counts
+
+
+def corpus_files(site_dir: Path) -> List[Path]:
+    """Find the HTML, Markdown and text files under a directory, sorted."""
+    return sorted(
+        path for path in site_dir.rglob("*")
+        if path.suffix.lower() in CORPUS_SUFFIXES and path.is_file()
+    )
+
+
+def scan_corpus(files: Sequence[Path], parallel: int = 1) -> Dict[TextStyle, Counter]:
+    """Build the codepoint histogram of a corpus per text style.
+
+    Args:
+        files: Files from corpus_files()
+        parallel: Number of worker processes
+
+    Returns:
+        Dict mapping text style -> Counter of codepoints (control
+        characters removed)
+    """
+    batches = [files[i:i + BATCH_SIZE] for i in range(0, len(files), BATCH_SIZE)]
+    if parallel <= 1 or len(batches) <= 1:
+        results = [count_files(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=min(parallel, len(batches))) as executor:
+            results = list(executor.map(count_files, batches))
+
+    histogram: Dict[TextStyle, Counter] = {}
+    for counts in results:
+        for style, style_counts in counts.items():
+            target = histogram.setdefault(style, Counter())
+            for ch, count in style_counts.items():
+                if ord(ch) >= 0x20:
+                    target[ord(ch)] += count
+    return histogram
+
+
+def style_descriptors(style: str) -> TextStyle:
+    """Get the CSS font-weight and italic flag of a style name."""
+    weight = 700 if "Bold" in style else 500 if "Medium" in style else 400
+    return weight, "Italic" in style
+
+
+def closest_style(text_style: TextStyle, styles: Sequence[str]) -> str:
+    """Pick the built style that renders a text style.
+
+    Italic must match if possible; among those, the nearest weight wins.
+
+    Args:
+        text_style: (font-weight, italic) of the text
+        styles: Built styles
+
+    Returns:
+        Style name
+    """
+    weight, italic = text_style
+
+    def distance(style: str) -> Tuple[bool, int]:
+        style_weight, style_italic = style_descriptors(style)
+        return style_italic != italic, abs(style_weight - weight)
+
+    return min(styles, key=distance)
+
+
+def style_histograms(histogram: Dict[TextStyle, Counter], styles: Sequence[str]) -> Dict[str, Counter]:
+    """Merge the text-style histograms into one per built style."""
+    per_style: Dict[str, Counter] = {}
+    for text_style in sorted(histogram):
+        per_style.setdefault(closest_style(text_style, styles), Counter()).update(histogram[text_style])
+    return per_style
+
+
+def unicode_range(codepoints: Iterable[int]) -> str:
+    """Format codepoints as a CSS unicode-range value with merged runs."""
+    runs: List[List[int]] = []
+    for codepoint in sorted(codepoints):
+        if runs and codepoint == runs[-1][1] + 1:
+            runs[-1][1] = codepoint
+        else:
+            runs.append([codepoint, codepoint])
+    return ", ".join(
+        f"U+{start:X}" if start == end else f"U+{start:X}-{end:X}"
+        for start, end in runs
+    )
+
+
+@dataclass
+class CriticalSubset:
+    """A critical WOFF2 subset written for one style."""
+
+    style: str
+    filename: str
+    codepoints: int
+    characters: int
+    share: float
+    size: int
+    preload: bool
+
+
+def write_critical_subsets(
+    histograms: Dict[str, Counter],
+    fonts: Dict[str, Path],
+    family_name: str,
+    output_dir: Path,
+    fallback_css: Optional[str] = "../split/all.css",
+    url_prefix: str = "",
+    preload_share: float = 0.05,
+) -> List[CriticalSubset]:
+    """Write the critical subsets, critical.css, preload.html and critical.json.
+
+    Args:
+        histograms: Codepoint counts per built style (style_histograms())
+        fonts: Dict mapping style -> built TTF path
+        family_name: CSS font-family name
+        output_dir: Output directory
+        fallback_css: URL of the split CSS imported before the critical
+            rules, relative to critical.css (None or "" for no fallback)
+        url_prefix: Prefix of the subset URLs in preload.html
+        preload_share: Minimum share of all characters a style must render
+            to get a preload hint
+
+    Returns:
+        CriticalSubset list, most used style first
+    """
+    from fontTools.ttLib import TTFont
+
+    from .subset_service import subset_to_woff2
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    total = sum(sum(counts.values()) for counts in histograms.values()) or 1
+    subsets: List[CriticalSubset] = []
+    rules: List[str] = []
+    ordered = sorted(histograms.items(), key=lambda item: -sum(item[1].values()))
+    for style, counts in ordered:
+        font_path = fonts[style]
+        font_data = font_path.read_bytes()
+        font = TTFont(font_path, lazy=True)
+        cmap = font["cmap"].getBestCmap() or {}
+        font.close()
+        # Characters the font lacks are left to the fallback fonts
+        codepoints = sorted((set(counts) | {0x20}) & set(cmap))
+        data = subset_to_woff2(font_data, codepoints)
+        filename = f"{font_path.stem}.woff2"
+        (output_dir / filename).write_bytes(data)
+
+        characters = sum(counts.values())
+        subset = CriticalSubset(
+            style=style,
+            filename=filename,
+            codepoints=len(codepoints),
+            characters=characters,
+            share=characters / total,
+            size=len(data),
+            preload=characters / total >= preload_share,
+        )
+        subsets.append(subset)
+
+        weight, italic = style_descriptors(style)
+        rules.append(
+            f"/* {style}: {len(codepoints)} codepoints used by the site ({len(data) / 1024:.1f} KB) */\n"
+            "@font-face {\n"
+            f'  font-family: "{family_name}";\n'
+            f'  src: url("{filename}") format("woff2");\n'
+            f"  font-weight: {weight};\n"
+            f"  font-style: {'italic' if italic else 'normal'};\n"
+            "  font-display: swap;\n"
+            f"  unicode-range: {unicode_range(codepoints)};\n"
+            "}\n"
+        )
+
+    # Later rules are checked first, so the split chunks only serve the rest
+    header = f'@import url("{fallback_css}");\n\n' if fallback_css else ""
+    (output_dir / "critical.css").write_text(header + "\n".join(rules), encoding="utf-8")
+    (output_dir / "preload.html").write_text(
+        "".join(
+            f'<link rel="preload" href="{url_prefix}{subset.filename}" as="font" type="font/woff2" crossorigin>\n'
+            for subset in subsets
+            if subset.preload
+        ),
+        encoding="utf-8",
+    )
+    with open(output_dir / "critical.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "family_name": family_name,
+            "fallback_css": fallback_css or None,
+            "subsets": [asdict(subset) for subset in subsets],
+        }, f, indent=2)
+    return subsets
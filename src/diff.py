@@ -0,0 +1,210 @@
+"""Glyph-level diff of built fonts using compiled-glyph hashing.
+
+Each codepoint is hashed from the compiled glyf bytes of its glyph plus its
+hmtx entry, read straight from the raw tables without decompiling outlines.
+Comparing two fonts is then a dictionary diff, grouped by glyph class
+(cjk, nerd, powerline, latin, other).
+"""
+
+import hashlib
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+
+from .config import FontConfig
+from .utils import classify_codepoint
+
+GLYPH_CLASSES = ("cjk", "nerd", "powerline", "latin", "other")
+
+
+class _GlyphNames:
+    """Minimal glyf-table stand-in so composite glyphs can be expanded."""
+
+    def __init__(self, glyph_order: List[str]):
+        self.glyph_order = glyph_order
+
+    def getGlyphName(self, glyph_id: int) -> str:
+        return self.glyph_order[glyph_id]
+
+
+def _glyph_digest(data: bytes, names: _GlyphNames) -> bytes:
+    """Hash compiled glyph data, independent of padding and glyph IDs."""
+    if not data:
+        return b""
+    glyph = Glyph(data)
+    if glyph.isComposite():
+        # Component references are glyph IDs; hash names instead so a
+        # reordered glyph order does not show up as a change
+        glyph.expand(names)
+        parts = [
+            (c.glyphName, c.x, c.y, getattr(c, "transform", None), c.flags)
+            for c in glyph.components
+        ]
+        program = glyph.program.getBytecode() if hasattr(glyph, "program") else b""
+        return hashlib.blake2b(repr(parts).encode() + program, digest_size=16).digest()
+    glyph.trim()
+    return hashlib.blake2b(glyph.data, digest_size=16).digest()
+
+
+def hash_font_glyphs(font_path: str) -> Dict[int, bytes]:
+    """Hash the glyph of every mapped codepoint of a font.
+
+    Args:
+        font_path: Path to a TTF
+
+    Returns:
+        Dict mapping codepoint -> digest of glyph bytes and hmtx entry
+    """
+    font = TTFont(font_path, lazy=True)
+    glyph_order = font.getGlyphOrder()
+    names = _GlyphNames(glyph_order)
+    glyph_ids = {name: gid for gid, name in enumerate(glyph_order)}
+    glyf_data = font.reader["glyf"]
+    loca = font["loca"]
+    hmtx = font["hmtx"].metrics
+
+    glyph_digests: Dict[str, bytes] = {}
+    result = {}
+    for codepoint, glyph_name in (font.getBestCmap() or {}).items():
+        digest = glyph_digests.get(glyph_name)
+        if digest is None:
+            gid = glyph_ids[glyph_name]
+            data = glyf_data[loca[gid]:loca[gid + 1]]
+            advance, lsb = hmtx[glyph_name]
+            digest = _glyph_digest(data, names) + struct.pack(">Hh", advance, lsb)
+            glyph_digests[glyph_name] = digest
+        result[codepoint] = digest
+    font.close()
+    return result
+
+
+@dataclass
+class FontDiff:
+    """Added, removed and changed codepoints between two fonts, by class."""
+
+    old_path: str
+    new_path: str
+    added: Dict[str, List[int]] = field(default_factory=dict)
+    removed: Dict[str, List[int]] = field(default_factory=dict)
+    changed: Dict[str, List[int]] = field(default_factory=dict)
+    unchanged: int = 0
+
+    @property
+    def identical(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def to_dict(self) -> dict:
+        def fmt(groups: Dict[str, List[int]]) -> Dict[str, List[str]]:
+            return {cls: [f"U+{cp:04X}" for cp in cps] for cls, cps in groups.items()}
+
+        return {
+            "old": self.old_path,
+            "new": self.new_path,
+            "unchanged": self.unchanged,
+            "added": fmt(self.added),
+            "removed": fmt(self.removed),
+            "changed": fmt(self.changed),
+        }
+
+
+def diff_hashes(
+    old_hashes: Dict[int, bytes],
+    new_hashes: Dict[int, bytes],
+    config: FontConfig,
+    old_path: str = "",
+    new_path: str = "",
+) -> FontDiff:
+    """Compare two codepoint -> digest maps.
+
+    Args:
+        old_hashes: Digests of the old font
+        new_hashes: Digests of the new font
+        config: FontConfig with the ranges used to classify codepoints
+        old_path: Old font path (for reporting)
+        new_path: New font path (for reporting)
+
+    Returns:
+        FontDiff object
+    """
+    result = FontDiff(old_path=old_path, new_path=new_path)
+
+    def add(groups: Dict[str, List[int]], codepoint: int) -> None:
+        groups.setdefault(classify_codepoint(codepoint, config), []).append(codepoint)
+
+    for codepoint in sorted(old_hashes.keys() | new_hashes.keys()):
+        old = old_hashes.get(codepoint)
+        new = new_hashes.get(codepoint)
+        if old is None:
+            add(result.added, codepoint)
+        elif new is None:
+            add(result.removed, codepoint)
+        elif old != new:
+            add(result.changed, codepoint)
+        else:
+            result.unchanged += 1
+    return result
+
+
+def _diff_pair(old_path: str, new_path: str, config: FontConfig) -> FontDiff:
+    return diff_hashes(
+        hash_font_glyphs(old_path), hash_font_glyphs(new_path), config, old_path, new_path
+    )
+
+
+def pair_fonts(old: Path, new: Path) -> List[Tuple[Path, Path]]:
+    """Pair fonts to compare: two files, or same-named TTFs in two directories.
+
+    Args:
+        old: Old TTF or directory
+        new: New TTF or directory
+
+    Returns:
+        List of (old_path, new_path) pairs
+
+    Raises:
+        ValueError: If the arguments mix files and directories or nothing matches
+    """
+    if old.is_file() and new.is_file():
+        return [(old, new)]
+    if old.is_dir() and new.is_dir():
+        old_fonts = {p.name: p for p in old.glob("*.ttf")}
+        new_fonts = {p.name: p for p in new.glob("*.ttf")}
+        common = sorted(old_fonts.keys() & new_fonts.keys())
+        if not common:
+            raise ValueError(f"No matching .ttf files in {old} and {new}")
+        return [(old_fonts[name], new_fonts[name]) for name in common]
+    raise ValueError("Compare either two font files or two directories")
+
+
+def diff_fonts(
+    pairs: List[Tuple[Path, Path]],
+    config: FontConfig,
+    parallel: int = 1,
+) -> Iterator[FontDiff]:
+    """Diff font pairs, yielding each result as soon as it is ready.
+
+    Args:
+        pairs: (old_path, new_path) pairs
+        config: FontConfig object
+        parallel: Number of worker processes
+
+    Yields:
+        FontDiff objects (in completion order when parallel)
+    """
+    if parallel <= 1 or len(pairs) <= 1:
+        for old_path, new_path in pairs:
+            yield _diff_pair(str(old_path), str(new_path), config)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(parallel, len(pairs))) as executor:
+        futures = [
+            executor.submit(_diff_pair, str(old_path), str(new_path), config)
+            for old_path, new_path in pairs
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,130 @@
+"""Three-stage pipelined executor: prefetch -> transform -> save.
+
+Items flow through three stages that overlap across items:
+
+- prefetch (background thread): read the next item's inputs while the
+  current item transforms
+- transform (calling thread): the main work on each item
+- save (background thread): serialise and write the previous item's
+  result while the next one transforms
+
+At most ``max_inflight`` transformed results exist at once (the one
+being transformed included), so memory stays bounded however many items
+there are. Per-stage busy time is recorded for utilisation reports.
+
+Stages share one interpreter: file reads and writes (and zlib/brotli)
+release the GIL and truly overlap, while pure-Python work in two stages
+interleaves rather than running in parallel.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+STAGES = ("prefetch", "transform", "save")
+
+
+@dataclass
+class StageStats:
+    """Busy time of one stage."""
+
+    busy: float = 0.0
+    items: int = 0
+
+
+@dataclass
+class PipelineStats:
+    """Busy time per stage and total wall time of a pipelined run."""
+
+    wall: float = 0.0
+    stages: Dict[str, StageStats] = field(default_factory=lambda: {name: StageStats() for name in STAGES})
+
+    def utilisation(self, stage: str) -> float:
+        """Fraction of the wall time a stage was busy."""
+        return self.stages[stage].busy / self.wall if self.wall else 0.0
+
+    @property
+    def serial_time(self) -> float:
+        """Time the same work would take with no overlap."""
+        return sum(stats.busy for stats in self.stages.values())
+
+
+def run_pipelined(
+    items: Sequence[T],
+    prefetch: Callable[[T], Any],
+    transform: Callable[[T, Any], Any],
+    save: Callable[[T, Any], Any],
+    max_inflight: int = 2,
+) -> Tuple[List[Any], PipelineStats]:
+    """Run items through prefetch, transform and save with overlapping stages.
+
+    Args:
+        items: Work items, processed in order
+        prefetch: Reads an item's inputs (background thread)
+        transform: Turns an item and its prefetched inputs into a result
+            (calling thread)
+        save: Serialises and writes a result, returning the item's final
+            value (background thread)
+        max_inflight: Maximum transformed results alive at once (>= 1)
+
+    Returns:
+        Tuple of (save() return values in item order, PipelineStats)
+
+    Raises:
+        Exception: The first error raised by any stage
+    """
+    if max_inflight < 1:
+        raise ValueError(f"max_inflight must be at least 1, got {max_inflight}")
+
+    stats = PipelineStats()
+    lock = threading.Lock()
+
+    def timed(stage: str, function: Callable, *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            with lock:
+                stats.stages[stage].busy += time.perf_counter() - start
+                stats.stages[stage].items += 1
+
+    slots = threading.Semaphore(max_inflight)
+
+    def save_and_release(item: T, result: Any) -> Any:
+        try:
+            return timed("save", save, item, result)
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    saves: List[Future] = []
+    with ThreadPoolExecutor(1, thread_name_prefix="prefetch") as reader, \
+            ThreadPoolExecutor(1, thread_name_prefix="save") as writer:
+        prefetched = reader.submit(timed, "prefetch", prefetch, items[0]) if items else None
+        for index, item in enumerate(items):
+            inputs = prefetched.result()
+            # Read the next item's inputs while this one transforms
+            if index + 1 < len(items):
+                prefetched = reader.submit(timed, "prefetch", prefetch, items[index + 1])
+
+            # Wait for a free slot: bounds the results waiting to be saved
+            slots.acquire()
+            for future in saves:
+                if future.done() and future.exception() is not None:
+                    slots.release()
+                    raise future.exception()
+            try:
+                result = timed("transform", transform, item, inputs)
+            except BaseException:
+                slots.release()
+                raise
+            saves.append(writer.submit(save_and_release, item, result))
+            del result, inputs
+
+        results = [future.result() for future in saves]
+    stats.wall = time.perf_counter() - start
+    return results, stats
@@ -0,0 +1,111 @@
+"""Font fallback snippets for the companion layout.
+
+With ``cjk_layout: companion`` every style is built without CJK glyphs,
+and the CJK glyphs go into one CJK-only font per CN font, named
+``<family> CJK`` after the first style of the config using that CN font
+(see plan.py). The four styles built from LXGW WenKai share one CJK font
+instead of storing its glyphs four times. Text renders the same as with
+merged fonts when the CJK font is set up as the fallback of the family:
+
+- ``50-<family>.conf``: a fontconfig rule appending the CJK family after
+  the main family, for Linux desktops and terminals. fontconfig picks the
+  CJK font closest in weight and slant, e.g. ``CJK-Regular`` for Medium
+  and ``CJK-Bold`` for Bold Italic.
+- ``<family>-fallback.css``: ``@font-face`` rules for both families and a
+  ``--<family>-font-family`` custom property with the fallback stack.
+  The CJK family gets one rule per style, pointing at the CJK font that
+  style was built with, limited to the CJK ranges with
+  ``unicode-range``; styles sharing a CJK font share its URL, so it is
+  downloaded once.
+
+Both fonts have the same vertical metrics and the 2:1 widths (see
+companion.py), so fallback text stays on the monospace grid.
+"""
+
+from pathlib import Path
+from typing import List
+
+from .config import CJK_SUFFIX
+from .critical import style_descriptors
+from .plan import BuildPlan
+
+
+def fontconfig_snippet(plan: BuildPlan) -> str:
+    """Get a fontconfig file making the CJK family the fallback of the main family."""
+    family = plan.config.family_name
+    cjk_family = f"{family} {CJK_SUFFIX}"
+    return (
+        '<?xml version="1.0"?>\n'
+        '<!DOCTYPE fontconfig SYSTEM "urn:fontconfig:fonts.dtd">\n'
+        f"<!-- {family}: CJK text falls back to {cjk_family}.\n"
+        f"     Install with the fonts as ~/.config/fontconfig/conf.d/{plan.fontconfig_path.name} -->\n"
+        "<fontconfig>\n"
+        '  <match target="pattern">\n'
+        '    <test name="family" qual="any">\n'
+        f"      <string>{family}</string>\n"
+        "    </test>\n"
+        '    <edit name="family" mode="append" binding="strong">\n'
+        f"      <string>{cjk_family}</string>\n"
+        "    </edit>\n"
+        "  </match>\n"
+        "</fontconfig>\n"
+    )
+
+
+def css_snippet(plan: BuildPlan) -> str:
+    """Get @font-face rules for the styles and their CJK fonts, with the fallback stack.
+
+    Font URLs are relative to the CSS file, which sits next to the fonts.
+    """
+    family = plan.config.family_name
+    cjk_family = f"{family} {CJK_SUFFIX}"
+    cjk_ranges = ", ".join(
+        f"U+{start:X}" if start == end else f"U+{start:X}-{end:X}" for start, end in plan.config.cjk_ranges
+    )
+
+    def font_face(font_family: str, path: Path, style: str, extra: str = "") -> str:
+        weight, italic = style_descriptors(style)
+        return (
+            "@font-face {\n"
+            f'  font-family: "{font_family}";\n'
+            f'  src: url("{path.name}") format("truetype");\n'
+            f"  font-weight: {weight};\n"
+            f"  font-style: {'italic' if italic else 'normal'};\n"
+            "  font-display: swap;\n"
+            f"{extra}"
+            "}\n"
+        )
+
+    rules = [
+        f"/* {family} with CJK text from {cjk_family} (cjk_layout: companion) */\n"
+        ":root {\n"
+        f'  --{plan.config.family_name_compact}-font-family: "{family}", "{cjk_family}", monospace;\n'
+        "}\n"
+    ]
+    for style_plan in plan.styles:
+        rules.append(font_face(family, plan.output_path(style_plan.style), style_plan.style))
+    for style_plan in plan.styles:
+        rules.append(
+            f"/* {style_plan.style}: CJK glyphs of {style_plan.cn_font_path.name} */\n"
+            + font_face(
+                cjk_family,
+                plan.cjk_path(style_plan.cjk_style),
+                style_plan.style,
+                f"  unicode-range: {cjk_ranges};\n",
+            )
+        )
+    return "\n".join(rules)
+
+
+def write_fallback_snippets(plan: BuildPlan) -> List[Path]:
+    """Write the fontconfig and CSS fallback snippets next to the fonts.
+
+    Args:
+        plan: BuildPlan object in the companion layout
+
+    Returns:
+        Paths of the written files
+    """
+    plan.fontconfig_path.write_text(fontconfig_snippet(plan), encoding="utf-8")
+    plan.fallback_css_path.write_text(css_snippet(plan), encoding="utf-8")
+    return [plan.fontconfig_path, plan.fallback_css_path]
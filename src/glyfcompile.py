@@ -0,0 +1,217 @@
+"""Parallel glyf/loca compilation for saving merged fonts.
+
+With ``recalcBBoxes`` on (the default), ``TTFont.save`` expands and
+recompiles every glyph of ``glyf`` on one core, then walks all glyphs
+again for the ``maxp``, ``head`` and ``hhea`` fields that depend on their
+bounds. For a merged font with 30k+ glyphs that is one of the slowest
+steps of a build, and it runs after the per-style parallelism is over.
+
+``save_font_parallel`` compiles simple glyphs in contiguous chunks across
+processes, each worker returning the compiled bytes and the bounds and
+point counts of its glyphs. The parent installs the compiled glyphs,
+compiles the (few) composite glyphs itself, since their bounds depend on
+their components, and sets the dependent fields exactly like
+``maxp.recalc`` and ``hhea.recalc`` would. The font is then saved with
+``recalcBBoxes`` off, so ``glyf.compile`` only concatenates and pads the
+compiled glyphs and builds ``loca`` as usual. Output is byte-identical to
+the serial save.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from fontTools import ttLib
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import Glyph, table__g_l_y_f
+
+# Below this many glyphs per worker, process start-up costs more than it saves
+MIN_GLYPHS_PER_WORKER = 2000
+# Chunks per worker, so a slow chunk does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+# numberOfContours, xMin, yMin, xMax, yMax, points, contours
+GlyphStats = Tuple[int, int, int, int, int, int, int]
+
+
+@dataclass
+class GlyfCompileStats:
+    """How a font's glyphs were compiled."""
+
+    glyphs: int
+    composites: int
+    workers: int
+    seconds: float
+
+    def summary(self) -> str:
+        return (
+            f"Compiled {self.glyphs} glyphs on {self.workers} workers "
+            f"({self.composites} composites in parent) in {self.seconds:.2f}s"
+        )
+
+
+def _compile_chunk(glyphs: List[Optional[Glyph]], optimize_size: bool) -> List[Optional[Tuple[bytes, GlyphStats]]]:
+    """Compile simple glyphs in a worker (None entries are composites, skipped).
+
+    Returns:
+        (compiled bytes, stats) per glyph, None for skipped entries
+    """
+    # Simple glyphs only need a glyf table to be passed around, not its contents
+    glyf = table__g_l_y_f()
+    results: List[Optional[Tuple[bytes, GlyphStats]]] = []
+    for glyph in glyphs:
+        if glyph is None:
+            results.append(None)
+            continue
+        data = glyph.compile(glyf, True, boundsDone=set(), optimizeSize=optimize_size)
+        results.append((data, _glyph_stats(glyph)))
+    return results
+
+
+def _glyph_stats(glyph: Glyph) -> GlyphStats:
+    if not glyph.numberOfContours:
+        return 0, 0, 0, 0, 0, 0, 0
+    points, contours = glyph.getMaxpValues() if glyph.numberOfContours > 0 else (0, 0)
+    return glyph.numberOfContours, glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax, points, contours
+
+
+def can_compile_parallel(font: TTFont) -> bool:
+    """Whether save_font_parallel can handle a font.
+
+    Fonts without a loaded glyf table, saved without recalcBBoxes, or with
+    vertical metrics (vhea also depends on glyph bounds) are saved serially.
+    """
+    return (
+        font.recalcBBoxes
+        and "glyf" in font
+        and font.isLoaded("glyf")
+        and "vhea" not in font
+    )
+
+
+def compile_glyphs_parallel(font: TTFont, workers: int) -> GlyfCompileStats:
+    """Compile all glyphs across processes and set the fields that depend on them.
+
+    Every glyph of the font is replaced by its compiled form, and the
+    maxp, head (bounding box and flags bit 1) and hhea fields recalculated
+    on save are set. The font must then be saved with recalcBBoxes off.
+
+    Args:
+        font: Font to compile (see can_compile_parallel)
+        workers: Number of worker processes
+
+    Returns:
+        GlyfCompileStats object
+    """
+    start = time.perf_counter()
+    glyf = font["glyf"]
+    glyph_order = font.getGlyphOrder()
+    optimize_size = not font.cfg[ttLib.OPTIMIZE_FONT_SPEED]
+
+    composites = [glyph_name for glyph_name in glyph_order if glyf.glyphs[glyph_name].isComposite()]
+    composite_set = set(composites)
+    simple = [None if name in composite_set else glyf.glyphs[name] for name in glyph_order]
+
+    chunk_size = max(1, -(-len(glyph_order) // (workers * CHUNKS_PER_WORKER)))
+    chunks = [simple[i:i + chunk_size] for i in range(0, len(simple), chunk_size)]
+    results: List[Optional[Tuple[bytes, GlyphStats]]] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_compile_chunk, chunks, [optimize_size] * len(chunks)):
+            results.extend(chunk_results)
+
+    stats: Dict[str, GlyphStats] = {}
+    for glyph_name, result in zip(glyph_order, results):
+        if result is not None:
+            data, stats[glyph_name] = result
+            glyf.glyphs[glyph_name] = Glyph(data)
+
+    # Composite bounds come from their components, compiled above
+    bounds_done = set()
+    composite_maxp = [0, 0, 0, 0]
+    for glyph_name in composites:
+        glyph = glyf[glyph_name]
+        data = glyph.compile(glyf, True, boundsDone=bounds_done, optimizeSize=optimize_size)
+        points, contours, depth = glyph.getCompositeMaxpValues(glyf)
+        stats[glyph_name] = (glyph.numberOfContours, glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax, 0, 0)
+        for index, value in enumerate((points, contours, len(glyph.components), depth)):
+            composite_maxp[index] = max(composite_maxp[index], value)
+        glyf.glyphs[glyph_name] = Glyph(data)
+
+    maxp = font["maxp"]
+    (maxp.maxCompositePoints, maxp.maxCompositeContours,
+     maxp.maxComponentElements, maxp.maxComponentDepth) = composite_maxp
+    _set_recalculated_fields(font, glyph_order, stats)
+    return GlyfCompileStats(len(glyph_order), len(composites), workers, time.perf_counter() - start)
+
+
+def _set_recalculated_fields(font: TTFont, glyph_order: List[str], stats: Dict[str, GlyphStats]) -> None:
+    """Set what maxp.recalc and hhea.recalc compute on a serial save."""
+    maxp, head, hmtx = font["maxp"], font["head"], font["hmtx"]
+    infinity = 100000
+    x_min = y_min = +infinity
+    x_max = y_max = -infinity
+    max_points = max_contours = 0
+    all_xmin_is_lsb = True
+    widths = {}
+    for glyph_name in glyph_order:
+        contour_count, g_x_min, g_y_min, g_x_max, g_y_max, points, contours = stats[glyph_name]
+        if not contour_count:
+            continue
+        if hmtx[glyph_name][1] != g_x_min:
+            all_xmin_is_lsb = False
+        x_min, y_min = min(x_min, g_x_min), min(y_min, g_y_min)
+        x_max, y_max = max(x_max, g_x_max), max(y_max, g_y_max)
+        if contour_count > 0:
+            max_points, max_contours = max(max_points, points), max(max_contours, contours)
+        widths[glyph_name] = g_x_max - g_x_min
+
+    if x_min == +infinity:
+        head.xMin = head.yMin = head.xMax = head.yMax = 0
+    else:
+        head.xMin, head.yMin, head.xMax, head.yMax = x_min, y_min, x_max, y_max
+    if all_xmin_is_lsb:
+        head.flags = head.flags | 0x2
+    else:
+        head.flags = head.flags & ~0x2
+    maxp.maxPoints, maxp.maxContours = max_points, max_contours
+
+    if "hhea" not in font:
+        return
+    hhea = font["hhea"]
+    hhea.advanceWidthMax = max(advance for advance, _ in hmtx.metrics.values())
+    if widths:
+        lsbs = [hmtx[glyph_name][1] for glyph_name in widths]
+        hhea.minLeftSideBearing = min(lsbs)
+        hhea.minRightSideBearing = min(
+            hmtx[glyph_name][0] - hmtx[glyph_name][1] - width for glyph_name, width in widths.items()
+        )
+        hhea.xMaxExtent = max(hmtx[glyph_name][1] + width for glyph_name, width in widths.items())
+    else:
+        hhea.minLeftSideBearing = hhea.minRightSideBearing = hhea.xMaxExtent = 0
+
+
+def save_font_parallel(font: TTFont, file: Union[str, BinaryIO], workers: int) -> Optional[GlyfCompileStats]:
+    """Save a font (sorted tables), compiling glyf across processes when worth it.
+
+    Args:
+        font: Font to save
+        file: Output path or file object
+        workers: Number of worker processes (1 saves serially)
+
+    Returns:
+        GlyfCompileStats object, or None if the font was saved serially
+    """
+    glyph_count = len(font.getGlyphOrder())
+    workers = min(workers, glyph_count // MIN_GLYPHS_PER_WORKER)
+    if workers <= 1 or not can_compile_parallel(font):
+        font.save(file, reorderTables=True)
+        return None
+
+    stats = compile_glyphs_parallel(font, workers)
+    font.recalcBBoxes = False
+    try:
+        font.save(file, reorderTables=True)
+    finally:
+        font.recalcBBoxes = True
+    return stats
@@ -0,0 +1,322 @@
+"""Glyph-level cache of transformed glyphs for incremental rebuilds.
+
+``merge_fonts``, ``scale_nerd_icons`` and ``center_cjk_glyphs`` transform
+glyphs one at a time, and each result depends only on the input glyph,
+its metrics, a few per-glyph inputs (Powerline or not, punctuation side)
+and the transform parameters. The cache stores every transformed glyph,
+compiled, together with its metrics, under a key made of:
+
+- a digest of the input glyph: its compiled bytes, its snapshot record,
+  or the key of the cached transform that produced it
+- its metrics and per-glyph inputs
+- the transform parameters, the source code of the transform and the
+  fontTools version
+
+When a source font gets a point release, only glyphs whose source data
+changed miss the cache; every other glyph is installed from the cache
+without being decompiled or transformed. Results are identical to an
+uncached build: cached glyphs hold the rounded coordinates the final
+save would write, and later transforms only move glyphs by whole units.
+
+Entries live in immutable segment files written atomically, so parallel
+processes and hosts sharing the directory never see partial data. Each
+build appends one segment with its new entries; once there are
+``MAX_SEGMENTS`` segments they are compacted into one.
+
+Every entry belongs to the scope (transform, parameters, code) that made
+it, and each segment lists the scopes its build used. Compaction keeps
+only the entries of scopes used by the build compacting or by a build
+that wrote one of the segments since the last compaction, so entries
+left behind by changed parameters, transform code or fontTools versions
+are dropped, as are segments from older cache versions.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import fontTools
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+
+from .checkpoint import code_fingerprint
+from .snapshot import FontSnapshot
+
+SEGMENT_MAGIC = b"JLNMGLC2"
+SEGMENT_SUFFIX = ".glyphs"
+# Bumped whenever the segment layout or key derivation changes
+CACHE_VERSION = 2
+MAX_SEGMENTS = 16
+
+# How a transform treated a glyph; kept so cached builds print the same counts
+OUTCOMES = ("merged", "scaled", "powerline", "centered", "paired", "skipped", "unchanged")
+
+# Scope table: count, then per scope its prefix and whether the build used it
+SCOPE_COUNT = struct.Struct("<I")
+SCOPE = struct.Struct("<32s?")
+# key, scope index, outcome index, advance, lsb, data length (NO_DATA: glyph left as is)
+RECORD = struct.Struct("<32sIBiiI")
+NO_DATA = 0xFFFFFFFF
+
+
+@dataclass
+class CachedGlyph:
+    """A transformed glyph as stored in the cache."""
+
+    outcome: str
+    # Compiled glyph, or None if the transform left the glyph unchanged
+    data: Optional[bytes]
+    advance: int
+    lsb: int
+    # CacheScope.prefix of the transform that made it
+    scope: bytes
+
+
+class CacheScope:
+    """Keys, lookups and hit/miss counts of one transform in one build.
+
+    Args:
+        cache: GlyphCache the scope belongs to
+        prefix: Digest of the transform name, parameters and code
+    """
+
+    def __init__(self, cache: "GlyphCache", prefix: bytes):
+        self.cache = cache
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, glyph_digest: Optional[bytes], *fields: Any) -> Optional[bytes]:
+        """Get the key of a glyph, or None if its input cannot be identified.
+
+        Args:
+            glyph_digest: GlyphCache.digest() of the input glyph
+            fields: Metrics and per-glyph inputs (JSON-serialisable)
+        """
+        if glyph_digest is None:
+            return None
+        digest = hashlib.sha256(self.prefix)
+        digest.update(glyph_digest)
+        digest.update(json.dumps(fields).encode("utf-8"))
+        return digest.digest()
+
+    def get(self, key: Optional[bytes]) -> Optional[CachedGlyph]:
+        """Look up a key, counting the hit or miss."""
+        cached = self.cache.entries.get(key) if key is not None else None
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def apply(self, font: TTFont, glyph_name: str, key: bytes, cached: CachedGlyph) -> None:
+        """Install a cached result into a font (glyph stays compiled until used)."""
+        if cached.data is None:
+            return
+        font["glyf"].glyphs[glyph_name] = Glyph(cached.data)
+        font["hmtx"].metrics[glyph_name] = (cached.advance, cached.lsb)
+        self.cache.digests[glyph_name] = key
+
+    def put(self, key: Optional[bytes], font: TTFont, glyph_name: str, outcome: str, changed: bool = True) -> None:
+        """Store the result of transforming a glyph.
+
+        Args:
+            key: Key from key() (nothing is stored if None)
+            font: Font holding the transformed glyph
+            glyph_name: Glyph name
+            outcome: One of OUTCOMES
+            changed: Whether the transform changed the glyph or its metrics
+        """
+        if key is None:
+            return
+        if not changed:
+            self.cache.add(key, CachedGlyph(outcome, None, 0, 0, self.prefix))
+            return
+        glyf = font["glyf"]
+        # Stored bounds are kept as they are, like in the transformed font
+        data = glyf.glyphs[glyph_name].compile(glyf, recalcBBoxes=False)
+        advance, lsb = font["hmtx"][glyph_name]
+        self.cache.add(key, CachedGlyph(outcome, data, advance, lsb, self.prefix))
+        self.cache.digests[glyph_name] = key
+
+    def report(self) -> str:
+        """One-line hit/miss summary."""
+        return f"Glyph cache: {self.hits} hits, {self.misses} misses"
+
+
+class GlyphCache:
+    """Directory of cached transformed glyphs.
+
+    One instance is used per style build: it also tracks the digests of
+    glyphs produced by cached transforms, so a later transform can key
+    its input by how it was made instead of recompiling it.
+
+    Args:
+        directory: Cache directory (created on close if there is anything to write)
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.entries: Dict[bytes, CachedGlyph] = {}
+        self.digests: Dict[str, bytes] = {}
+        self._segments: List[Path] = []
+        # Segments of other cache versions, removed on compaction
+        self._stale: List[Path] = []
+        # Scopes used by the builds that wrote the loaded segments, and by this one
+        self._used_scopes: Set[bytes] = set()
+        self._scopes: Set[bytes] = set()
+        self._new: Dict[bytes, CachedGlyph] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.directory.is_dir():
+            return
+        for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                # Compacted away by a concurrent build
+                continue
+            if data[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                self._stale.append(path)
+                continue
+            entries, used_scopes = _parse_segment(data)
+            self.entries.update(entries)
+            self._used_scopes.update(used_scopes)
+            self._segments.append(path)
+
+    def scope(self, transform: str, functions: Tuple[Callable, ...], params: Dict[str, Any]) -> CacheScope:
+        """Start caching one transform.
+
+        Args:
+            transform: Transform name
+            functions: Functions whose source is part of every key
+            params: Transform parameters (JSON-serialisable)
+
+        Returns:
+            CacheScope object
+        """
+        prefix = json.dumps({
+            "cache_version": CACHE_VERSION,
+            "fonttools": fontTools.version,
+            "transform": transform,
+            "params": params,
+            "code": code_fingerprint(functions),
+        }, sort_keys=True, default=str)
+        digest = hashlib.sha256(prefix.encode("utf-8")).digest()
+        self._scopes.add(digest)
+        return CacheScope(self, digest)
+
+    def digest(self, font: TTFont, glyph_name: str) -> Optional[bytes]:
+        """Identify the current content of a glyph of the font being built.
+
+        Args:
+            font: Font being built
+            glyph_name: Glyph name
+
+        Returns:
+            Digest bytes, or None if the glyph was changed outside the
+            cache (decompiled and not produced by a cached transform)
+        """
+        known = self.digests.get(glyph_name)
+        if known is not None:
+            return known
+        return source_digest(font, glyph_name)
+
+    def add(self, key: bytes, cached: CachedGlyph) -> None:
+        """Add an entry (written to disk on close)."""
+        if key not in self.entries:
+            self._new[key] = cached
+        self.entries[key] = cached
+
+    def close(self) -> None:
+        """Write the new entries as a segment, compacting when there are many.
+
+        Compaction drops the entries of scopes no recent build used.
+        """
+        if not self._new:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        compact = len(self._segments) + 1 >= MAX_SEGMENTS
+        if compact:
+            live = self._used_scopes | self._scopes
+            entries = {key: cached for key, cached in self.entries.items() if cached.scope in live}
+        else:
+            entries = self._new
+        data = _pack_segment(entries, self._scopes)
+        path = self.directory / f"{hashlib.sha256(data).hexdigest()[:16]}{SEGMENT_SUFFIX}"
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        if compact:
+            for segment in self._segments + self._stale:
+                if segment != path:
+                    segment.unlink(missing_ok=True)
+            self.entries = entries
+            self._used_scopes = set(self._scopes)
+            self._segments = [path]
+            self._stale = []
+        else:
+            self._segments.append(path)
+        self._new = {}
+
+
+def source_digest(font: Union[TTFont, FontSnapshot], glyph_name: str) -> Optional[bytes]:
+    """Identify a glyph by its compiled data (or snapshot record).
+
+    Args:
+        font: Font or snapshot holding the glyph
+        glyph_name: Glyph name
+
+    Returns:
+        Digest bytes, or None if the glyph is already decompiled
+    """
+    if isinstance(font, FontSnapshot):
+        return font.glyph_digest(glyph_name)
+    data = getattr(font["glyf"].glyphs[glyph_name], "data", None)
+    return hashlib.sha256(data).digest() if data is not None else None
+
+
+def _pack_segment(entries: Dict[bytes, CachedGlyph], used_scopes: Set[bytes]) -> bytes:
+    scopes = sorted(used_scopes | {cached.scope for cached in entries.values()})
+    index = {scope: i for i, scope in enumerate(scopes)}
+    parts = [SEGMENT_MAGIC, SCOPE_COUNT.pack(len(scopes))]
+    parts.extend(SCOPE.pack(scope, scope in used_scopes) for scope in scopes)
+    for key in sorted(entries):
+        cached = entries[key]
+        data = cached.data if cached.data is not None else b""
+        length = len(data) if cached.data is not None else NO_DATA
+        parts.append(RECORD.pack(
+            key, index[cached.scope], OUTCOMES.index(cached.outcome), cached.advance, cached.lsb, length
+        ))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def _parse_segment(data: bytes) -> Tuple[Dict[bytes, CachedGlyph], Set[bytes]]:
+    offset = len(SEGMENT_MAGIC)
+    (count,) = SCOPE_COUNT.unpack_from(data, offset)
+    offset += SCOPE_COUNT.size
+    scopes = []
+    used_scopes = set()
+    for _ in range(count):
+        scope, used = SCOPE.unpack_from(data, offset)
+        offset += SCOPE.size
+        scopes.append(scope)
+        if used:
+            used_scopes.add(scope)
+
+    entries = {}
+    while offset + RECORD.size <= len(data):
+        key, scope_index, outcome, advance, lsb, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        glyph_data = None
+        if length != NO_DATA:
+            glyph_data = data[offset:offset + length]
+            offset += length
+        entries[key] = CachedGlyph(OUTCOMES[outcome], glyph_data, advance, lsb, scopes[scope_index])
+    return entries, used_scopes
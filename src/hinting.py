@@ -0,0 +1,166 @@
+"""TrueType hinting removal for transformed glyphs or the whole font.
+
+Glyph programs copied from LXGW WenKai were written for its own fpgm/prep
+and outlines; once scaled by ``combined_scale`` (and NerdFont icons by
+``scale_nerd_icons``) they no longer fit the glyphs. Stripping them shrinks
+the glyf table and speeds up both saving and rasterisation.
+"""
+
+import time
+from typing import Dict, Iterable, Tuple
+
+from fontTools.ttLib import TTFont
+
+from .config import HINTING_MODES, FontConfig
+from .utils import classify_codepoint, compile_for_measuring
+
+# Font-wide hinting tables, only meaningful while glyphs carry instructions
+HINTING_TABLES = ("fpgm", "prep", "cvt ", "cvar", "hdmx", "VDMX", "LTSH")
+
+
+def get_transformed_glyphs(font: TTFont, config: FontConfig) -> Iterable[str]:
+    """Get glyphs rescaled or moved to the CJK width by the merge pipeline.
+
+    These are the CJK glyphs and NerdFont/Powerline icons that now have the
+    2x advance width.
+
+    Args:
+        font: Merged TTFont object
+        config: FontConfig object
+
+    Returns:
+        Set of glyph names
+    """
+    hmtx = font["hmtx"]
+    transformed = set()
+    for codepoint, glyph_name in font.getBestCmap().items():
+        if classify_codepoint(codepoint, config) not in ("cjk", "nerd", "powerline"):
+            continue
+        if hmtx[glyph_name][0] == config.cn_width:
+            transformed.add(glyph_name)
+    return transformed
+
+
+def _instruction_length(glyph) -> int:
+    program = getattr(glyph, "program", None)
+    return len(program.getBytecode()) if program else 0
+
+
+def strip_glyph_instructions(font: TTFont, glyph_names: Iterable[str]) -> Tuple[int, int]:
+    """Remove instruction programs from the given glyphs.
+
+    Args:
+        font: TTFont object
+        glyph_names: Glyphs to strip
+
+    Returns:
+        Tuple of (glyphs stripped, instruction bytes removed)
+    """
+    glyf = font["glyf"]
+    stripped = 0
+    removed_bytes = 0
+    for glyph_name in glyph_names:
+        glyph = glyf[glyph_name]
+        length = _instruction_length(glyph)
+        if length:
+            glyph.removeHinting()
+            stripped += 1
+            removed_bytes += length
+    return stripped, removed_bytes
+
+
+def prune_hinting_tables(font: TTFont) -> Dict[str, int]:
+    """Drop font-wide hinting tables and reset maxp hinting limits.
+
+    Only safe once no glyph carries instructions.
+
+    Args:
+        font: TTFont object
+
+    Returns:
+        Dict mapping removed table tag -> its size in bytes
+    """
+    removed = {}
+    for tag in HINTING_TABLES:
+        if tag in font:
+            removed[tag.strip()] = len(font.getTableData(tag))
+            del font[tag]
+
+    maxp = font["maxp"]
+    if maxp.tableVersion == 0x00010000:
+        maxp.maxZones = 1
+        maxp.maxTwilightPoints = 0
+        maxp.maxStorage = 0
+        maxp.maxFunctionDefs = 0
+        maxp.maxInstructionDefs = 0
+        maxp.maxStackElements = 0
+        maxp.maxSizeOfInstructions = 0
+    return removed
+
+
+def _measure_save(font: TTFont) -> Tuple[int, float]:
+    """Compile a font to memory, returning (size in bytes, seconds).
+
+    The font is left unchanged (see compile_for_measuring). glyf is loaded before
+    timing, so the first measurement does not also pay for parsing it.
+    """
+    font["glyf"]
+    start = time.perf_counter()
+    data = compile_for_measuring(font)
+    return len(data), time.perf_counter() - start
+
+
+def strip_hinting(font: TTFont, config: FontConfig, mode: str, report: bool = False) -> None:
+    """Strip TrueType hinting according to mode.
+
+    Modes:
+    - "none": keep everything
+    - "transformed": strip instructions from rescaled CJK glyphs and icons;
+      font-wide tables are pruned only if no hinted glyph remains
+    - "all": strip every glyph and drop fpgm/prep/cvt and related tables
+
+    maxp.maxSizeOfInstructions is recomputed from the remaining glyphs.
+
+    Args:
+        font: Merged TTFont object
+        config: FontConfig object
+        mode: One of HINTING_MODES
+        report: Also compile the font before and after stripping and print
+            the size and save-time difference (costs one extra save)
+    """
+    if mode not in HINTING_MODES:
+        raise ValueError(f"Invalid hinting mode '{mode}'. Valid modes: {list(HINTING_MODES)}")
+    if mode == "none":
+        return
+
+    if report:
+        size_before, time_before = _measure_save(font)
+
+    glyf = font["glyf"]
+    if mode == "all":
+        targets = font.getGlyphOrder()
+    else:
+        targets = get_transformed_glyphs(font, config)
+    stripped, removed_bytes = strip_glyph_instructions(font, targets)
+    print(f"    Stripped instructions from {stripped} glyphs ({removed_bytes} bytes)")
+
+    # Recompute the instruction size limit from what is left
+    max_instructions = max(
+        (_instruction_length(glyf[name]) for name in font.getGlyphOrder()),
+        default=0,
+    )
+    if max_instructions == 0:
+        removed = prune_hinting_tables(font)
+        if removed:
+            tables = ", ".join(f"{tag} ({size} bytes)" for tag, size in removed.items())
+            print(f"    Pruned hinting tables: {tables}")
+    elif font["maxp"].tableVersion == 0x00010000:
+        font["maxp"].maxSizeOfInstructions = max_instructions
+
+    if report:
+        size_after, time_after = _measure_save(font)
+        print(
+            f"    Hinting report: size {size_before / 1024:.0f} KB -> {size_after / 1024:.0f} KB "
+            f"({(size_after - size_before) / 1024:+.0f} KB), "
+            f"save {time_before:.2f}s -> {time_after:.2f}s"
+        )
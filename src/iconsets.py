@@ -0,0 +1,140 @@
+"""NerdFont icon set selection: drop unselected icons from the base font.
+
+The NerdFont base font carries every Nerd Fonts glyph set, over 10,000
+icons, two thirds of them Material Design icons in the supplementary
+Private Use Area. Deployments that never render most sets still pay for
+them in font size and in the icons phase, which scales every icon.
+
+With ``nerd_icon_sets`` set, the icons of the other sets in
+``NERD_ICON_SETS`` are dropped from the base font right after it is
+loaded, before any glyph is scaled: their codepoints are removed from
+every cmap subtable, and glyphs no other codepoint maps to are removed
+with the subsetter, which compacts the glyph order, hmtx and post glyph
+names and prunes layout rules that referenced them. Codepoints in
+``nerd_ranges`` outside every set are kept.
+
+``plan_icon_drop`` only reads the cmap, so the glyph budget (budget.py)
+counts the dropped glyphs before anything is merged.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from fontTools.ttLib import TTFont
+
+from .config import NERD_ICON_SETS, FontConfig
+
+
+@dataclass
+class IconDrop:
+    """Icons dropped from a base font."""
+
+    sets: Tuple[str, ...]
+    codepoints: int
+    glyphs: int
+    # glyf and hmtx bytes of the dropped glyphs in the base font
+    glyph_bytes: int
+    seconds: float
+
+    def summary(self) -> str:
+        return (
+            f"Dropped {self.glyphs} icons of {len(self.sets)} unselected sets ({', '.join(self.sets)}): "
+            f"{self.glyph_bytes / 1024:.0f} KB of glyph data, in {self.seconds:.2f}s"
+        )
+
+    def scaling_saved(self, seconds: float, icons: int) -> str:
+        """Scaling time the dropped icons would have taken at the rate of the kept ones.
+
+        Args:
+            seconds: Time the icons phase took
+            icons: Icons it processed
+        """
+        saved = self.glyphs * seconds / icons if icons else 0.0
+        return f"Skipped scaling {self.glyphs} dropped icons (~{saved:.2f}s at this build's rate)"
+
+
+def dropped_icon_ranges(config: FontConfig) -> List[Tuple[int, int]]:
+    """Codepoint ranges of the icon sets not in config.nerd_icon_sets (none if it is empty)."""
+    if not config.nerd_icon_sets:
+        return []
+    return [
+        icon_range
+        for name, set_ranges in NERD_ICON_SETS
+        if name not in config.nerd_icon_sets
+        for icon_range in set_ranges
+    ]
+
+
+def plan_icon_drop(cmap: Dict[int, str], config: FontConfig) -> Tuple[Set[int], Set[str]]:
+    """Find the codepoints of unselected icon sets and the glyphs only they map to.
+
+    Args:
+        cmap: Best cmap of the base font
+        config: FontConfig with nerd_icon_sets
+
+    Returns:
+        Tuple of (codepoints to unmap, glyph names to drop)
+    """
+    ranges = dropped_icon_ranges(config)
+    if not ranges:
+        return set(), set()
+    codepoints = {codepoint for codepoint in cmap if any(start <= codepoint <= end for start, end in ranges)}
+    kept = {glyph_name for codepoint, glyph_name in cmap.items() if codepoint not in codepoints}
+    glyphs = {cmap[codepoint] for codepoint in codepoints} - kept - {".notdef"}
+    return codepoints, glyphs
+
+
+def drop_icon_sets(font: TTFont, config: FontConfig) -> Optional[IconDrop]:
+    """Drop the icons of unselected sets from a base font in place.
+
+    Args:
+        font: Base font (loaded from a file, not yet modified)
+        config: FontConfig with nerd_icon_sets
+
+    Returns:
+        IconDrop object, or None if no icon was dropped
+    """
+    start = time.perf_counter()
+    codepoints, glyphs = plan_icon_drop(font["cmap"].getBestCmap() or {}, config)
+    if not codepoints:
+        return None
+
+    glyph_bytes = 0
+    if "glyf" in font:
+        glyph_ids = font.getReverseGlyphMap()
+        loca = font["loca"]
+        glyph_bytes = sum(loca[glyph_ids[name] + 1] - loca[glyph_ids[name]] + 4 for name in glyphs)
+
+    for table in font["cmap"].tables:
+        if table.isUnicode() and hasattr(table, "cmap"):
+            for codepoint in codepoints:
+                table.cmap.pop(codepoint, None)
+
+    if glyphs:
+        # Imported here: the subsetter is only needed when icons are dropped
+        from fontTools import subset
+
+        options = subset.Options()
+        options.glyph_names = True
+        options.notdef_outline = True
+        options.name_IDs = ["*"]
+        options.name_languages = ["*"]
+        options.name_legacy = True
+        options.layout_features = ["*"]
+        # Dropped icons stay dropped even if a layout rule reaches them
+        options.layout_closure = False
+        options.legacy_kern = True
+        options.symbol_cmap = True
+        options.legacy_cmap = True
+        options.prune_unicode_ranges = False
+        options.prune_codepage_ranges = False
+        # Everything but the dropped glyphs stays as it is
+        options.drop_tables = []
+        options.passthrough_tables = True
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(glyphs=[name for name in font.getGlyphOrder() if name not in glyphs])
+        subsetter.subset(font)
+
+    dropped_sets = tuple(name for name, _ in NERD_ICON_SETS if name not in config.nerd_icon_sets)
+    return IconDrop(dropped_sets, len(codepoints), len(glyphs), glyph_bytes, time.perf_counter() - start)
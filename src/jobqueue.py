@@ -0,0 +1,331 @@
+"""File-based job queue for distributed style builds.
+
+A coordinator writes one JSON job per style into a queue directory on a
+shared filesystem; any number of workers, on any host that mounts it,
+claim jobs, build them and publish results:
+
+    queue_dir/
+        pending/<job_id>.json   waiting to be claimed
+        claimed/<job_id>.json   being built (file mtime is the lease heartbeat)
+        done/<job_id>.json      finished, with the output path
+        failed/<job_id>.json    gave up after max_attempts
+        tmp/                    staging area for atomic writes
+
+Claiming is a single ``os.rename`` from pending/ to claimed/, which only
+one worker can win. Workers touch their claimed file while building; a
+claim whose heartbeat is older than the lease is considered abandoned and
+moved back to pending/. Failed jobs are retried until max_attempts.
+
+Each claim carries a unique token. A worker whose claim was requeued
+(and maybe claimed again by another worker) no longer finds its token in
+claimed/, stops renewing the lease and drops its result instead of
+publishing it, so a job is never finished twice or requeued after it is
+done.
+"""
+
+import dataclasses
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import FontConfig
+
+JOB_STATES = ("pending", "claimed", "done", "failed")
+
+
+def _to_tuples(value: Any) -> Any:
+    """Turn JSON lists back into (nested) tuples."""
+    if isinstance(value, list):
+        return tuple(_to_tuples(v) for v in value)
+    return value
+
+
+def config_to_dict(config: FontConfig) -> dict:
+    """Serialise a FontConfig for a job file."""
+    return dataclasses.asdict(config)
+
+
+def config_from_dict(data: dict) -> FontConfig:
+    """Rebuild a FontConfig from config_to_dict() output.
+
+    Tuple fields (Unicode ranges) come back from JSON as lists and are
+    converted to tuples so they compare equal to the coordinator's config.
+    """
+    fields = {f.name: f for f in dataclasses.fields(FontConfig)}
+    kwargs = {}
+    for name, value in data.items():
+        if name not in fields:
+            continue
+        if isinstance(fields[name].default, tuple):
+            value = _to_tuples(value)
+        kwargs[name] = value
+    return FontConfig(**kwargs)
+
+
+def worker_id() -> str:
+    """Identify this worker process across hosts."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    """A job queue in a shared directory.
+
+    Args:
+        queue_dir: Queue directory (created if missing)
+        lease_seconds: Heartbeat age after which a claim is abandoned
+        max_attempts: Builds attempted per job before it is marked failed
+    """
+
+    def __init__(self, queue_dir: Path, lease_seconds: float = 120.0, max_attempts: int = 3):
+        self.queue_dir = Path(queue_dir)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in JOB_STATES + ("tmp",):
+            (self.queue_dir / state).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, state: str, job_id: str) -> Path:
+        return self.queue_dir / state / f"{job_id}.json"
+
+    def _write(self, state: str, job: dict) -> None:
+        """Atomically write a job file into a state directory."""
+        tmp_path = self.queue_dir / "tmp" / f"{job['id']}.{uuid.uuid4().hex}"
+        tmp_path.write_text(json.dumps(job, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self._path(state, job["id"]))
+
+    @staticmethod
+    def _read(path: Path) -> dict:
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def submit(self, job_id: str, payload: dict) -> None:
+        """Add a job to the queue.
+
+        Args:
+            job_id: Unique job ID (used as file name)
+            payload: JSON-serialisable job arguments
+        """
+        self._write("pending", {"id": job_id, "attempts": 0, "payload": payload, "errors": []})
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """Claim the first pending job (by job ID).
+
+        Args:
+            worker: Worker ID recorded in the claim
+
+        Returns:
+            Job dict, or None if nothing is pending
+        """
+        for path in sorted((self.queue_dir / "pending").glob("*.json")):
+            claimed_path = self._path("claimed", path.stem)
+            try:
+                os.rename(path, claimed_path)
+                # rename keeps the pending file's mtime; start the lease now
+                os.utime(claimed_path)
+                job = self._read(claimed_path)
+            except FileNotFoundError:
+                continue  # Another worker won this one
+            job["worker"] = worker
+            job["claimed_at"] = time.time()
+            job["claim"] = uuid.uuid4().hex
+            self._write("claimed", job)
+            return job
+        return None
+
+    def owns(self, job: dict) -> bool:
+        """Check whether a claim returned by claim() is still held.
+
+        Returns:
+            False if the job was requeued since, or claimed by someone else
+        """
+        try:
+            return self._read(self._path("claimed", job["id"])).get("claim") == job["claim"]
+        except FileNotFoundError:
+            return False
+
+    def heartbeat(self, job: dict) -> bool:
+        """Renew the lease of a claimed job.
+
+        Returns:
+            False if the claim was lost (see owns())
+        """
+        if not self.owns(job):
+            return False
+        try:
+            os.utime(self._path("claimed", job["id"]))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, job: dict, result: dict) -> None:
+        """Publish a job result and release the claim."""
+        job = dict(job, result=result, finished_at=time.time())
+        self._write("done", job)
+        self._path("claimed", job["id"]).unlink(missing_ok=True)
+
+    def fail(self, job: dict, error: str) -> str:
+        """Record a failed attempt; requeue the job or mark it failed.
+
+        Returns:
+            New state of the job ("pending" or "failed")
+        """
+        job = dict(job, attempts=job["attempts"] + 1, errors=job["errors"] + [error])
+        state = "pending" if job["attempts"] < self.max_attempts else "failed"
+        self._write(state, job)
+        self._path("claimed", job["id"]).unlink(missing_ok=True)
+        return state
+
+    def requeue_stale(self) -> List[str]:
+        """Move claims with an expired heartbeat back to pending (or failed).
+
+        Returns:
+            IDs of requeued jobs
+        """
+        requeued = []
+        now = time.time()
+        for path in (self.queue_dir / "claimed").glob("*.json"):
+            try:
+                if now - path.stat().st_mtime < self.lease_seconds:
+                    continue
+                # Rename first so only one process handles the abandoned claim
+                stale_path = self.queue_dir / "tmp" / f"{path.stem}.stale.{uuid.uuid4().hex}"
+                os.rename(path, stale_path)
+            except FileNotFoundError:
+                continue
+            job = self._read(stale_path)
+            stale_path.unlink()
+            if self._path("done", job["id"]).exists():
+                continue
+            self.fail(job, f"lease expired (worker {job.get('worker', '?')})")
+            requeued.append(job["id"])
+        return requeued
+
+    def state(self, job_id: str) -> Optional[str]:
+        """Current state of a job, or None if unknown."""
+        # done/failed first: a finished job may briefly also exist elsewhere
+        for state in ("done", "failed", "claimed", "pending"):
+            if self._path(state, job_id).exists():
+                return state
+        return None
+
+    def load(self, state: str, job_id: str) -> dict:
+        """Read a job file in the given state."""
+        return self._read(self._path(state, job_id))
+
+    def cancel(self, job_ids: List[str]) -> None:
+        """Remove unfinished copies of jobs from pending/ and claimed/."""
+        for job_id in job_ids:
+            for state in ("pending", "claimed"):
+                self._path(state, job_id).unlink(missing_ok=True)
+
+
+def wait_for_jobs(
+    queue: JobQueue,
+    job_ids: List[str],
+    interval: float = 1.0,
+    on_finish: Optional[Callable[[str, str, dict], None]] = None,
+) -> Dict[str, dict]:
+    """Wait until every job is done or failed, requeueing abandoned claims.
+
+    Args:
+        queue: JobQueue object
+        job_ids: Jobs to wait for
+        interval: Polling interval in seconds
+        on_finish: Called with (job_id, state, job) as each job finishes
+
+    Returns:
+        Dict mapping job ID -> final job dict (with "state" added)
+    """
+    finished: Dict[str, dict] = {}
+    while len(finished) < len(job_ids):
+        for job_id in queue.requeue_stale():
+            print(f"  Requeued abandoned job {job_id}")
+        for job_id in job_ids:
+            if job_id in finished:
+                continue
+            state = queue.state(job_id)
+            if state in ("done", "failed"):
+                job = dict(queue.load(state, job_id), state=state)
+                finished[job_id] = job
+                if on_finish:
+                    on_finish(job_id, state, job)
+        if len(finished) < len(job_ids):
+            time.sleep(interval)
+    queue.cancel(job_ids)
+    return finished
+
+
+def run_worker(
+    queue: JobQueue,
+    build_fn: Callable[[dict], dict],
+    idle_exit: float = 0.0,
+    interval: float = 1.0,
+) -> int:
+    """Claim and run jobs until the queue stays empty.
+
+    Args:
+        queue: JobQueue object
+        build_fn: Runs a job payload and returns a JSON-serialisable result
+        idle_exit: Exit after this many seconds without work (0 = run forever)
+        interval: Polling interval in seconds
+
+    Returns:
+        Number of jobs completed by this worker
+    """
+    me = worker_id()
+    completed = 0
+    idle_since = time.monotonic()
+    print(f"Worker {me} polling {queue.queue_dir}")
+
+    while True:
+        job = queue.claim(me)
+        if job is None:
+            queue.requeue_stale()
+            if idle_exit and time.monotonic() - idle_since >= idle_exit:
+                break
+            time.sleep(interval)
+            continue
+
+        print(f"Worker {me} claimed {job['id']} (attempt {job['attempts'] + 1})")
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def keep_alive(job: dict = job) -> None:
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat(job):
+                    lost.set()
+                    break
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            result = build_fn(job["payload"])
+        except Exception:
+            stop.set()
+            heartbeat.join()
+            error = traceback.format_exc()
+            if lost.is_set() or not queue.owns(job):
+                print(f"Worker {me} lost its claim on {job['id']}; dropping the failure:\n{error}")
+            else:
+                state = queue.fail(job, f"{me}: {error}")
+                print(f"Worker {me} failed {job['id']} ({state}):\n{error}")
+        else:
+            stop.set()
+            heartbeat.join()
+            if lost.is_set() or not queue.owns(job):
+                # Requeued while building: the job belongs to whoever has it now
+                print(f"Worker {me} lost its claim on {job['id']}; dropping the result")
+            else:
+                result = dict(result, worker=me, seconds=round(time.perf_counter() - start, 3))
+                queue.complete(job, result)
+                completed += 1
+                print(f"Worker {me} finished {job['id']}")
+        idle_since = time.monotonic()
+
+    print(f"Worker {me} exiting after {completed} jobs")
+    return completed
@@ -1,10 +1,13 @@
 """Core font merging logic for JetBrainsLxgwNerdMono."""
 
-from typing import Set
+import copy
+from typing import BinaryIO, Optional, Set, Tuple, Union
 
 from fontTools.ttLib import TTFont
 
 from .config import FontConfig
+from .glyphcache import GlyphCache, source_digest
+from .snapshot import FontSnapshot, flatten_composite, is_snapshot, load_snapshot
 from .utils import is_cjk_codepoint, merge_os2_ranges
 
 
@@ -18,6 +21,9 @@ def get_cjk_glyphs(font: TTFont, config: FontConfig) -> Set[str]:
     Returns:
         Set of glyph names that are CJK characters
     """
+    if isinstance(font, FontSnapshot):
+        return set(font.get_cmap("cjk").values())
+
     cjk_glyphs = set()
     cmap = font["cmap"].getBestCmap()
 
@@ -39,6 +45,10 @@ def get_cjk_cmap_entries(font: TTFont, config: FontConfig) -> dict:
     Returns:
         Dict mapping codepoint -> glyph_name for CJK characters
     """
+    if isinstance(font, FontSnapshot):
+        # Snapshots store the cmap already partitioned by class
+        return font.get_cmap("cjk")
+
     entries = {}
     cmap = font["cmap"].getBestCmap()
 
@@ -50,10 +60,19 @@ def get_cjk_cmap_entries(font: TTFont, config: FontConfig) -> dict:
     return entries
 
 
+def _source_name(source) -> str:
+    """Printable name of a font path or file object."""
+    if isinstance(source, str):
+        return source
+    return getattr(source, "name", "<in-memory font>")
+
+
 def merge_fonts(
-    base_font_path: str,
-    cn_font_path: str,
+    base_font_path: Union[str, BinaryIO, TTFont],
+    cn_font_path: Union[str, BinaryIO, FontSnapshot],
     config: FontConfig,
+    glyph_cache: Optional[GlyphCache] = None,
+    include: Optional[Set[str]] = None,
 ) -> TTFont:
     """Merge CJK glyphs from cn_font into base_font.
 
@@ -65,17 +84,33 @@ def merge_fonts(
     - CJK characters
 
     Args:
-        base_font_path: Path to JetBrains Mono NerdFont
-        cn_font_path: Path to LXGW WenKai Mono
+        base_font_path: Path to JetBrains Mono NerdFont (or a file object),
+            or the base font already loaded (merged into in place)
+        cn_font_path: Path to LXGW WenKai Mono (or a file object), or a
+            snapshot of it (FontSnapshot object or path to a ``.snapshot`` file)
         config: FontConfig object
+        glyph_cache: GlyphCache reusing scaled glyphs of earlier builds
+        include: CJK glyphs to import (default: all), e.g. those that fit
+            the glyph budget (see budget.py)
 
     Returns:
         Merged TTFont object
     """
-    print(f"  Loading base font: {base_font_path}")
-    base_font = TTFont(base_font_path)
-    print(f"  Loading CN font: {cn_font_path}")
-    cn_font = TTFont(cn_font_path)
+    if isinstance(base_font_path, TTFont):
+        base_font = base_font_path
+    else:
+        print(f"  Loading base font: {_source_name(base_font_path)}")
+        base_font = TTFont(base_font_path)
+    from_snapshot = is_snapshot(cn_font_path)
+    if isinstance(cn_font_path, FontSnapshot):
+        print(f"  Using CN font snapshot: {cn_font_path.path}")
+        cn_font = cn_font_path
+    elif from_snapshot:
+        print(f"  Loading CN font snapshot: {cn_font_path}")
+        cn_font = load_snapshot(cn_font_path, config=config)
+    else:
+        print(f"  Loading CN font: {_source_name(cn_font_path)}")
+        cn_font = TTFont(cn_font_path)
 
     # Get existing glyphs in base font (to avoid overwriting)
     base_glyph_names = set(base_font.getGlyphOrder())
@@ -85,6 +120,9 @@ def merge_fonts(
     cjk_cmap = get_cjk_cmap_entries(cn_font, config)
 
     print(f"  Found {len(cjk_glyphs)} CJK glyphs in CN font")
+    if include is not None:
+        cjk_glyphs &= include
+        print(f"  Importing {len(cjk_glyphs)} of them (glyph budget)")
 
     # Get font tables
     base_glyf = base_font["glyf"]
@@ -104,8 +142,18 @@ def merge_fonts(
     print(f"  Scaling CN glyphs by {combined_scale:.4f} (UPM: {cn_upm} -> {base_upm}, visual: {config.visual_scale:.2f}x)")
 
     glyphs_added = []
+    scope = None
+    if glyph_cache is not None:
+        scope = glyph_cache.scope(
+            "merge", (merge_fonts,), {"scale": combined_scale, "cn_width": config.cn_width}
+        )
+
+    # Walk CJK glyphs in CN font glyph order (not set order) so the merged
+    # glyph order, and therefore the output bytes, are reproducible
+    for glyph_name in cn_font.getGlyphOrder():
+        if glyph_name not in cjk_glyphs:
+            continue
 
-    for glyph_name in cjk_glyphs:
         # Skip if glyph already exists in base font
         if glyph_name in base_glyph_names:
             continue
@@ -114,11 +162,27 @@ def merge_fonts(
         if glyph_name not in cn_glyf.glyphs:
             continue
 
+        key = None
+        if scope is not None:
+            key = scope.key(source_digest(cn_font, glyph_name), cn_hmtx[glyph_name])
+            cached = scope.get(key)
+            if cached is not None:
+                scope.apply(base_font, glyph_name, key, cached)
+                glyphs_added.append(glyph_name)
+                continue
+
         # Copy glyph outline (deep copy to avoid modifying source font)
         # IMPORTANT: Use cn_glyf[name] instead of cn_glyf.glyphs[name]
         # The latter returns undecompiled glyph without coordinates attribute
-        import copy
-        glyph = copy.deepcopy(cn_glyf[glyph_name])
+        # Snapshots already build a fresh glyph on every access
+        glyph = cn_glyf[glyph_name]
+        # Composites are flattened as in snapshots: their components are
+        # not necessarily imported, and offsets would not be scaled
+        composite = glyph.isComposite()
+        if composite:
+            glyph = flatten_composite(glyph, cn_glyf)
+        elif not from_snapshot:
+            glyph = copy.deepcopy(glyph)
         base_glyf.glyphs[glyph_name] = glyph
 
         # Scale glyph to fit target width
@@ -138,11 +202,18 @@ def merge_fonts(
         base_hmtx.metrics[glyph_name] = (config.cn_width, scaled_lsb)
 
         glyphs_added.append(glyph_name)
+        # A flattened composite depends on its components, which its key
+        # does not cover (snapshot records hold the flattened outline)
+        if scope is not None and not composite:
+            scope.put(key, base_font, glyph_name, "merged")
 
     print(f"  Added {len(glyphs_added)} new glyphs")
+    if scope is not None:
+        print(f"  {scope.report()}")
 
     if not glyphs_added:
-        cn_font.close()
+        if cn_font is not cn_font_path:
+            cn_font.close()
         return base_font
 
     # Update glyph order
@@ -182,11 +253,92 @@ def merge_fonts(
     # Merge OS/2 ranges from CN font to base font
     merge_os2_ranges(base_font, cn_font)
 
-    cn_font.close()
+    # Source-derived modification time: the newest of the two sources
+    base_font["head"].modified = max(base_font["head"].modified, cn_font["head"].modified)
+
+    # Snapshots passed in by the caller stay open for reuse
+    if cn_font is not cn_font_path:
+        cn_font.close()
     return base_font
 
 
-def scale_nerd_icons(font: TTFont, config: FontConfig) -> None:
+def _scale_nerd_icon(glyf, hmtx, glyph_name: str, is_powerline: bool, config: FontConfig) -> Tuple[str, bool]:
+    """Scale and center one NerdFont icon (see scale_nerd_icons).
+
+    Returns:
+        Tuple of (outcome: "powerline", "scaled" or "unchanged", whether
+        the glyph or its metrics changed)
+    """
+    # Target: scale icons to ~70% of 1200 = 840 units (similar to CJK fill ratio)
+    # Original icon width is ~600, so scale factor = 840 / 600 = 1.4
+    scale_factor = 1.4
+
+    glyph = glyf[glyph_name]
+    if glyph.numberOfContours <= 0:
+        return "unchanged", False
+
+    # Get current metrics
+    width, lsb = hmtx[glyph_name]
+    if width != config.en_width:
+        return "unchanged", False  # Skip if not standard English width
+
+    if is_powerline:
+        # Powerline symbols: only adjust width, no scaling or vertical shift
+        # These symbols need to maintain their original vertical bounds
+        if hasattr(glyph, "coordinates"):
+            if not hasattr(glyph, 'xMin') or glyph.xMin is None:
+                glyph.recalcBounds(glyf)
+
+            # Only center horizontally, keep vertical position
+            if hasattr(glyph, 'xMin') and glyph.xMin is not None:
+                glyph_width = glyph.xMax - glyph.xMin
+                ideal_lsb = (config.cn_width - glyph_width) // 2
+                delta_x = ideal_lsb - glyph.xMin
+
+                if abs(delta_x) > 1:
+                    glyph.coordinates.translate((delta_x, 0))
+                    glyph.recalcBounds(glyf)
+
+                hmtx[glyph_name] = (config.cn_width, ideal_lsb)
+            else:
+                hmtx[glyph_name] = (config.cn_width, 0)
+
+        return "powerline", True
+
+    # Regular icons: scale and center both horizontally and vertically
+    if hasattr(glyph, "coordinates"):
+        # Ensure bounds are calculated
+        if not hasattr(glyph, 'xMin') or glyph.xMin is None:
+            glyph.recalcBounds(glyf)
+
+        # Scale to 2x size
+        glyph.coordinates.scale((scale_factor, scale_factor))
+        glyph.recalcBounds(glyf)
+
+    # Update advance width to CJK width (1200)
+    # Center the glyph horizontally and vertically
+    if hasattr(glyph, 'xMin') and glyph.xMin is not None:
+        glyph_width = glyph.xMax - glyph.xMin
+        ideal_lsb = (config.cn_width - glyph_width) // 2
+        delta_x = ideal_lsb - glyph.xMin
+
+        # Vertical centering: align icon center with CJK center (~360)
+        glyph_center_y = (glyph.yMin + glyph.yMax) / 2
+        target_center_y = 360  # Similar to CJK vertical center
+        delta_y = target_center_y - glyph_center_y
+
+        if abs(delta_x) > 1 or abs(delta_y) > 1:
+            glyph.coordinates.translate((delta_x, delta_y))
+            glyph.recalcBounds(glyf)
+
+        hmtx[glyph_name] = (config.cn_width, ideal_lsb)
+    else:
+        hmtx[glyph_name] = (config.cn_width, 0)
+
+    return "scaled", True
+
+
+def scale_nerd_icons(font: TTFont, config: FontConfig, glyph_cache: Optional[GlyphCache] = None) -> int:
     """Scale NerdFont icons to occupy 2x English character width (same as CJK).
 
     NerdFont icons are in Private Use Area:
@@ -200,20 +352,21 @@ def scale_nerd_icons(font: TTFont, config: FontConfig) -> None:
     Args:
         font: TTFont object
         config: FontConfig object
+        glyph_cache: GlyphCache reusing icons transformed by earlier builds
+
+    Returns:
+        Number of icons processed
     """
     glyf = font["glyf"]
     hmtx = font["hmtx"]
     cmap = font["cmap"].getBestCmap()
 
     # NerdFont icon Unicode ranges
-    nerd_ranges = [
-        (0xE000, 0xF8FF),      # Private Use Area
-        (0xF0000, 0xFFFFD),    # Supplementary Private Use Area-A
-    ]
+    nerd_ranges = config.nerd_ranges
 
     # Powerline symbols range - these need special handling
     # They must span the full line height and not be scaled
-    powerline_range = (0xE0A0, 0xE0DF)
+    powerline_range = config.powerline_range
 
     # Build mapping: codepoint -> glyph_name for nerd icons
     nerd_glyph_map = {}  # glyph_name -> codepoint
@@ -224,93 +377,115 @@ def scale_nerd_icons(font: TTFont, config: FontConfig) -> None:
                 break
 
     if not nerd_glyph_map:
-        return
+        return 0
 
     print(f"  Processing {len(nerd_glyph_map)} NerdFont icons...")
 
-    # Target: scale icons to ~70% of 1200 = 840 units (similar to CJK fill ratio)
-    # Original icon width is ~600, so scale factor = 840 / 600 = 1.4
-    scale_factor = 1.4
+    scope = None
+    if glyph_cache is not None:
+        scope = glyph_cache.scope(
+            "icons", (_scale_nerd_icon,), {"en_width": config.en_width, "cn_width": config.cn_width}
+        )
 
-    powerline_count = 0
-    scaled_count = 0
+    counts = {"powerline": 0, "scaled": 0, "unchanged": 0}
 
     for glyph_name, codepoint in nerd_glyph_map.items():
         if glyph_name not in glyf.glyphs:
             continue
 
-        glyph = glyf[glyph_name]
-        if glyph.numberOfContours <= 0:
-            continue
-
-        # Get current metrics
-        width, lsb = hmtx[glyph_name]
-        if width != config.en_width:
-            continue  # Skip if not standard English width
-
         # Check if this is a Powerline symbol
         is_powerline = powerline_range[0] <= codepoint <= powerline_range[1]
 
-        if is_powerline:
-            # Powerline symbols: only adjust width, no scaling or vertical shift
-            # These symbols need to maintain their original vertical bounds
-            if hasattr(glyph, "coordinates"):
-                if not hasattr(glyph, 'xMin') or glyph.xMin is None:
-                    glyph.recalcBounds(glyf)
+        key = None
+        if scope is not None:
+            key = scope.key(glyph_cache.digest(font, glyph_name), hmtx[glyph_name], is_powerline)
+            cached = scope.get(key)
+            if cached is not None:
+                scope.apply(font, glyph_name, key, cached)
+                counts[cached.outcome] += 1
+                continue
 
-                # Only center horizontally, keep vertical position
-                if hasattr(glyph, 'xMin') and glyph.xMin is not None:
-                    glyph_width = glyph.xMax - glyph.xMin
-                    ideal_lsb = (config.cn_width - glyph_width) // 2
-                    delta_x = ideal_lsb - glyph.xMin
+        outcome, changed = _scale_nerd_icon(glyf, hmtx, glyph_name, is_powerline, config)
+        counts[outcome] += 1
+        if scope is not None:
+            scope.put(key, font, glyph_name, outcome, changed)
 
-                    if abs(delta_x) > 1:
-                        glyph.coordinates.translate((delta_x, 0))
-                        glyph.recalcBounds(glyf)
+    print(f"    Powerline symbols (no scaling): {counts['powerline']}")
+    print(f"    Regular icons (scaled 1.4x): {counts['scaled']}")
+    if scope is not None:
+        print(f"    {scope.report()}")
+    return len(nerd_glyph_map)
 
-                    hmtx[glyph_name] = (config.cn_width, ideal_lsb)
-                else:
-                    hmtx[glyph_name] = (config.cn_width, 0)
 
-            powerline_count += 1
-        else:
-            # Regular icons: scale and center both horizontally and vertically
-            if hasattr(glyph, "coordinates"):
-                # Ensure bounds are calculated
-                if not hasattr(glyph, 'xMin') or glyph.xMin is None:
-                    glyph.recalcBounds(glyf)
+def _center_cjk_glyph(glyf, hmtx, glyph_name: str, side: str, config: FontConfig) -> Tuple[str, bool]:
+    """Center one CJK glyph, or align it if it is paired punctuation.
 
-                # Scale to 2x size
-                glyph.coordinates.scale((scale_factor, scale_factor))
-                glyph.recalcBounds(glyf)
+    Args:
+        side: "left" (opening punctuation, aligned right), "right"
+            (closing punctuation, aligned left) or "" (centered)
 
-            # Update advance width to CJK width (1200)
-            # Center the glyph horizontally and vertically
-            if hasattr(glyph, 'xMin') and glyph.xMin is not None:
-                glyph_width = glyph.xMax - glyph.xMin
-                ideal_lsb = (config.cn_width - glyph_width) // 2
-                delta_x = ideal_lsb - glyph.xMin
+    Returns:
+        Tuple of (outcome: "centered", "paired", "skipped" or "unchanged",
+        whether the glyph or its metrics changed)
+    """
+    glyph = glyf[glyph_name]
+    if glyph.numberOfContours <= 0:
+        return "unchanged", False
 
-                # Vertical centering: align icon center with CJK center (~360)
-                glyph_center_y = (glyph.yMin + glyph.yMax) / 2
-                target_center_y = 360  # Similar to CJK vertical center
-                delta_y = target_center_y - glyph_center_y
+    width, lsb = hmtx[glyph_name]
+    if width != config.cn_width:
+        return "unchanged", False
 
-                if abs(delta_x) > 1 or abs(delta_y) > 1:
-                    glyph.coordinates.translate((delta_x, delta_y))
-                    glyph.recalcBounds(glyf)
+    # Calculate glyph bounds
+    if not hasattr(glyph, "xMin") or glyph.xMin is None:
+        glyph.recalcBounds(glyf)
 
-                hmtx[glyph_name] = (config.cn_width, ideal_lsb)
-            else:
-                hmtx[glyph_name] = (config.cn_width, 0)
+    if glyph.xMin is None or glyph.xMax is None:
+        return "unchanged", False
+
+    glyph_width = glyph.xMax - glyph.xMin
+
+    # Handle paired punctuation specially
+    if side == "left":
+        # Left punctuation (opening): align to right side
+        ideal_lsb = config.cn_width - glyph_width
+        delta = ideal_lsb - glyph.xMin
+        if abs(delta) > 1:
+            glyph.coordinates.translate((delta, 0))
+            glyph.recalcBounds(glyf)
+            hmtx[glyph_name] = (config.cn_width, ideal_lsb)
+            return "paired", True
+        return "paired", False
 
-            scaled_count += 1
+    if side == "right":
+        # Right punctuation (closing): align to left side
+        ideal_lsb = 0
+        delta = ideal_lsb - glyph.xMin
+        if abs(delta) > 1:
+            glyph.coordinates.translate((delta, 0))
+            glyph.recalcBounds(glyf)
+            hmtx[glyph_name] = (config.cn_width, ideal_lsb)
+            return "paired", True
+        return "paired", False
 
-    print(f"    Powerline symbols (no scaling): {powerline_count}")
-    print(f"    Regular icons (scaled 1.4x): {scaled_count}")
+    # Only center glyphs that occupy more than half the advance width
+    # Narrow glyphs (like punctuation) keep their original position
+    if glyph_width <= config.cn_width // 2:
+        return "skipped", False
 
+    # Calculate centering offset
+    ideal_lsb = (config.cn_width - glyph_width) // 2
+    delta = ideal_lsb - glyph.xMin
 
-def center_cjk_glyphs(font: TTFont, config: FontConfig) -> None:
+    if abs(delta) > 1:  # Only adjust if significant
+        glyph.coordinates.translate((delta, 0))
+        glyph.recalcBounds(glyf)
+        hmtx[glyph_name] = (config.cn_width, ideal_lsb)
+        return "centered", True
+    return "unchanged", False
+
+
+def center_cjk_glyphs(font: TTFont, config: FontConfig, glyph_cache: Optional[GlyphCache] = None) -> None:
     """Center CJK glyphs within their advance width.
 
     Only centers glyphs that occupy more than half the advance width.
@@ -321,6 +496,7 @@ def center_cjk_glyphs(font: TTFont, config: FontConfig) -> None:
     Args:
         font: TTFont object
         config: FontConfig object
+        glyph_cache: GlyphCache reusing glyphs centered by earlier builds
     """
     glyf = font["glyf"]
     hmtx = font["hmtx"]
@@ -368,69 +544,41 @@ def center_cjk_glyphs(font: TTFont, config: FontConfig) -> None:
         for cp, gn in cmap.items():
             glyph_to_codepoint[gn] = cp
 
-    centered_count = 0
-    skipped_count = 0
-    paired_count = 0
+    scope = None
+    if glyph_cache is not None:
+        scope = glyph_cache.scope("center", (_center_cjk_glyph,), {"cn_width": config.cn_width})
+
+    counts = {"centered": 0, "paired": 0, "skipped": 0, "unchanged": 0}
 
     for glyph_name in cjk_glyphs:
         if glyph_name not in glyf.glyphs:
             continue
 
-        glyph = glyf[glyph_name]
-        if glyph.numberOfContours <= 0:
-            continue
-
-        width, lsb = hmtx[glyph_name]
-        if width != config.cn_width:
-            continue
-
-        # Calculate glyph bounds
-        if not hasattr(glyph, "xMin") or glyph.xMin is None:
-            glyph.recalcBounds(glyf)
-
-        if glyph.xMin is None or glyph.xMax is None:
-            continue
-
-        glyph_width = glyph.xMax - glyph.xMin
         codepoint = glyph_to_codepoint.get(glyph_name, 0)
-
-        # Handle paired punctuation specially
         if codepoint in left_punctuation:
-            # Left punctuation (opening): align to right side
-            ideal_lsb = config.cn_width - glyph_width
-            delta = ideal_lsb - glyph.xMin
-            if abs(delta) > 1:
-                glyph.coordinates.translate((delta, 0))
-                glyph.recalcBounds(glyf)
-                hmtx[glyph_name] = (config.cn_width, ideal_lsb)
-            paired_count += 1
-            continue
-
-        if codepoint in right_punctuation:
-            # Right punctuation (closing): align to left side
-            ideal_lsb = 0
-            delta = ideal_lsb - glyph.xMin
-            if abs(delta) > 1:
-                glyph.coordinates.translate((delta, 0))
-                glyph.recalcBounds(glyf)
-                hmtx[glyph_name] = (config.cn_width, ideal_lsb)
-            paired_count += 1
-            continue
-
-        # Only center glyphs that occupy more than half the advance width
-        # Narrow glyphs (like punctuation) keep their original position
-        if glyph_width <= config.cn_width // 2:
-            skipped_count += 1
-            continue
-
-        # Calculate centering offset
-        ideal_lsb = (config.cn_width - glyph_width) // 2
-        delta = ideal_lsb - glyph.xMin
-
-        if abs(delta) > 1:  # Only adjust if significant
-            glyph.coordinates.translate((delta, 0))
-            glyph.recalcBounds(glyf)
-            hmtx[glyph_name] = (config.cn_width, ideal_lsb)
-            centered_count += 1
-
-    print(f"    Centered: {centered_count}, Paired punctuation: {paired_count}, Skipped (narrow): {skipped_count}")
+            side = "left"
+        elif codepoint in right_punctuation:
+            side = "right"
+        else:
+            side = ""
+
+        key = None
+        if scope is not None:
+            key = scope.key(glyph_cache.digest(font, glyph_name), hmtx[glyph_name], side)
+            cached = scope.get(key)
+            if cached is not None:
+                scope.apply(font, glyph_name, key, cached)
+                counts[cached.outcome] += 1
+                continue
+
+        outcome, changed = _center_cjk_glyph(glyf, hmtx, glyph_name, side, config)
+        counts[outcome] += 1
+        if scope is not None:
+            scope.put(key, font, glyph_name, outcome, changed)
+
+    print(
+        f"    Centered: {counts['centered']}, Paired punctuation: {counts['paired']}, "
+        f"Skipped (narrow): {counts['skipped']}"
+    )
+    if scope is not None:
+        print(f"    {scope.report()}")
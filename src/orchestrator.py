@@ -0,0 +1,501 @@
+"""Asyncio API for running style builds and web font splits from a service.
+
+``Orchestrator`` schedules each style build (``build_single_font``) and
+each split (``split_style_font``, which runs ``split_font``) as a job on
+a process pool, so the event loop stays responsive while fonts merge:
+
+    async with Orchestrator(max_workers=4, on_progress=report) as orchestrator:
+        manifest = await orchestrator.build(plan)
+        split = await orchestrator.split(plan.output_dir, Path("output/split"), plan.config)
+
+Jobs wait for one of ``max_concurrent`` slots before they are handed to
+the pool. Workers report progress through a queue read on a background
+thread: the step a job is at (``BUILD_STEPS``, ``SPLIT_STEPS``) and every
+line it prints or logs. ``cancel`` drops a pending job at once; a running
+job stops at its next step (process pool workers cannot be interrupted
+safely mid-step).
+"""
+
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .builder import BUILD_STEPS, build_cjk_font, build_tasks, finish_build, prepare_snapshots
+from .config import CJK_SUFFIX, FontConfig
+from .plan import BuildPlan
+from .split import SPLIT_STEPS, finish_split, log_shared_chunks, plan_shared_splits, split_shared_chunks, split_style_font
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+JOB_STATES = (PENDING, RUNNING, DONE, FAILED, CANCELLED)
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Set in each worker process by _init_worker
+_events = None
+_cancel_flags = None
+
+
+class JobCancelled(Exception):
+    """Raised in a worker when its running job was cancelled."""
+
+
+@dataclass
+class Job:
+    """A build or split job and its progress.
+
+    Attributes:
+        job_id: Unique ID within the orchestrator
+        kind: "build", "split", or a helper job ("snapshots", "shared", "finish")
+        name: Style or font the job works on
+        steps: Progress steps of the job, in order (empty if it reports none)
+        state: One of JOB_STATES
+        step: Step the job is at
+        progress: Share of the steps done (1.0 when the job is done)
+        message: Last line the job printed or logged
+        log: Every line the job printed or logged
+        result: Return value of the job's function
+        error: Error of a failed job
+    """
+
+    job_id: str
+    kind: str
+    name: str
+    steps: Tuple[str, ...] = ()
+    state: str = PENDING
+    step: str = ""
+    progress: float = 0.0
+    message: str = ""
+    log: List[str] = field(default_factory=list)
+    result: Any = None
+    error: str = ""
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the job is finished (done, failed or cancelled)."""
+        return self.state in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Job state for JSON responses (without the full log and result)."""
+        data = asdict(self)
+        del data["log"], data["result"]
+        return data
+
+
+class _LineWriter(io.TextIOBase):
+    """Text stream that passes on each complete line."""
+
+    def __init__(self, emit: Callable[[str], None]):
+        self._emit = emit
+        self._buffer = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self._emit(line)
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buffer.strip():
+            self._emit(self._buffer)
+        self._buffer = ""
+
+
+class _LineHandler(logging.Handler):
+    def __init__(self, emit: Callable[[str], None]):
+        super().__init__(logging.INFO)
+        self._emit = emit
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._emit(self.format(record))
+
+
+def _init_worker(events, cancel_flags) -> None:
+    global _events, _cancel_flags
+    _events = events
+    _cancel_flags = cancel_flags
+
+
+def _run_job(job_id: str, slot: int, fn: Callable, args: tuple, reports_progress: bool) -> Any:
+    """Run a job's function in a worker, sending its steps and output lines."""
+
+    def emit(line: str) -> None:
+        _events.put((job_id, "log", line))
+
+    def progress(step: str) -> None:
+        if _cancel_flags[slot]:
+            raise JobCancelled(f"cancelled before '{step}'")
+        _events.put((job_id, "step", step))
+
+    # Lines logged by the job's module (split.py logs instead of printing)
+    logger = logging.getLogger(fn.__module__)
+    handler = _LineHandler(emit)
+    saved = logger.level, logger.propagate
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    writer = _LineWriter(emit)
+    try:
+        with contextlib.redirect_stdout(writer):
+            if reports_progress:
+                return fn(*args, progress=progress)
+            return fn(*args)
+    finally:
+        writer.flush()
+        logger.removeHandler(handler)
+        logger.level, logger.propagate = saved
+
+
+def _snapshot_sources(plan: BuildPlan) -> Dict[str, Any]:
+    prepare_snapshots(plan)
+    return {str(style_plan.cn_font_path): style_plan.cn_source for style_plan in plan.styles + plan.cjk_fonts}
+
+
+def _finish_build(plan: BuildPlan, styles: List[str]) -> Dict[str, Any]:
+    with open(finish_build(plan, styles), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Orchestrator:
+    """Runs build and split jobs on a process pool from asyncio."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_concurrent: Optional[int] = None,
+        on_progress: Optional[Callable[[Job], None]] = None,
+    ):
+        """
+        Args:
+            max_workers: Worker processes (default: CPU count)
+            max_concurrent: Jobs running at once (default: max_workers)
+            on_progress: Called on the event loop whenever a job changes
+                state, reaches a step or prints a line
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_concurrent = max_concurrent or self.max_workers
+        self.on_progress = on_progress
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._slots: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def __aenter__(self) -> "Orchestrator":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """Start the process pool and the progress reader (on the running loop)."""
+        if self._executor is not None:
+            return
+        context = multiprocessing.get_context()
+        self._loop = asyncio.get_running_loop()
+        self._events = context.SimpleQueue()
+        # One cancel flag per concurrency slot, read by the worker running the slot's job
+        self._cancel_flags = context.Array("b", self.max_concurrent, lock=False)
+        self._free_slots = list(range(self.max_concurrent))
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._events, self._cancel_flags),
+        )
+        self._reader = threading.Thread(target=self._read_events, daemon=True)
+        self._reader.start()
+
+    async def close(self) -> None:
+        """Cancel unfinished jobs, wait for running ones and stop the pool."""
+        if self._executor is None:
+            return
+        for job in list(self.jobs.values()):
+            self.cancel(job.job_id)
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self._events.put(None)
+        await asyncio.get_running_loop().run_in_executor(None, self._reader.join)
+        self._executor = None
+
+    def submit(self, kind: str, name: str, steps: Tuple[str, ...], fn: Callable, *args: Any) -> Job:
+        """Schedule a function as a job.
+
+        Args:
+            kind: Job kind (see Job)
+            name: Style or font the job works on
+            steps: Progress steps; if not empty, fn is called with a
+                ``progress`` keyword argument to report them
+            fn: Module-level function to run in a worker
+            *args: Arguments of fn (picklable)
+
+        Returns:
+            Job object, updated as the job runs
+        """
+        if self._executor is None:
+            raise RuntimeError("Orchestrator is not started")
+        job = Job(f"{next(self._ids)}-{kind}-{name}", kind, name, tuple(steps))
+        self.jobs[job.job_id] = job
+        self._tasks[job.job_id] = asyncio.ensure_future(self._run(job, fn, args))
+        self._notify(job)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job: at once if pending, at its next step if running.
+
+        Returns:
+            False if the job had already finished
+        """
+        job = self.jobs[job_id]
+        if job.done:
+            return False
+        if job_id in self._slots:
+            self._cancel_flags[self._slots[job_id]] = 1
+        else:
+            self._tasks[job_id].cancel()
+            self._finish(job, CANCELLED)
+        return True
+
+    async def wait(self, jobs: Sequence[Job]) -> List[Job]:
+        """Wait until jobs have finished; cancelling the wait cancels them."""
+        try:
+            await asyncio.gather(*(asyncio.shield(self._tasks[job.job_id]) for job in jobs))
+        except asyncio.CancelledError:
+            for job in jobs:
+                self.cancel(job.job_id)
+            raise
+        return list(jobs)
+
+    def prune(self) -> None:
+        """Forget finished jobs (long-running services)."""
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done]:
+            del self.jobs[job_id]
+            del self._tasks[job_id]
+
+    async def build(self, plan: BuildPlan, styles: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build styles of a plan, one job per style, and write the manifest.
+
+        In the companion layout, each CJK-only font the styles fall back
+        to is built by a job of its own, named ``CJK-<style>``.
+
+        CN font snapshots (if plan.snapshot_dir is set) are prepared first.
+        Fonts are saved serially in the workers, since the pool already
+        runs one style per worker. Preview fonts, the TrueType Collection
+        and fonts-manifest.json are written after the styles are built.
+
+        Args:
+            plan: BuildPlan object
+            styles: Styles to build (default: all styles of the plan)
+
+        Returns:
+            Manifest data (contents of fonts-manifest.json)
+
+        Raises:
+            RuntimeError: If a job failed or was cancelled
+        """
+        styles = styles or [style_plan.style for style_plan in plan.styles]
+        plan.output_dir.mkdir(parents=True, exist_ok=True)
+
+        if plan.snapshot_dir:
+            (snapshots,) = self._check(await self.wait([self.submit("snapshots", "cn", (), _snapshot_sources, plan)]))
+            for style_plan in plan.styles + plan.cjk_fonts:
+                style_plan.cn_source = snapshots.result[str(style_plan.cn_font_path)]
+
+        config = replace(plan.config, save_workers=1)
+        jobs = [
+            self.submit(
+                "build",
+                f"{CJK_SUFFIX}-{style_plan.style}" if build is build_cjk_font else style_plan.style,
+                BUILD_STEPS,
+                build,
+                style_plan.style,
+                style_plan.en_font_path,
+                style_plan.cn_input,
+                style_plan.display_name,
+                plan.output_dir,
+                config,
+                plan.metadata,
+            )
+            for build, style_plan in build_tasks(plan, styles)
+        ]
+        self._check(await self.wait(jobs))
+        (finish,) = self._check(await self.wait([self.submit("finish", "manifest", (), _finish_build, plan, styles)]))
+        return finish.result
+
+    async def split(
+        self,
+        input_dir: Path,
+        output_dir: Path,
+        config: FontConfig,
+        share_chunks: bool = True,
+    ) -> Dict[str, Any]:
+        """Split the built fonts of a directory for the web, one job per font.
+
+        As with split.py, the shared CJK chunks of styles with identical
+        glyphs are split first (see src/sharedchunks.py), and a font that
+        fails to split is left out of all.css.
+
+        Args:
+            input_dir: Directory containing font files (e.g., output/fonts/)
+            output_dir: Base directory for split output (e.g., output/split/)
+            config: FontConfig object
+            share_chunks: Whether styles with identical CJK glyphs share
+                their CJK chunks
+
+        Returns:
+            Dict with the all.css path ("css"), the split directory of
+            each font ("fonts") and the error of each font that failed
+            ("failed")
+
+        Raises:
+            FileNotFoundError: If input_dir has no .ttf files
+            RuntimeError: If sharing could not be planned or the CSS not written
+        """
+        font_files = sorted(input_dir.glob("*.ttf"))
+        if not font_files:
+            raise FileNotFoundError(f"No .ttf files found in {input_dir}")
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        shared_faces: Dict[str, list] = {}
+        if share_chunks:
+            from .sharedchunks import SHARED_DIR
+
+            shared_dir = output_dir / SHARED_DIR
+            (planned,) = self._check(
+                await self.wait([self.submit("shared", "plan", (), plan_shared_splits, font_files, output_dir, config)])
+            )
+            font_paths = {font_file.stem: font_file for font_file in font_files}
+            groups = {
+                self.submit(
+                    "shared",
+                    group.styles[0],
+                    SPLIT_STEPS,
+                    split_shared_chunks,
+                    font_paths[group.styles[0]],
+                    group.codepoints,
+                    config,
+                    shared_dir,
+                ).job_id: group
+                for group in planned.result
+            }
+            # Styles of a group whose shared chunks failed are split whole
+            for job in await self.wait([self.jobs[job_id] for job_id in groups]):
+                if job.state == DONE:
+                    log_shared_chunks(groups[job.job_id], job.result, shared_dir)
+                    for stem in groups[job.job_id].styles:
+                        shared_faces[stem] = job.result
+
+        jobs = [
+            self.submit(
+                "split",
+                font_file.stem,
+                SPLIT_STEPS,
+                split_style_font,
+                font_file,
+                output_dir,
+                config,
+                shared_faces.get(font_file.stem),
+            )
+            for font_file in font_files
+        ]
+        await self.wait(jobs)
+        split_dirs = [job.result for job in jobs if job.state == DONE]
+        self._check(await self.wait([self.submit("finish", "css", (), finish_split, split_dirs, output_dir, share_chunks)]))
+        return {
+            "css": str(output_dir / "all.css"),
+            "fonts": {job.name: str(job.result) for job in jobs if job.state == DONE},
+            "failed": {job.name: job.error or job.state for job in jobs if job.state != DONE},
+        }
+
+    def _check(self, jobs: List[Job]) -> List[Job]:
+        failed = [job for job in jobs if job.state != DONE]
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} job(s) {'/'.join(sorted({job.state for job in failed}))}: "
+                + ", ".join(f"{job.name} ({job.error or job.state})" for job in failed)
+            )
+        return jobs
+
+    async def _run(self, job: Job, fn: Callable, args: tuple) -> None:
+        try:
+            await self._semaphore.acquire()
+        except asyncio.CancelledError:
+            # Marked cancelled by cancel()
+            return
+
+        slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        self._slots[job.job_id] = slot
+        job.state = RUNNING
+        job.started = time.time()
+        self._notify(job)
+        state = FAILED
+        try:
+            future = self._executor.submit(_run_job, job.job_id, slot, fn, args, bool(job.steps))
+            job.result = await asyncio.wrap_future(future)
+            state = DONE
+        except JobCancelled:
+            state = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            del self._slots[job.job_id]
+            self._free_slots.append(slot)
+            self._semaphore.release()
+            self._finish(job, state)
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished = time.time()
+        if state == DONE:
+            job.progress = 1.0
+        self._notify(job)
+
+    def _read_events(self) -> None:
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_event, *event)
+
+    def _on_event(self, job_id: str, kind: str, value: str) -> None:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if kind == "step":
+            # Steps can arrive after the result; they do not move a finished job back
+            if job.done:
+                return
+            job.step = value
+            if value in job.steps:
+                job.progress = job.steps.index(value) / len(job.steps)
+        else:
+            job.log.append(value)
+            job.message = value
+        self._notify(job)
+
+    def _notify(self, job: Job) -> None:
+        if self.on_progress is not None:
+            self.on_progress(job)
@@ -0,0 +1,300 @@
+"""Release packaging: stream built fonts and split chunks into zip archives.
+
+Files are read and deflated in a thread pool (zlib releases the GIL), while
+a single writer streams the finished entries into the archive in a fixed,
+sorted order. Only a bounded window of compressed entries is held in
+memory. Already-compressed formats (WOFF2, WOFF, ...) are stored as-is.
+
+Archives are reproducible: entries are sorted and timestamped from
+SOURCE_DATE_EPOCH when set (file mtime otherwise), and a SHA256SUMS file
+is written next to them.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from .plan import load_manifest_fonts
+from .utils import file_sha256
+
+# Formats that are already compressed and gain nothing from deflate
+STORED_SUFFIXES = {".woff2", ".woff", ".zip", ".gz", ".br", ".png", ".jpg", ".jpeg"}
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Zip format limits without the Zip64 extension
+MAX_ENTRIES = 0xFFFF
+MAX_SIZE = 0xFFFFFFFF
+
+
+@dataclass
+class ZipEntry:
+    """A file compressed and ready to be written into an archive."""
+
+    arcname: str
+    method: int
+    crc: int
+    size: int
+    data: bytes
+    dos_time: int
+    dos_date: int
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    """Convert a UNIX timestamp to zip (MS-DOS) time and date fields."""
+    t = time.gmtime(max(timestamp, 315532800))  # zip dates start in 1980
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _entry_timestamp(path: Path) -> float:
+    source_date_epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if source_date_epoch:
+        return float(source_date_epoch)
+    return path.stat().st_mtime
+
+
+def compress_file(path: Path, arcname: str, level: int = 9) -> ZipEntry:
+    """Read and compress one file (runs in a worker thread).
+
+    Args:
+        path: File to add
+        arcname: Name inside the archive (forward slashes)
+        level: Deflate level (0-9)
+
+    Returns:
+        ZipEntry object
+    """
+    raw = path.read_bytes()
+    if len(raw) > MAX_SIZE:
+        raise ValueError(f"File too large for zip without Zip64: {path}")
+    crc = zlib.crc32(raw)
+    method = ZIP_STORED
+    data = raw
+    if path.suffix.lower() not in STORED_SUFFIXES:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        deflated = compressor.compress(raw) + compressor.flush()
+        # Keep incompressible files stored
+        if len(deflated) < len(raw):
+            method, data = ZIP_DEFLATED, deflated
+    dos_time, dos_date = _dos_datetime(_entry_timestamp(path))
+    return ZipEntry(arcname, method, crc, len(raw), data, dos_time, dos_date)
+
+
+class _HashingWriter:
+    """File wrapper that tracks the offset and SHA-256 of written bytes."""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.offset = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.sha256.update(data)
+        self.offset += len(data)
+
+
+def write_zip(
+    files: List[Tuple[Path, str]],
+    archive_path: Path,
+    workers: Optional[int] = None,
+    level: int = 9,
+) -> Dict[str, Any]:
+    """Write files into a zip archive, compressing in parallel.
+
+    Args:
+        files: (path, arcname) pairs; written in arcname order
+        archive_path: Output zip path
+        workers: Compression threads (default: CPU count)
+        level: Deflate level (0-9)
+
+    Returns:
+        Dict with "files", "size" (uncompressed), "archive_size",
+        "stored" (entries written without compression) and "sha256"
+    """
+    files = sorted(files, key=lambda item: item[1])
+    if len(files) > MAX_ENTRIES:
+        raise ValueError(f"Too many files for zip without Zip64: {len(files)}")
+    workers = workers or os.cpu_count() or 1
+
+    central_directory = []
+    stats: Dict[str, Any] = {"files": 0, "size": 0, "stored": 0}
+    tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        out = _HashingWriter(f)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Bounded window of in-flight entries, consumed in order
+            window: deque = deque()
+            pending = iter(files)
+            for path, arcname in pending:
+                window.append(executor.submit(compress_file, path, arcname, level))
+                if len(window) >= workers * 2:
+                    break
+            while window:
+                entry = window.popleft().result()
+                next_file = next(pending, None)
+                if next_file is not None:
+                    window.append(executor.submit(compress_file, next_file[0], next_file[1], level))
+
+                name = entry.arcname.encode("utf-8")
+                offset = out.offset
+                out.write(struct.pack(
+                    "<IHHHHHIIIHH", 0x04034B50, 20, 0x0800, entry.method,
+                    entry.dos_time, entry.dos_date, entry.crc,
+                    len(entry.data), entry.size, len(name), 0,
+                ))
+                out.write(name)
+                out.write(entry.data)
+                if out.offset > MAX_SIZE:
+                    raise ValueError(f"Archive too large for zip without Zip64: {archive_path}")
+                central_directory.append(struct.pack(
+                    "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | 20, 20, 0x0800, entry.method,
+                    entry.dos_time, entry.dos_date, entry.crc,
+                    len(entry.data), entry.size, len(name), 0, 0, 0, 0,
+                    0o100644 << 16, offset,
+                ) + name)
+
+                stats["files"] += 1
+                stats["size"] += entry.size
+                stats["stored"] += entry.method == ZIP_STORED
+
+        directory_offset = out.offset
+        for record in central_directory:
+            out.write(record)
+        out.write(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, len(central_directory), len(central_directory),
+            out.offset - directory_offset, directory_offset, 0,
+        ))
+    os.replace(tmp_path, archive_path)
+
+    stats["archive_size"] = archive_path.stat().st_size
+    stats["sha256"] = out.sha256.hexdigest()
+    return stats
+
+
+def collect_tree(root: Path) -> List[Tuple[Path, str]]:
+    """List all files under a directory as (path, arcname) pairs."""
+    return [
+        (path, path.relative_to(root).as_posix())
+        for path in sorted(root.rglob("*"))
+        if path.is_file()
+    ]
+
+
+def write_checksums(paths: Iterable[Path], checksums_path: Path, known: Optional[Dict[Path, str]] = None) -> None:
+    """Write a SHA256SUMS file (``sha256sum -c`` format) for files in its directory.
+
+    Args:
+        paths: Files to list (must be in checksums_path's directory)
+        checksums_path: Output path
+        known: Already computed digests, to avoid re-reading files
+    """
+    known = known or {}
+    lines = []
+    for path in sorted(paths, key=lambda p: p.name):
+        digest = known.get(path) or file_sha256(path)
+        lines.append(f"{digest}  {path.name}\n")
+    checksums_path.write_text("".join(lines), encoding="utf-8")
+
+
+def package_release(
+    fonts_dir: Path,
+    split_dir: Optional[Path],
+    release_dir: Path,
+    family_name: Optional[str] = None,
+    workers: Optional[int] = None,
+    level: int = 9,
+) -> Path:
+    """Create the release archives and checksums.
+
+    Produces in release_dir:
+    - ``<family>.zip``: the TTFs listed in fonts-manifest.json, with their
+      supplementary fonts, or CJK-only fonts and fallback snippets
+    - ``<family>-split-woff2.zip``: the split web fonts (if split_dir exists)
+    - the single TTF files
+    - the TrueType Collection, if the manifest lists one
+    - ``SHA256SUMS`` for all of the above
+
+    Args:
+        fonts_dir: Directory with built fonts and fonts-manifest.json
+        split_dir: Directory with split web fonts (skipped if missing)
+        release_dir: Output directory
+        family_name: Archive name prefix (default: family_name from the
+            manifest, without spaces)
+        workers: Compression threads (default: CPU count)
+        level: Deflate level (0-9)
+
+    Returns:
+        Path to SHA256SUMS
+    """
+    release_dir.mkdir(parents=True, exist_ok=True)
+    with open(fonts_dir / "fonts-manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if family_name is None:
+        family_name = manifest["family_name"].replace(" ", "")
+    font_paths = list(load_manifest_fonts(fonts_dir).values())
+    for entry in manifest["fonts"]:
+        if "supplement" in entry:
+            supplement_path = fonts_dir / entry["supplement"]["filename"]
+            if not supplement_path.exists():
+                raise FileNotFoundError(f"Supplementary font listed in manifest not found: {supplement_path}")
+            font_paths.append(supplement_path)
+        if "cjk" in entry:
+            cjk_path = fonts_dir / entry["cjk"]["filename"]
+            if not cjk_path.exists():
+                raise FileNotFoundError(f"CJK font listed in manifest not found: {cjk_path}")
+            if cjk_path not in font_paths:
+                font_paths.append(cjk_path)
+    font_paths.sort()
+    # Fallback snippets of the companion layout go into the TTF archive only
+    snippet_paths = [fonts_dir / name for name in manifest.get("fallback", [])]
+    if "collection" in manifest:
+        collection_path = fonts_dir / manifest["collection"]["filename"]
+        if not collection_path.exists():
+            raise FileNotFoundError(f"Collection listed in manifest not found: {collection_path}")
+        single_paths = font_paths + [collection_path]
+    else:
+        single_paths = font_paths
+    released: Dict[Path, str] = {}
+
+    jobs = [(f"{family_name}.zip", [(path, path.name) for path in font_paths + snippet_paths])]
+    if split_dir and split_dir.is_dir():
+        jobs.append((f"{family_name}-split-woff2.zip", collect_tree(split_dir)))
+    else:
+        print(f"  Split directory not found, skipping web font archive: {split_dir}")
+
+    for archive_name, files in jobs:
+        if not files:
+            print(f"  Nothing to package for {archive_name}")
+            continue
+        start = time.perf_counter()
+        archive_path = release_dir / archive_name
+        stats = write_zip(files, archive_path, workers=workers, level=level)
+        released[archive_path] = stats["sha256"]
+        ratio = stats["archive_size"] / stats["size"] if stats["size"] else 1.0
+        print(
+            f"  {archive_name}: {stats['files']} files ({stats['stored']} stored), "
+            f"{stats['size'] / 1024 / 1024:.1f} MB -> {stats['archive_size'] / 1024 / 1024:.1f} MB "
+            f"({ratio:.0%}) in {time.perf_counter() - start:.1f}s"
+        )
+
+    for path in single_paths:
+        target = release_dir / path.name
+        shutil.copyfile(path, target)
+        released[target] = ""
+
+    checksums_path = release_dir / "SHA256SUMS"
+    write_checksums(released.keys(), checksums_path, {p: d for p, d in released.items() if d})
+    return checksums_path
@@ -0,0 +1,622 @@
+"""In-memory build pipeline: merge one style and return the font as bytes.
+
+This is the library entry point for embedding the builder in other tools
+(asset pipelines, services). Sources may be paths, raw bytes or file
+objects, and results are returned as bytes without touching the disk.
+Each call works on its own TTFont objects, so builds can run concurrently
+in threads or processes.
+
+The merge runs as named phases (``PHASES``). With a checkpoint directory
+set in FontConfig, the intermediate font is saved after selected phases
+(see checkpoint.py), and ``from_phase`` resumes from the latest valid
+checkpoint instead of merging again. With a glyph cache directory set,
+the merge, icons and center phases reuse glyphs transformed by earlier
+builds (see glyphcache.py).
+
+Before merging, the glyph budget of the style is planned (see budget.py):
+CJK glyphs that do not fit are dropped or built into a supplementary
+font by ``merge_supplement``.
+
+In the companion layout (``cjk_layout="companion"``), ``merge_latin``
+builds a style without CJK glyphs and ``merge_cjk`` builds the CJK-only
+font its CJK text falls back to (see fallback.py).
+"""
+
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from fontTools.ttLib import TTFont
+
+from . import hinting, iconsets, merge, ordering, utils
+from .budget import GlyphBudget, plan_glyph_budget
+from .checkpoint import CheckpointStore, code_fingerprint, phase_key, root_key, source_fingerprint
+from .companion import companion_base, companion_config
+from .config import CJK_SUFFIX, PHASES, SUPPLEMENT_SUFFIX, FontConfig
+from .glyfcompile import save_font_parallel
+from .glyphcache import GlyphCache
+from .hinting import strip_hinting
+from .iconsets import IconDrop, drop_icon_sets
+from .merge import center_cjk_glyphs, merge_fonts, scale_nerd_icons
+from .ordering import first_imported_glyph, reorder_imported_glyphs, report_glyph_order
+from .snapshot import FontSnapshot, is_snapshot
+from .utils import apply_style_names, set_reproducible_timestamp, verify_glyph_width
+
+FontSource = Union[str, Path, bytes, bytearray, BinaryIO, FontSnapshot]
+
+FLAVORS = ("ttf", "woff", "woff2")
+
+
+def open_source(source: FontSource):
+    """Turn a font source into something TTFont (or merge_fonts) can open.
+
+    Bytes are wrapped in a fresh BytesIO on every call, so the same bytes
+    can be shared by concurrent builds.
+
+    Args:
+        source: Path, bytes, file object or FontSnapshot
+
+    Returns:
+        Path string, file object or FontSnapshot
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    if isinstance(source, Path) or (isinstance(source, str) and not is_snapshot(source)):
+        return str(source)
+    return source
+
+
+@dataclass
+class PhaseContext:
+    """Inputs of one style build and the font being transformed."""
+
+    style: str
+    en_font: FontSource
+    # None builds the style without CJK glyphs (companion layout)
+    cn_font: Optional[FontSource]
+    display_name: str
+    config: FontConfig
+    metadata: dict
+    # CJK glyphs to import, sorted (None imports all of them)
+    include: Optional[Tuple[str, ...]] = None
+    font: Optional[TTFont] = None
+    glyph_cache: Optional[GlyphCache] = None
+    # Called with the name of each phase before it runs
+    progress: Optional[Callable[[str], None]] = None
+    # Icons of unselected sets dropped by the merge phase
+    icon_drop: Optional[IconDrop] = None
+    # Name checkpoints are stored under (style if empty); companion fonts
+    # share their style with the font they accompany
+    checkpoint_name: str = ""
+
+    @property
+    def checkpoint_style(self) -> str:
+        return self.checkpoint_name or self.style
+
+
+def _run_merge(ctx: PhaseContext) -> None:
+    base_font = open_source(ctx.en_font)
+    if ctx.config.nerd_icon_sets:
+        # Unselected icons go before any glyph is scaled
+        print(f"  Loading base font, keeping icon sets: {', '.join(ctx.config.nerd_icon_sets)}")
+        base_font = TTFont(base_font)
+        ctx.icon_drop = drop_icon_sets(base_font, ctx.config)
+        if ctx.icon_drop is not None:
+            print(f"    {ctx.icon_drop.summary()}")
+    if ctx.cn_font is None:
+        # CJK glyphs are in the CJK-only font of the companion layout
+        if not isinstance(base_font, TTFont):
+            print("  Loading base font (no CJK glyphs)")
+            base_font = TTFont(base_font)
+        ctx.font = base_font
+        return
+    ctx.font = merge_fonts(
+        base_font_path=base_font,
+        cn_font_path=open_source(ctx.cn_font),
+        config=ctx.config,
+        glyph_cache=ctx.glyph_cache,
+        include=set(ctx.include) if ctx.include is not None else None,
+    )
+
+
+def _run_icons(ctx: PhaseContext) -> None:
+    # Monospace-specific processing: scale NerdFont icons to CJK width
+    print("  Scaling NerdFont icons...")
+    start = time.perf_counter()
+    icons = scale_nerd_icons(ctx.font, ctx.config, glyph_cache=ctx.glyph_cache)
+    if ctx.icon_drop is not None:
+        print(f"    {ctx.icon_drop.scaling_saved(time.perf_counter() - start, icons)}")
+
+
+def _run_center(ctx: PhaseContext) -> None:
+    print("  Centering CJK glyphs...")
+    center_cjk_glyphs(ctx.font, ctx.config, glyph_cache=ctx.glyph_cache)
+
+
+def _run_hinting(ctx: PhaseContext) -> None:
+    # Strip instructions that no longer match the transformed outlines
+    config = ctx.config
+    if config.strip_hinting != "none":
+        print(f"  Stripping hinting ({config.strip_hinting})...")
+        strip_hinting(ctx.font, config, config.strip_hinting, report=config.hinting_report)
+
+
+def _run_order(ctx: PhaseContext) -> None:
+    # Group imported glyphs for better compression
+    config = ctx.config
+    if config.glyph_order != "source":
+        print(f"  Ordering imported glyphs ({config.glyph_order})...")
+        first_imported = first_imported_glyph(open_source(ctx.en_font), ctx.font)
+        if config.glyph_order_report:
+            report_glyph_order(ctx.font, first_imported, config.glyph_order)
+        else:
+            reorder_imported_glyphs(ctx.font, first_imported, config.glyph_order)
+
+
+def _run_names(ctx: PhaseContext) -> None:
+    print("  Updating font metadata...")
+    apply_style_names(ctx.font, ctx.config, ctx.style, ctx.display_name, ctx.metadata)
+
+
+@dataclass(frozen=True)
+class Phase:
+    """A named step of the merge pipeline.
+
+    Attributes:
+        name: Phase name (see PHASES in config.py)
+        run: Function transforming ctx.font in place (merge creates it)
+        config_fields: FontConfig fields the phase output depends on
+        context_fields: PhaseContext fields the phase output depends on
+        code: Functions whose source is part of the checkpoint key
+    """
+
+    name: str
+    run: Callable[[PhaseContext], None]
+    config_fields: Tuple[str, ...] = ()
+    context_fields: Tuple[str, ...] = ()
+    code: Tuple[Callable, ...] = ()
+
+    def inputs(self, ctx: PhaseContext) -> Dict[str, Any]:
+        values = {name: getattr(ctx.config, name) for name in self.config_fields}
+        values.update({name: getattr(ctx, name) for name in self.context_fields})
+        return values
+
+
+# Phases in run order; names match PHASES in config.py
+PIPELINE: Tuple[Phase, ...] = (
+    Phase(
+        "merge", _run_merge,
+        config_fields=("visual_scale", "en_width", "cn_width", "cjk_ranges", "nerd_icon_sets"),
+        context_fields=("include",),
+        code=(_run_merge, merge.merge_fonts, merge.get_cjk_glyphs, merge.get_cjk_cmap_entries,
+              utils.merge_os2_ranges, utils.is_cjk_codepoint,
+              iconsets.drop_icon_sets, iconsets.plan_icon_drop, iconsets.dropped_icon_ranges),
+    ),
+    Phase(
+        "icons", _run_icons,
+        config_fields=("en_width", "cn_width", "nerd_ranges", "powerline_range"),
+        code=(_run_icons, merge.scale_nerd_icons, merge._scale_nerd_icon),
+    ),
+    Phase(
+        "center", _run_center,
+        config_fields=("cn_width", "cjk_ranges"),
+        code=(_run_center, merge.center_cjk_glyphs, merge._center_cjk_glyph, merge.get_cjk_glyphs),
+    ),
+    Phase(
+        "hinting", _run_hinting,
+        config_fields=("strip_hinting", "cn_width", "cjk_ranges", "nerd_ranges", "powerline_range"),
+        code=(_run_hinting, hinting.strip_hinting, hinting.get_transformed_glyphs,
+              hinting.strip_glyph_instructions, hinting.prune_hinting_tables, utils.classify_codepoint),
+    ),
+    Phase(
+        "order", _run_order,
+        config_fields=("glyph_order", "glyph_order_report"),
+        code=(_run_order, ordering.reorder_imported_glyphs, ordering.sort_imported_glyphs,
+              ordering.lowest_codepoints, ordering._outline_key, ordering.first_imported_glyph),
+    ),
+    Phase(
+        "names", _run_names,
+        config_fields=("family_name", "family_name_compact", "version"),
+        context_fields=("style", "display_name", "metadata"),
+        code=(_run_names, utils.apply_style_names, utils.update_font_names,
+              utils.set_font_name, utils.set_font_revision),
+    ),
+)
+
+def phase_keys(ctx: PhaseContext) -> List[str]:
+    """Get the chained checkpoint key of every phase for one style build."""
+    cn_fingerprint = source_fingerprint(ctx.cn_font) if ctx.cn_font is not None else ""
+    key = root_key(source_fingerprint(ctx.en_font), cn_fingerprint)
+    keys = []
+    for phase in PIPELINE:
+        key = phase_key(key, phase.name, phase.inputs(ctx), code_fingerprint(phase.code))
+        keys.append(key)
+    return keys
+
+
+def resume_point(ctx: PhaseContext, store: CheckpointStore, keys: List[str], from_phase: str) -> int:
+    """Load the latest valid checkpoint before a phase into ctx.font.
+
+    Args:
+        ctx: PhaseContext (font is set when a checkpoint is found)
+        store: CheckpointStore to look in
+        keys: phase_keys() of the build
+        from_phase: Phase to resume from, or "latest" for the last
+            phase that has a valid checkpoint
+
+    Returns:
+        Index in PIPELINE of the first phase left to run
+    """
+    start = len(PIPELINE) if from_phase == "latest" else PHASES.index(from_phase)
+    if start == 0:
+        return 0
+    for index in range(start - 1, -1, -1):
+        name = PIPELINE[index].name
+        font = store.load(ctx.checkpoint_style, name, keys[index])
+        if font is not None:
+            print(f"  Resuming after '{name}' from checkpoint: {store.path(ctx.checkpoint_style, name, keys[index])}")
+            ctx.font = font
+            return index + 1
+    print("  No valid checkpoint found, running all phases")
+    return 0
+
+
+def plan_style_budget(en_font: FontSource, cn_font: FontSource, config: FontConfig) -> GlyphBudget:
+    """Plan and print the glyph budget of one style (see budget.py).
+
+    Args:
+        en_font: English font (e.g., JetBrains Mono NerdFont)
+        cn_font: Chinese font (e.g., LXGW WenKai Mono) or its snapshot
+        config: FontConfig object
+
+    Returns:
+        GlyphBudget object
+
+    Raises:
+        ValueError: If the style cannot be built within the budget
+    """
+    budget = plan_glyph_budget(open_source(en_font), open_source(cn_font), config)
+    print(f"  {budget.summary()}")
+    for line in budget.details() if not budget.fits else ():
+        print(f"    {line}")
+    budget.check()
+    return budget
+
+
+def merge_style(
+    style: str,
+    en_font: FontSource,
+    cn_font: FontSource,
+    display_name: str,
+    config: FontConfig,
+    metadata: dict,
+    budget: Optional[GlyphBudget] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Tuple[TTFont, str]:
+    """Run the full merge pipeline for one style in memory.
+
+    Phases run in PHASES order. If config.checkpoint_dir is set, the font
+    is saved after each phase in config.checkpoint_after, and
+    config.from_phase resumes from the latest valid checkpoint before
+    that phase. If config.glyph_cache_dir is set, unchanged glyphs are
+    taken from the glyph cache instead of being transformed again.
+
+    Args:
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        en_font: English font (e.g., JetBrains Mono NerdFont)
+        cn_font: Chinese font (e.g., LXGW WenKai Mono) or its snapshot
+        display_name: Display name for the style in font metadata
+        config: FontConfig object
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        budget: Glyph budget from plan_style_budget (planned here if None)
+        progress: Called with the name of each phase before it runs
+
+    Returns:
+        Tuple of (merged TTFont ready to save, PostScript name)
+
+    Raises:
+        ValueError: If the style cannot be built within the glyph budget
+    """
+    if budget is None:
+        budget = plan_style_budget(en_font, cn_font, config)
+    include = tuple(sorted(budget.kept)) if budget.kept is not None else None
+    ctx = PhaseContext(style, en_font, cn_font, display_name, config, metadata, include=include, progress=progress)
+    return _run_pipeline(ctx)
+
+
+def merge_supplement(
+    style: str,
+    en_font: FontSource,
+    cn_font: FontSource,
+    display_name: str,
+    config: FontConfig,
+    metadata: dict,
+    budget: GlyphBudget,
+) -> Optional[Tuple[TTFont, str]]:
+    """Build the supplementary font of the CJK glyphs over the glyph budget.
+
+    The font is named ``<family> Supplement`` and holds the overflow
+    glyphs on the base font's metrics (see companion.py).
+
+    Args:
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        en_font: English font the style was merged from
+        cn_font: Chinese font the style was merged from, or its snapshot
+        display_name: Display name for the style in font metadata
+        config: FontConfig object
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        budget: Glyph budget the style was merged with
+
+    Returns:
+        Tuple of (supplementary TTFont ready to save, PostScript name),
+        or None if the budget has no supplementary font
+    """
+    if not budget.companion:
+        return None
+    print(f"  Building supplementary font ({len(budget.overflow_glyphs)} glyphs)...")
+    ctx = PhaseContext(
+        style,
+        companion_base(open_source(en_font)),
+        cn_font,
+        display_name,
+        companion_config(config, SUPPLEMENT_SUFFIX),
+        metadata,
+        include=tuple(sorted(budget.overflow_glyphs)),
+        checkpoint_name=f"{SUPPLEMENT_SUFFIX}-{style}",
+    )
+    return _run_pipeline(ctx)
+
+
+def merge_latin(
+    style: str,
+    en_font: FontSource,
+    display_name: str,
+    config: FontConfig,
+    metadata: dict,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Tuple[TTFont, str]:
+    """Run the merge pipeline for one style without CJK glyphs (companion layout).
+
+    The style keeps the English glyphs and NerdFont icons of its base
+    font, with icons scaled to the CJK width as in a merged font. Its CJK
+    text falls back to the font built by ``merge_cjk``.
+
+    Args:
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        en_font: English font (e.g., JetBrains Mono NerdFont)
+        display_name: Display name for the style in font metadata
+        config: FontConfig object
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        progress: Called with the name of each phase before it runs
+
+    Returns:
+        Tuple of (TTFont ready to save, PostScript name)
+    """
+    ctx = PhaseContext(style, en_font, None, display_name, config, metadata, include=(), progress=progress)
+    return _run_pipeline(ctx)
+
+
+def merge_cjk(
+    style: str,
+    en_font: FontSource,
+    cn_font: FontSource,
+    display_name: str,
+    config: FontConfig,
+    metadata: dict,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Tuple[TTFont, str]:
+    """Build the CJK-only font of a CN font (companion layout).
+
+    The font is named ``<family> CJK`` and holds the CJK glyphs that fit
+    the glyph budget on the base font's metrics (see companion.py), so it
+    lines up with the CJK-free styles on the 2:1 grid.
+
+    Args:
+        style: Style whose name and base font the CJK font takes
+        en_font: English font of that style
+        cn_font: Chinese font (e.g., LXGW WenKai Mono) or its snapshot
+        display_name: Display name for the style in font metadata
+        config: FontConfig of the main fonts
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        progress: Called with the name of each phase before it runs
+
+    Returns:
+        Tuple of (CJK TTFont ready to save, PostScript name)
+
+    Raises:
+        ValueError: If the CJK glyphs do not fit the glyph budget
+    """
+    base = companion_base(open_source(en_font))
+    cjk_config = companion_config(config, CJK_SUFFIX)
+    budget = plan_style_budget(base, cn_font, cjk_config)
+    if budget.companion:
+        raise ValueError("Glyphs over the budget of a CJK-only font cannot go into a supplementary font")
+    include = tuple(sorted(budget.kept)) if budget.kept is not None else None
+    ctx = PhaseContext(
+        style,
+        base,
+        cn_font,
+        display_name,
+        cjk_config,
+        metadata,
+        include=include,
+        progress=progress,
+        checkpoint_name=f"{CJK_SUFFIX}-{style}",
+    )
+    return _run_pipeline(ctx)
+
+
+def plan_cjk_budget(en_font: FontSource, cn_font: FontSource, config: FontConfig) -> GlyphBudget:
+    """Plan and print the glyph budget of a CJK-only font (see merge_cjk)."""
+    return plan_style_budget(companion_base(open_source(en_font)), cn_font, companion_config(config, CJK_SUFFIX))
+
+
+def _run_pipeline(ctx: PhaseContext) -> Tuple[TTFont, str]:
+    """Run the phases of a style build and finish the font for saving."""
+    config = ctx.config
+    start = 0
+    store = keys = None
+    if config.checkpoint_dir:
+        store = CheckpointStore(config.checkpoint_dir)
+        keys = phase_keys(ctx)
+        if config.from_phase:
+            start = resume_point(ctx, store, keys, config.from_phase)
+
+    if config.glyph_cache_dir:
+        ctx.glyph_cache = GlyphCache(config.glyph_cache_dir)
+    try:
+        for index in range(start, len(PIPELINE)):
+            phase = PIPELINE[index]
+            if ctx.progress is not None:
+                ctx.progress(phase.name)
+            phase.run(ctx)
+            if store is not None and phase.name in config.checkpoint_after:
+                path = store.save(ctx.font, ctx.checkpoint_style, phase.name, keys[index])
+                print(f"  Checkpoint after '{phase.name}': {path}")
+    finally:
+        # Glyphs transformed so far are valid whatever happens next
+        if ctx.glyph_cache is not None:
+            ctx.glyph_cache.close()
+
+    merged_font = ctx.font
+    postscript_name = merged_font["name"].getDebugName(6)
+
+    # Verify glyph widths
+    print("  Verifying glyph widths...")
+    try:
+        verify_glyph_width(
+            font=merged_font,
+            expected_widths=[0, config.en_width, config.cn_width],
+            file_name=postscript_name,
+        )
+    except ValueError as e:
+        print(f"  Warning: {e}")
+
+    # Fixed timestamps for reproducible bytes
+    set_reproducible_timestamp(merged_font)
+    return merged_font, postscript_name
+
+
+def compile_font(font: TTFont, workers: int = 1) -> bytes:
+    """Compile a TTFont to TTF bytes (sorted tables for reproducible output).
+
+    Args:
+        font: Font to compile
+        workers: Processes compiling glyf/loca (1 for fontTools' serial
+            compile; output bytes are the same either way)
+
+    Returns:
+        Compiled TTF bytes
+    """
+    buffer = BytesIO()
+    stats = save_font_parallel(font, buffer, workers)
+    if stats is not None:
+        print(f"  {stats.summary()}")
+    return buffer.getvalue()
+
+
+def convert_flavor(ttf_data: bytes, flavor: str) -> bytes:
+    """Convert compiled TTF bytes to another flavor.
+
+    Args:
+        ttf_data: Compiled TTF
+        flavor: "ttf", "woff" or "woff2" (woff2 requires brotli)
+
+    Returns:
+        Font bytes in the requested flavor
+    """
+    if flavor not in FLAVORS:
+        raise ValueError(f"Invalid flavor '{flavor}'. Valid flavors: {list(FLAVORS)}")
+    if flavor == "ttf":
+        return ttf_data
+    # Lazy font: tables are copied raw into the WOFF/WOFF2 container
+    font = TTFont(BytesIO(ttf_data), lazy=True, recalcBBoxes=False, recalcTimestamp=False)
+    font.flavor = flavor
+    buffer = BytesIO()
+    font.save(buffer, reorderTables=False)
+    font.close()
+    return buffer.getvalue()
+
+
+@dataclass
+class FontBuild:
+    """Result of an in-memory build: font bytes per flavor."""
+
+    style: str
+    postscript_name: str
+    data: Dict[str, bytes] = field(default_factory=dict)
+    # Supplementary font of the CJK glyphs over the glyph budget
+    supplement: Optional["FontBuild"] = None
+    # CJK-only font of the companion layout
+    cjk: Optional["FontBuild"] = None
+
+    def filename(self, flavor: str = "ttf") -> str:
+        return f"{self.postscript_name}.{flavor}"
+
+    def open(self, flavor: str = "ttf") -> BytesIO:
+        """Get the font of a flavor as a BytesIO, e.g. for uploads."""
+        return BytesIO(self.data[flavor])
+
+
+def build_font(
+    style: str,
+    en_font: FontSource,
+    cn_font: FontSource,
+    display_name: str,
+    config: FontConfig,
+    metadata: dict,
+    flavors: Iterable[str] = ("ttf",),
+) -> FontBuild:
+    """Build one style entirely in memory.
+
+    Example:
+        >>> build = build_font("Regular", en_bytes, "fonts/LXGWWenKaiMonoGBScreen.ttf",
+        ...                    "Regular", FontConfig(), metadata, flavors=("ttf", "woff2"))
+        >>> upload(build.filename("woff2"), build.open("woff2"))
+
+    Args:
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        en_font: English font as path, bytes or file object
+        cn_font: Chinese font as path, bytes, file object or snapshot
+        display_name: Display name for the style in font metadata
+        config: FontConfig object
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+        flavors: Output flavors ("ttf", "woff", "woff2")
+
+    Returns:
+        FontBuild object (with the supplementary font, if the glyph
+        budget puts overflow glyphs into one, or the CJK-only font in the
+        companion layout)
+    """
+    flavors = list(flavors)
+    for flavor in flavors:
+        if flavor not in FLAVORS:
+            raise ValueError(f"Invalid flavor '{flavor}'. Valid flavors: {list(FLAVORS)}")
+
+    if config.cjk_layout == "companion":
+        build = _font_build(style, merge_latin(style, en_font, display_name, config, metadata), flavors, config)
+        cjk = merge_cjk(style, en_font, cn_font, display_name, config, metadata)
+        build.cjk = _font_build(style, cjk, flavors, config)
+        return build
+
+    budget = plan_style_budget(en_font, cn_font, config)
+    build = _font_build(
+        style, merge_style(style, en_font, cn_font, display_name, config, metadata, budget), flavors, config
+    )
+    supplement = merge_supplement(style, en_font, cn_font, display_name, config, metadata, budget)
+    if supplement is not None:
+        build.supplement = _font_build(style, supplement, flavors, config)
+    return build
+
+
+def _font_build(style: str, merged: Tuple[TTFont, str], flavors: List[str], config: FontConfig) -> FontBuild:
+    merged_font, postscript_name = merged
+    ttf_data = compile_font(merged_font, config.save_workers)
+    merged_font.close()
+
+    build = FontBuild(style=style, postscript_name=postscript_name)
+    for flavor in flavors:
+        build.data[flavor] = convert_flavor(ttf_data, flavor)
+    return build
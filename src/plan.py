@@ -0,0 +1,553 @@
+"""Build plan resolution: config.yaml + CLI overrides -> styles and paths."""
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import (
+    BUDGET_PRIORITIES,
+    CJK_LAYOUTS,
+    CJK_SUFFIX,
+    GLYPH_ORDERS,
+    HINTING_MODES,
+    ICON_SET_NAMES,
+    MAX_GLYPHS,
+    OVERFLOW_MODES,
+    PHASES,
+    SUPPLEMENT_SUFFIX,
+    FontConfig,
+)
+from .utils import file_sha256
+
+# config.yaml keys under "font" that only affect the name table
+METADATA_KEYS = (
+    "author",
+    "copyright",
+    "description",
+    "url",
+    "license",
+    "license_url",
+)
+
+
+def load_config(config_path: Path) -> Dict[str, Any]:
+    """Load configuration from YAML file.
+
+    Args:
+        config_path: Path to config.yaml
+
+    Returns:
+        Configuration dictionary
+    """
+    if not config_path.exists():
+        return {}
+
+    # Imported here so --help and other config-free paths skip PyYAML
+    import yaml
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_config_value(yaml_config: Dict[str, Any], *keys: str, default: Any = None) -> Any:
+    """Get nested value from config dictionary.
+
+    Args:
+        yaml_config: Configuration dictionary
+        keys: Nested keys to access
+        default: Default value if key not found
+
+    Returns:
+        Configuration value or default
+    """
+    value = yaml_config
+    for key in keys:
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return default
+        if value is None:
+            return default
+    return value
+
+
+@dataclass
+class StylePlan:
+    """Source fonts and naming for one output style."""
+
+    style: str
+    en_font_path: Path
+    cn_font_path: Path
+    display_name: str
+    # CN font source passed to merge_fonts (snapshot path or open FontSnapshot)
+    cn_source: Optional[Any] = None
+    # Companion layout: style whose CJK-only font this style falls back to
+    cjk_style: str = ""
+
+    @property
+    def cn_input(self) -> Any:
+        return self.cn_source or self.cn_font_path
+
+
+@dataclass
+class BuildPlan:
+    """Everything needed to build a set of styles."""
+
+    config: FontConfig
+    metadata: Dict[str, str]
+    styles: List[StylePlan]
+    fonts_dir: Path
+    output_dir: Path
+    parallel: int = 1
+    snapshot_dir: Optional[Path] = None
+    # Sequential builds: overlap source reads and saves with merging
+    pipeline: bool = True
+    max_inflight: int = 2
+    # Small WOFF2 subsets for the verification pages
+    previews: bool = True
+    # Also pack the built styles into one TrueType Collection
+    ttc: bool = False
+    # Companion layout: one plan per CJK-only font, named after the first
+    # style of the config using its CN font
+    cjk_fonts: List[StylePlan] = field(default_factory=list)
+
+    def output_path(self, style: str) -> Path:
+        """Get the output TTF path for a style."""
+        return self.output_dir / f"{self.config.family_name_compact}-{style}.ttf"
+
+    def supplement_path(self, style: str) -> Path:
+        """Get the supplementary font path for a style (glyphs over the glyph budget)."""
+        return self.output_dir / f"{self.config.family_name_compact}{SUPPLEMENT_SUFFIX}-{style}.ttf"
+
+    def cjk_path(self, cjk_style: str) -> Path:
+        """Get the CJK-only font path of the companion layout (see StylePlan.cjk_style)."""
+        return self.output_dir / f"{self.config.family_name_compact}{CJK_SUFFIX}-{cjk_style}.ttf"
+
+    def cjk_plans(self, styles: List[str]) -> List[StylePlan]:
+        """Get the plans of the CJK-only fonts the given styles fall back to."""
+        needed = {s.cjk_style for s in self.styles if s.style in styles}
+        return [cjk_plan for cjk_plan in self.cjk_fonts if cjk_plan.style in needed]
+
+    def preview_path(self, style: str) -> Path:
+        """Get the preview WOFF2 path for a style."""
+        return self.output_dir / "preview" / f"{self.config.family_name_compact}-{style}.woff2"
+
+    @property
+    def collection_path(self) -> Path:
+        """Get the TrueType Collection output path."""
+        return self.output_dir / f"{self.config.family_name_compact}.ttc"
+
+    @property
+    def fontconfig_path(self) -> Path:
+        """Get the fontconfig fallback snippet path (companion layout)."""
+        return self.output_dir / f"50-{self.config.family_name_compact}.conf"
+
+    @property
+    def fallback_css_path(self) -> Path:
+        """Get the CSS fallback snippet path (companion layout)."""
+        return self.output_dir / f"{self.config.family_name_compact}-fallback.css"
+
+
+def resolve_build_plan(
+    yaml_config: Dict[str, Any],
+    styles: Optional[str] = None,
+    fonts_dir: Optional[Path] = None,
+    output_dir: Optional[Path] = None,
+    parallel: Optional[int] = None,
+    snapshot_dir: Optional[Path] = None,
+    snapshots: Optional[bool] = None,
+    strip_hinting: Optional[str] = None,
+    glyph_order: Optional[str] = None,
+    checkpoint_dir: Optional[Path] = None,
+    checkpoint_after: Optional[str] = None,
+    from_phase: Optional[str] = None,
+    glyph_cache_dir: Optional[Path] = None,
+    glyph_cache: Optional[bool] = None,
+    glyph_budget: Optional[int] = None,
+    glyph_overflow: Optional[str] = None,
+    budget_priority: Optional[str] = None,
+    budget_file: Optional[Path] = None,
+    nerd_icon_sets: Optional[str] = None,
+    cjk_layout: Optional[str] = None,
+    pipeline: Optional[bool] = None,
+    max_inflight: Optional[int] = None,
+    save_workers: Optional[int] = None,
+    previews: Optional[bool] = None,
+    ttc: Optional[bool] = None,
+    check_files: bool = True,
+) -> BuildPlan:
+    """Resolve the build plan from config and CLI overrides.
+
+    Configuration priority: CLI args > config.yaml > defaults
+
+    Args:
+        yaml_config: Configuration dictionary from config.yaml
+        styles: Comma-separated styles to build
+        fonts_dir: Directory containing source fonts
+        output_dir: Output directory
+        parallel: Number of parallel workers
+        snapshot_dir: Directory for CN font snapshots
+        snapshots: False disables snapshots, whatever the config sets
+        strip_hinting: Hinting removal mode (none, transformed, all)
+        glyph_order: Imported glyph order (source, codepoint, outline)
+        checkpoint_dir: Directory for phase checkpoints
+        checkpoint_after: Comma-separated phases to checkpoint after ("all" for every phase)
+        from_phase: Phase to resume from using checkpoints ("latest" for the last valid one)
+        glyph_cache_dir: Directory for the glyph-level cache of transformed glyphs
+            ("" disables it)
+        glyph_cache: False disables the glyph cache, whatever the config sets
+        glyph_budget: Maximum glyphs per font (at most 65535)
+        glyph_overflow: What to do with CJK glyphs over the budget (error, drop, companion)
+        budget_priority: How CJK glyphs are ranked for the budget (ranges, frequency, profile)
+        budget_file: Character frequency list or sample text for budget_priority
+        nerd_icon_sets: Comma-separated NerdFont icon sets to keep ("all" keeps every icon)
+        cjk_layout: CJK glyphs merged into every style, or in CJK-only
+            companion fonts (merged, companion)
+        pipeline: Whether sequential builds use the pipelined executor
+        max_inflight: Merged fonts alive at once in the pipelined executor
+        save_workers: Processes compiling glyf/loca on save (0 for the CPU
+            count in sequential builds and 1 in parallel builds)
+        previews: Whether to write preview subsets for the verification pages
+        ttc: Whether to also write a TrueType Collection of the built styles
+        check_files: Whether to check that source fonts exist
+
+    Returns:
+        BuildPlan object
+
+    Raises:
+        ValueError: If the configuration is invalid
+    """
+    # Get styles configuration from YAML
+    styles_config = get_config_value(yaml_config, "styles") or {}
+    if not styles_config:
+        raise ValueError("No styles defined in config.yaml")
+
+    # Merge config: CLI args > YAML > defaults
+    styles_str = (
+        styles
+        or get_config_value(yaml_config, "build", "styles")
+        or ",".join(styles_config.keys())
+    )
+    fonts_dir = (
+        fonts_dir
+        or Path(get_config_value(yaml_config, "fonts_dir") or "fonts")
+    )
+    output_dir = (
+        output_dir
+        or Path(get_config_value(yaml_config, "build", "output_dir") or "output/fonts")
+    )
+    parallel = (
+        parallel
+        if parallel is not None
+        else get_config_value(yaml_config, "build", "parallel", default=1)
+    )
+    snapshot_dir = snapshot_dir or get_config_value(yaml_config, "build", "snapshot_dir")
+    if snapshots is False:
+        snapshot_dir = None
+    pipeline = (
+        pipeline
+        if pipeline is not None
+        else get_config_value(yaml_config, "build", "pipeline", default=True)
+    )
+    max_inflight = (
+        max_inflight
+        if max_inflight is not None
+        else get_config_value(yaml_config, "build", "max_inflight", default=2)
+    )
+    if max_inflight < 1:
+        raise ValueError(f"Invalid max_inflight {max_inflight}: must be at least 1")
+    save_workers = (
+        save_workers
+        if save_workers is not None
+        else get_config_value(yaml_config, "build", "save_workers", default=0)
+    )
+    if save_workers < 0:
+        raise ValueError(f"Invalid save_workers {save_workers}: must be at least 0")
+    if save_workers == 0:
+        # Parallel builds already keep every core busy with whole styles
+        save_workers = 1 if parallel > 1 else os.cpu_count() or 1
+    previews = (
+        previews
+        if previews is not None
+        else get_config_value(yaml_config, "build", "previews", default=True)
+    )
+    ttc = ttc if ttc is not None else get_config_value(yaml_config, "build", "ttc", default=False)
+
+    # Font metadata from config
+    family_name = get_config_value(yaml_config, "font", "family_name") or "JetBrainsLxgwNerdMono"
+    version = get_config_value(yaml_config, "font", "version") or "1.0"
+    en_width = get_config_value(yaml_config, "width", "en_width", default=600)
+    cn_width = get_config_value(yaml_config, "width", "cn_width", default=1200)
+    visual_scale = get_config_value(yaml_config, "width", "visual_scale", default=1.08)
+    strip_hinting = (
+        strip_hinting
+        or get_config_value(yaml_config, "build", "strip_hinting", default="none")
+    )
+    if strip_hinting not in HINTING_MODES:
+        raise ValueError(
+            f"Invalid strip_hinting '{strip_hinting}'. Valid values: {', '.join(HINTING_MODES)}"
+        )
+    glyph_order = glyph_order or get_config_value(yaml_config, "build", "glyph_order", default="source")
+    if glyph_order not in GLYPH_ORDERS:
+        raise ValueError(
+            f"Invalid glyph_order '{glyph_order}'. Valid values: {', '.join(GLYPH_ORDERS)}"
+        )
+
+    checkpoint_after = (
+        checkpoint_after
+        or get_config_value(yaml_config, "build", "checkpoint_after", default="merge")
+    )
+    if checkpoint_after == "all":
+        checkpoint_phases = PHASES
+    else:
+        checkpoint_phases = tuple(p.strip() for p in checkpoint_after.split(",") if p.strip())
+    for phase in checkpoint_phases:
+        if phase not in PHASES:
+            raise ValueError(f"Invalid checkpoint phase '{phase}'. Valid phases: {', '.join(PHASES)}, all")
+    if from_phase and from_phase not in PHASES + ("latest",):
+        raise ValueError(f"Invalid from_phase '{from_phase}'. Valid phases: {', '.join(PHASES)}, latest")
+    checkpoint_dir = checkpoint_dir or get_config_value(yaml_config, "build", "checkpoint_dir")
+    # Resuming needs checkpoints; keep them next to the snapshot cache
+    if from_phase and not checkpoint_dir:
+        checkpoint_dir = output_dir.parent / "cache" / "checkpoints"
+    if glyph_cache_dir is None:
+        glyph_cache_dir = get_config_value(yaml_config, "build", "glyph_cache_dir")
+    if glyph_cache is False:
+        glyph_cache_dir = None
+
+    glyph_budget = (
+        glyph_budget
+        if glyph_budget is not None
+        else get_config_value(yaml_config, "build", "glyph_budget", default=MAX_GLYPHS)
+    )
+    if not 1 <= glyph_budget <= MAX_GLYPHS:
+        raise ValueError(f"Invalid glyph_budget {glyph_budget}: must be between 1 and {MAX_GLYPHS}")
+    glyph_overflow = glyph_overflow or get_config_value(yaml_config, "build", "glyph_overflow", default="error")
+    if glyph_overflow not in OVERFLOW_MODES:
+        raise ValueError(
+            f"Invalid glyph_overflow '{glyph_overflow}'. Valid values: {', '.join(OVERFLOW_MODES)}"
+        )
+    budget_priority = budget_priority or get_config_value(yaml_config, "build", "budget_priority", default="ranges")
+    if budget_priority not in BUDGET_PRIORITIES:
+        raise ValueError(
+            f"Invalid budget_priority '{budget_priority}'. Valid values: {', '.join(BUDGET_PRIORITIES)}"
+        )
+    budget_file = budget_file or get_config_value(yaml_config, "build", "budget_file")
+    if budget_priority != "ranges":
+        if not budget_file:
+            raise ValueError(f"budget_priority '{budget_priority}' needs a budget_file")
+        if check_files and not Path(budget_file).exists():
+            raise ValueError(f"Budget file not found: {budget_file}")
+
+    nerd_icon_sets = nerd_icon_sets or get_config_value(yaml_config, "build", "nerd_icon_sets", default="all")
+    if isinstance(nerd_icon_sets, (list, tuple)):
+        nerd_icon_sets = ",".join(nerd_icon_sets)
+    icon_sets = () if nerd_icon_sets == "all" else tuple(s.strip() for s in nerd_icon_sets.split(",") if s.strip())
+    for icon_set in icon_sets:
+        if icon_set not in ICON_SET_NAMES:
+            raise ValueError(f"Invalid NerdFont icon set '{icon_set}'. Valid sets: {', '.join(ICON_SET_NAMES)}, all")
+    # NERD_ICON_SETS order, so the same selection gives the same checkpoint keys
+    icon_sets = tuple(name for name in ICON_SET_NAMES if name in icon_sets)
+    if icon_sets == ICON_SET_NAMES:
+        icon_sets = ()
+
+    cjk_layout = cjk_layout or get_config_value(yaml_config, "build", "cjk_layout", default="merged")
+    if cjk_layout not in CJK_LAYOUTS:
+        raise ValueError(f"Invalid cjk_layout '{cjk_layout}'. Valid values: {', '.join(CJK_LAYOUTS)}")
+    if cjk_layout == "companion" and glyph_overflow == "companion":
+        raise ValueError(
+            "glyph_overflow 'companion' does not apply to cjk_layout 'companion'; use 'error' or 'drop'"
+        )
+
+    # Font metadata for name table
+    metadata = {
+        key: get_config_value(yaml_config, "font", key) or ""
+        for key in METADATA_KEYS
+    }
+
+    # Initialize FontConfig
+    config = FontConfig(
+        family_name=family_name,
+        family_name_compact=family_name,
+        version=str(version),
+        visual_scale=visual_scale,
+        en_width=en_width,
+        cn_width=cn_width,
+        strip_hinting=strip_hinting,
+        glyph_order=glyph_order,
+        # Absolute, so queue workers in other directories find the same checkpoints
+        checkpoint_dir=str(Path(checkpoint_dir).absolute()) if checkpoint_dir else "",
+        checkpoint_after=checkpoint_phases,
+        from_phase=from_phase or "",
+        glyph_cache_dir=str(Path(glyph_cache_dir).absolute()) if glyph_cache_dir else "",
+        glyph_budget=glyph_budget,
+        glyph_overflow=glyph_overflow,
+        budget_priority=budget_priority,
+        budget_file=str(Path(budget_file).absolute()) if budget_file else "",
+        nerd_icon_sets=icon_sets,
+        cjk_layout=cjk_layout,
+        save_workers=save_workers,
+    )
+
+    # Parse styles to build
+    style_names = [s.strip() for s in styles_str.split(",")]
+    valid_styles = list(styles_config.keys())
+
+    for style in style_names:
+        if style not in valid_styles:
+            raise ValueError(f"Invalid style '{style}'. Valid styles: {valid_styles}")
+
+    # Build font paths and validate
+    def style_plan_for(style: str) -> StylePlan:
+        style_cfg = styles_config[style]
+        en_font = style_cfg.get("en_font")
+        cn_font = style_cfg.get("cn_font")
+        display_name = style_cfg.get("display_name", style)
+
+        if not en_font or not cn_font:
+            raise ValueError(f"Style '{style}' must have both 'en_font' and 'cn_font' defined")
+
+        en_font_path = fonts_dir / en_font
+        cn_font_path = fonts_dir / cn_font
+
+        if check_files:
+            if not en_font_path.exists():
+                raise ValueError(f"English font not found: {en_font_path}")
+            if not cn_font_path.exists():
+                raise ValueError(f"Chinese font not found: {cn_font_path}")
+
+        return StylePlan(
+            style=style,
+            en_font_path=en_font_path,
+            cn_font_path=cn_font_path,
+            display_name=display_name,
+        )
+
+    style_plans = [style_plan_for(style) for style in style_names]
+
+    # Companion layout: each CN font's CJK-only font takes its metrics and
+    # name from the first style of the config using that CN font, so the
+    # file names do not depend on which styles are built
+    cjk_fonts: List[StylePlan] = []
+    if cjk_layout == "companion":
+        cjk_styles: Dict[str, str] = {}
+        for style, style_cfg in styles_config.items():
+            cjk_styles.setdefault(style_cfg.get("cn_font"), style)
+        for style_plan in style_plans:
+            style_plan.cjk_style = cjk_styles[styles_config[style_plan.style]["cn_font"]]
+            if style_plan.cjk_style not in [cjk_plan.style for cjk_plan in cjk_fonts]:
+                cjk_fonts.append(style_plan_for(style_plan.cjk_style))
+
+    return BuildPlan(
+        config=config,
+        metadata=metadata,
+        styles=style_plans,
+        fonts_dir=fonts_dir,
+        output_dir=output_dir,
+        parallel=parallel,
+        snapshot_dir=Path(snapshot_dir) if snapshot_dir else None,
+        pipeline=bool(pipeline),
+        max_inflight=max_inflight,
+        previews=bool(previews),
+        ttc=bool(ttc),
+        cjk_fonts=cjk_fonts,
+    )
+
+
+def write_manifest(plan: BuildPlan) -> Path:
+    """Generate font manifest for HTML verification pages.
+
+    Built fonts are listed with their size and SHA-256 so downstream caches
+    can dedupe by content, plus their supplementary font (glyphs over the
+    glyph budget), CJK-only font (companion layout) and preview subset
+    when those were written.
+    A TrueType Collection of the styles is listed under "collection", and
+    the fontconfig and CSS snippets of the companion layout under "fallback".
+
+    Args:
+        plan: BuildPlan object
+
+    Returns:
+        Path to fonts-manifest.json
+    """
+    manifest = {
+        "family_name": plan.config.family_name,
+        "version": plan.config.version,
+        "fonts": []
+    }
+    if plan.cjk_fonts:
+        manifest["cjk_layout"] = plan.config.cjk_layout
+    for style_plan in plan.styles:
+        output_path = plan.output_path(style_plan.style)
+        entry = {
+            "style": style_plan.style,
+            "display_name": style_plan.display_name,
+            "filename": output_path.name,
+        }
+        if output_path.exists():
+            entry["size"] = output_path.stat().st_size
+            entry["sha256"] = file_sha256(output_path)
+        supplement_path = plan.supplement_path(style_plan.style)
+        if supplement_path.exists():
+            entry["supplement"] = {
+                "filename": supplement_path.name,
+                "size": supplement_path.stat().st_size,
+                "sha256": file_sha256(supplement_path),
+            }
+        if style_plan.cjk_style:
+            cjk_path = plan.cjk_path(style_plan.cjk_style)
+            if cjk_path.exists():
+                entry["cjk"] = {
+                    "filename": cjk_path.name,
+                    "size": cjk_path.stat().st_size,
+                    "sha256": file_sha256(cjk_path),
+                }
+        preview_path = plan.preview_path(style_plan.style)
+        if preview_path.exists():
+            entry["preview"] = {
+                "filename": preview_path.relative_to(plan.output_dir).as_posix(),
+                "size": preview_path.stat().st_size,
+            }
+        manifest["fonts"].append(entry)
+
+    collection_path = plan.collection_path
+    if plan.ttc and collection_path.exists():
+        manifest["collection"] = {
+            "filename": collection_path.name,
+            "size": collection_path.stat().st_size,
+            "sha256": file_sha256(collection_path),
+        }
+    fallback = [path for path in (plan.fontconfig_path, plan.fallback_css_path) if path.exists()]
+    if plan.cjk_fonts and fallback:
+        manifest["fallback"] = [path.name for path in fallback]
+
+    manifest_path = plan.output_dir / "fonts-manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest_path
+
+
+def load_manifest_fonts(fonts_dir: Path) -> Dict[str, Path]:
+    """Get style -> TTF path for the fonts listed in fonts-manifest.json.
+
+    Args:
+        fonts_dir: Directory with built fonts and fonts-manifest.json
+
+    Returns:
+        Dict mapping style -> font path
+
+    Raises:
+        FileNotFoundError: If the manifest or a listed font is missing
+    """
+    manifest_path = fonts_dir / "fonts-manifest.json"
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    fonts = {}
+    for entry in manifest["fonts"]:
+        path = fonts_dir / entry["filename"]
+        if not path.exists():
+            raise FileNotFoundError(f"Font listed in manifest not found: {path}")
+        fonts[entry["style"]] = path
+    return fonts
@@ -0,0 +1,100 @@
+"""Preview fonts for the verify-2-1 HTML pages.
+
+The verification pages only render a few lines of sample text, yet would
+load the full multi-megabyte TTF (or dozens of split chunks) per style.
+The codepoints of the pages' visible text are extracted, and each built
+style is subset to them as a small WOFF2 under ``<output_dir>/preview/``.
+fonts-manifest.json lists the previews, and the pages load them unless
+the full fonts are requested (``?full=1``).
+"""
+
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from .plan import BuildPlan
+
+# Verification pages at the repository root
+VERIFY_PAGES = tuple(
+    Path(__file__).resolve().parent.parent / name
+    for name in ("verify-2-1.html", "verify-2-1-split.html")
+)
+
+
+class TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML page (no script/style/title)."""
+
+    SKIPPED_TAGS = ("script", "style", "title")
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def page_codepoints(pages: Iterable[Path]) -> Set[int]:
+    """Get the codepoints of the visible text of HTML pages.
+
+    Args:
+        pages: HTML files (missing files are skipped)
+
+    Returns:
+        Set of codepoints, without control characters
+    """
+    codepoints: Set[int] = {0x20}
+    for page in pages:
+        if not page.exists():
+            continue
+        parser = TextExtractor()
+        parser.feed(page.read_text(encoding="utf-8"))
+        parser.close()
+        codepoints.update(ord(ch) for ch in "".join(parser.parts) if ord(ch) >= 0x20)
+    return codepoints
+
+
+def write_previews(
+    plan: BuildPlan,
+    styles: Iterable[str],
+    pages: Iterable[Path] = VERIFY_PAGES,
+) -> Dict[str, Path]:
+    """Subset built styles to the codepoints of the verification pages.
+
+    Args:
+        plan: BuildPlan object
+        styles: Styles to write previews for (styles without output are skipped)
+        pages: HTML pages whose text the previews must render
+
+    Returns:
+        Dict mapping style -> preview path
+    """
+    from .subset_service import check_brotli_installed, subset_to_woff2
+
+    if not check_brotli_installed():
+        print("  brotli is not installed, skipping preview fonts")
+        return {}
+
+    codepoints = sorted(page_codepoints(pages))
+    previews = {}
+    for style in styles:
+        font_path = plan.output_path(style)
+        if not font_path.exists():
+            continue
+        path = plan.preview_path(style)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = subset_to_woff2(font_path.read_bytes(), codepoints)
+        path.write_bytes(data)
+        previews[style] = path
+        print(f"  Preview: {path} ({len(codepoints)} codepoints, {len(data) / 1024:.1f} KB)")
+    return previews
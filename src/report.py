@@ -0,0 +1,265 @@
+"""Per-block coverage and table-size report for built fonts.
+
+Codepoints are mapped to named blocks through a precomputed index: the CJK
+ranges of FontConfig, Powerline, each NerdFont icon set and the common
+Latin/symbol blocks are flattened once into sorted, non-overlapping
+segments, so each lookup is a single bisect.
+
+For every font the report counts codepoints and glyphs per block, sums
+the compiled glyf bytes per block (read from loca offsets, without
+decompiling outlines), lists per-table sizes, and compares coverage with
+the source fonts the style was built from.
+"""
+
+import bisect
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from fontTools.ttLib import TTFont
+
+from .config import NERD_ICON_SETS, FontConfig
+from .utils import is_cjk_codepoint
+
+# Names of the default CJK ranges of FontConfig
+CJK_BLOCK_NAMES = {
+    (0x4E00, 0x9FFF): "CJK Unified Ideographs",
+    (0x3400, 0x4DBF): "CJK Ext A",
+    (0x20000, 0x2A6DF): "CJK Ext B",
+    (0x2A700, 0x2B73F): "CJK Ext C",
+    (0x2B740, 0x2B81F): "CJK Ext D",
+    (0x2B820, 0x2CEAF): "CJK Ext E",
+    (0x2CEB0, 0x2EBEF): "CJK Ext F",
+    (0x30000, 0x3134F): "CJK Ext G",
+    (0x3000, 0x303F): "CJK Symbols and Punctuation",
+    (0xFF00, 0xFFEF): "Halfwidth and Fullwidth Forms",
+    (0x2E80, 0x2EFF): "CJK Radicals Supplement",
+    (0x2F00, 0x2FDF): "Kangxi Radicals",
+    (0x3100, 0x312F): "Bopomofo",
+    (0x31A0, 0x31BF): "Bopomofo Extended",
+    (0x31C0, 0x31EF): "CJK Strokes",
+    (0x3200, 0x32FF): "Enclosed CJK Letters and Months",
+    (0x3300, 0x33FF): "CJK Compatibility",
+    (0xFE30, 0xFE4F): "CJK Compatibility Forms",
+}
+
+# Common non-CJK blocks of the base font
+OTHER_BLOCKS = (
+    (0x0000, 0x007F, "Basic Latin"),
+    (0x0080, 0x00FF, "Latin-1 Supplement"),
+    (0x0100, 0x024F, "Latin Extended-A/B"),
+    (0x0250, 0x02FF, "IPA and Spacing Modifiers"),
+    (0x0300, 0x036F, "Combining Diacritics"),
+    (0x0370, 0x03FF, "Greek and Coptic"),
+    (0x0400, 0x052F, "Cyrillic"),
+    (0x1E00, 0x1EFF, "Latin Extended Additional"),
+    (0x2000, 0x206F, "General Punctuation"),
+    (0x2070, 0x20CF, "Super/Subscripts and Currency"),
+    (0x2100, 0x218F, "Letterlike Symbols and Number Forms"),
+    (0x2190, 0x21FF, "Arrows"),
+    (0x2200, 0x22FF, "Mathematical Operators"),
+    (0x2300, 0x23FF, "Miscellaneous Technical"),
+    (0x2500, 0x257F, "Box Drawing"),
+    (0x2580, 0x259F, "Block Elements"),
+    (0x25A0, 0x25FF, "Geometric Shapes"),
+    (0x2600, 0x27BF, "Miscellaneous Symbols and Dingbats"),
+    (0x2800, 0x28FF, "Braille Patterns"),
+    (0xE000, 0xF8FF, "Nerd (other PUA)"),
+    (0xF0000, 0xFFFFD, "Nerd (other PUA)"),
+)
+
+OTHER = "Other"
+UNMAPPED = "(unmapped glyphs)"
+
+
+class BlockIndex:
+    """Codepoint -> block name lookup over flattened, prioritised ranges.
+
+    Priority: CJK ranges, Powerline, NerdFont icon sets, other blocks.
+
+    Args:
+        config: FontConfig with the CJK and Powerline ranges
+    """
+
+    def __init__(self, config: FontConfig):
+        ranges: List[Tuple[int, int, str]] = []
+        for start, end in config.cjk_ranges:
+            ranges.append((start, end, CJK_BLOCK_NAMES.get((start, end), f"CJK U+{start:04X}-U+{end:04X}")))
+        ranges.append((config.powerline_range[0], config.powerline_range[1], "Powerline"))
+        for name, set_ranges in NERD_ICON_SETS:
+            for start, end in set_ranges:
+                ranges.append((start, end, f"Nerd {name}"))
+        ranges.extend(OTHER_BLOCKS)
+
+        # Split the codepoint space at every range boundary and give each
+        # elementary segment the name of the first (highest priority) range
+        boundaries = sorted({b for start, end, _ in ranges for b in (start, end + 1)})
+        self.starts: List[int] = []
+        self.names: List[str] = []
+        for seg_start, seg_end in zip(boundaries, boundaries[1:]):
+            name = next(
+                (n for start, end, n in ranges if start <= seg_start and seg_end - 1 <= end),
+                OTHER,
+            )
+            if self.names and self.names[-1] == name:
+                continue
+            self.starts.append(seg_start)
+            self.names.append(name)
+        if boundaries:
+            self.starts.append(boundaries[-1])
+            self.names.append(OTHER)
+        self.order = list(dict.fromkeys(n for _, _, n in ranges)) + [OTHER, UNMAPPED]
+
+    def block(self, codepoint: int) -> str:
+        """Get the block name of a codepoint."""
+        i = bisect.bisect_right(self.starts, codepoint) - 1
+        return self.names[i] if i >= 0 else OTHER
+
+
+@dataclass
+class BlockStats:
+    """Coverage and size of one block in one font."""
+
+    codepoints: int = 0
+    glyphs: int = 0
+    glyf_bytes: int = 0
+    missing: List[int] = field(default_factory=list)
+
+
+@dataclass
+class FontReport:
+    """Report of one built font."""
+
+    style: str
+    path: str
+    size: int
+    num_glyphs: int
+    tables: Dict[str, int]
+    blocks: Dict[str, BlockStats]
+    sources_checked: bool
+
+    def to_dict(self) -> dict:
+        return {
+            "style": self.style,
+            "path": self.path,
+            "size": self.size,
+            "num_glyphs": self.num_glyphs,
+            "tables": self.tables,
+            "sources_checked": self.sources_checked,
+            "blocks": {
+                name: {
+                    "codepoints": stats.codepoints,
+                    "glyphs": stats.glyphs,
+                    "glyf_bytes": stats.glyf_bytes,
+                    "missing": [f"U+{cp:04X}" for cp in stats.missing],
+                }
+                for name, stats in self.blocks.items()
+            },
+        }
+
+
+def read_cmap(font_path: str) -> Dict[int, str]:
+    """Read the best cmap of a font without loading other tables."""
+    font = TTFont(font_path, lazy=True)
+    cmap = dict(font.getBestCmap() or {})
+    font.close()
+    return cmap
+
+
+def expected_codepoints(en_font_path: str, cn_font_path: str, config: FontConfig) -> Set[int]:
+    """Codepoints a merged style should cover: the base font plus CJK from the CN font."""
+    expected = set(read_cmap(en_font_path))
+    expected.update(cp for cp in read_cmap(cn_font_path) if is_cjk_codepoint(cp, config.cjk_ranges))
+    return expected
+
+
+def report_font(
+    style: str,
+    font_path: str,
+    config: FontConfig,
+    sources: Optional[Tuple[str, str]] = None,
+) -> FontReport:
+    """Build the report of one font.
+
+    Args:
+        style: Style name
+        font_path: Path to the built TTF
+        config: FontConfig object
+        sources: (en_font_path, cn_font_path) the style was built from, or
+            None to skip the coverage check
+
+    Returns:
+        FontReport object
+    """
+    index = BlockIndex(config)
+    font = TTFont(font_path, lazy=True)
+    glyph_order = font.getGlyphOrder()
+    cmap = font.getBestCmap() or {}
+    loca = font["loca"] if "loca" in font else None
+    tables = {tag.strip(): font.reader.tables[tag].length for tag in sorted(font.reader.keys())}
+
+    blocks: Dict[str, BlockStats] = {}
+
+    def stats_for(name: str) -> BlockStats:
+        return blocks.setdefault(name, BlockStats())
+
+    # Attribute each glyph to the block of its lowest codepoint
+    glyph_block: Dict[str, str] = {}
+    for codepoint in sorted(cmap):
+        name = index.block(codepoint)
+        stats_for(name).codepoints += 1
+        glyph_block.setdefault(cmap[codepoint], name)
+
+    for gid, glyph_name in enumerate(glyph_order):
+        stats = stats_for(glyph_block.get(glyph_name, UNMAPPED))
+        stats.glyphs += 1
+        if loca is not None:
+            stats.glyf_bytes += loca[gid + 1] - loca[gid]
+
+    if sources is not None:
+        for codepoint in sorted(expected_codepoints(*sources, config) - set(cmap)):
+            stats_for(index.block(codepoint)).missing.append(codepoint)
+
+    num_glyphs = len(glyph_order)
+    font.close()
+
+    ordered = {name: blocks[name] for name in index.order if name in blocks}
+    return FontReport(
+        style=style,
+        path=font_path,
+        size=Path(font_path).stat().st_size,
+        num_glyphs=num_glyphs,
+        tables=tables,
+        blocks=ordered,
+        sources_checked=sources is not None,
+    )
+
+
+def report_fonts(
+    fonts: Dict[str, Tuple[str, Optional[Tuple[str, str]]]],
+    config: FontConfig,
+    parallel: int = 1,
+) -> Iterator[FontReport]:
+    """Report several fonts, yielding each report as soon as it is ready.
+
+    Args:
+        fonts: Dict mapping style -> (font path, sources or None)
+        config: FontConfig object
+        parallel: Number of worker processes
+
+    Yields:
+        FontReport objects (in completion order when parallel)
+    """
+    if parallel <= 1 or len(fonts) <= 1:
+        for style, (font_path, sources) in fonts.items():
+            yield report_font(style, font_path, config, sources)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(parallel, len(fonts))) as executor:
+        futures = [
+            executor.submit(report_font, style, font_path, config, sources)
+            for style, (font_path, sources) in fonts.items()
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,118 @@
+"""Metadata-only fast path: re-stamp name/head tables of built fonts.
+
+Opening the output TTF lazily means only the ``name`` and ``head`` tables
+are decompiled. On save, fontTools compiles just those two tables and
+copies the raw data of every other table byte-for-byte, so a version bump
+costs milliseconds per style instead of a full merge.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List
+
+from fontTools.ttLib import TTFont
+
+from .companion import companion_config
+from .config import CJK_SUFFIX, SUPPLEMENT_SUFFIX, FontConfig
+from .plan import BuildPlan
+from .utils import apply_style_names, set_reproducible_timestamp, write_file_atomic
+
+
+def restamp_font(
+    font_path: Path,
+    style: str,
+    display_name: str,
+    config: FontConfig,
+    metadata: dict,
+) -> float:
+    """Rewrite name and head tables of a built font in place.
+
+    Args:
+        font_path: Path to the built TTF
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        display_name: Display name for the style in font metadata
+        config: FontConfig object
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+
+    Returns:
+        Elapsed time in seconds
+    """
+    start = time.perf_counter()
+    font_path = Path(font_path)
+
+    # Lazy font: untouched tables are copied raw from the reader on save
+    font = TTFont(str(font_path), lazy=True, recalcBBoxes=False)
+    apply_style_names(font, config, style, display_name, metadata)
+    set_reproducible_timestamp(font)
+
+    buffer = BytesIO()
+    font.save(buffer, reorderTables=True)
+    font.close()
+
+    # A lazy font cannot overwrite its own file; replace atomically instead
+    write_file_atomic(font_path, buffer.getvalue())
+
+    return time.perf_counter() - start
+
+
+def restamp_styles(plan: BuildPlan, styles: List[str]) -> Dict[str, float]:
+    """Re-stamp already-built fonts of a plan, in parallel across styles.
+
+    In the companion layout, the CJK-only fonts of the styles are
+    re-stamped as well, and so are the supplementary fonts of styles
+    that overflowed their glyph budget with ``glyph_overflow: companion``.
+
+    Args:
+        plan: BuildPlan object
+        styles: Styles to re-stamp
+
+    Returns:
+        Dict mapping font file name -> elapsed seconds
+
+    Raises:
+        FileNotFoundError: If a style has not been built yet
+    """
+    # (font path, style, display name, config) of every font to re-stamp
+    fonts = [
+        (plan.output_path(s.style), s.style, s.display_name, plan.config)
+        for s in plan.styles
+        if s.style in styles
+    ]
+    if plan.cjk_fonts:
+        cjk_config = companion_config(plan.config, CJK_SUFFIX)
+        fonts += [
+            (plan.cjk_path(s.style), s.style, s.display_name, cjk_config)
+            for s in plan.cjk_plans(styles)
+        ]
+    if plan.config.glyph_overflow == "companion":
+        # Only styles over their glyph budget have a supplementary font
+        supplement_config = companion_config(plan.config, SUPPLEMENT_SUFFIX)
+        fonts += [
+            (plan.supplement_path(s.style), s.style, s.display_name, supplement_config)
+            for s in plan.styles
+            if s.style in styles and plan.supplement_path(s.style).exists()
+        ]
+    for output_path, _, _, _ in fonts:
+        if not output_path.exists():
+            raise FileNotFoundError(f"Font not built yet: {output_path}")
+
+    timings: Dict[str, float] = {}
+    if plan.parallel <= 1 or len(fonts) <= 1:
+        for output_path, style, display_name, config in fonts:
+            timings[output_path.name] = restamp_font(output_path, style, display_name, config, plan.metadata)
+    else:
+        with ProcessPoolExecutor(max_workers=min(plan.parallel, len(fonts))) as executor:
+            futures = {
+                output_path.name: executor.submit(
+                    restamp_font, output_path, style, display_name, config, plan.metadata
+                )
+                for output_path, style, display_name, config in fonts
+            }
+            for name, future in futures.items():
+                timings[name] = future.result()
+
+    for name, elapsed in timings.items():
+        print(f"  Re-stamped {name} ({elapsed * 1000:.0f} ms)")
+    return timings
@@ -0,0 +1,305 @@
+"""Shared CJK chunks across the split web fonts of several styles.
+
+Styles built from the same CN font with the same transform (Regular,
+Italic, Medium and MediumItalic all take their CJK glyphs from LXGW
+WenKai) have byte-identical CJK glyphs, but cn-font-split splits each
+style on its own, so a page using several weights downloads the same
+hanzi several times. Sharing works in three steps:
+
+1. ``plan_sharing`` hashes the CJK glyphs of every font (compiled glyf
+   bytes plus hmtx entry, see diff.py) and groups each style with the
+   first earlier style (its representative) that has the same units per
+   em and vertical metrics and the same glyphs for at least
+   ``MIN_SHARED_SHARE`` of its CJK codepoints. Glyphs with TrueType
+   instructions only count as the same if the hinting programs are too,
+   and composite glyphs never do.
+2. The CJK codepoints every style of a group has the same glyph for are
+   cut out of the representative (``subset_font``) and split on their
+   own, so the chunk boundaries are the same for all styles; the chunks
+   are stored once as ``shared/<sha256>.woff2`` (``store_shared``).
+   Each style is then split without those codepoints, and its
+   ``result.css`` gets the shared chunks under its own weight and style
+   (``retarget_face``).
+3. ``dedupe_chunks`` moves any other byte-identical chunk files of
+   different styles to ``shared/`` as well.
+
+All CSS URLs stay relative to ``result.css``, so ``all.css`` imports reach
+the same ``../shared/`` URL from every style and the browser HTTP cache
+serves each shared chunk once.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fontTools.ttLib import TTFont
+
+from .config import FontConfig
+from .critical import unicode_range
+from .diff import hash_font_glyphs
+from .utils import classify_codepoint, run_subsetter
+
+SHARED_DIR = "shared"
+# A style shares chunks with an earlier style if they have the same glyph
+# for at least this share of its CJK codepoints
+MIN_SHARED_SHARE = 0.5
+
+_FONT_FACE = re.compile(r"@font-face\s*\{[^}]*\}", re.IGNORECASE)
+_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_UNICODE_RANGE = re.compile(r"(unicode-range\s*:\s*)([^;}]+)", re.IGNORECASE)
+
+
+@dataclass
+class FontFace:
+    """One @font-face rule of a split CSS file."""
+
+    text: str
+    url: str
+    codepoints: Set[int]
+
+
+@dataclass
+class FontSignature:
+    """What decides whether the CJK glyphs of two fonts render the same."""
+
+    # Units per em and vertical metrics
+    metrics: bytes
+    # fpgm, prep and cvt, for glyphs with instructions
+    hinting: bytes
+    # CJK codepoint -> glyph digest
+    glyphs: Dict[int, bytes]
+    # CJK codepoints whose glyph has instructions
+    instructed: Set[int]
+    # CJK codepoints whose glyph is composite (digests do not cover components)
+    composite: Set[int]
+
+
+@dataclass
+class ShareGroup:
+    """Styles whose CJK chunks are shared.
+
+    Attributes:
+        styles: Font stems, the representative first
+        codepoints: CJK codepoints with the same glyph in every style
+    """
+
+    styles: List[str]
+    codepoints: Set[int] = field(default_factory=set)
+
+
+def parse_unicode_range(value: str) -> Set[int]:
+    """Parse a CSS unicode-range value (ranges and ``?`` wildcards)."""
+    codepoints: Set[int] = set()
+    for part in value.split(","):
+        part = part.strip().upper()
+        if not part.startswith("U+"):
+            continue
+        part = part[2:]
+        if "?" in part:
+            start, end = int(part.replace("?", "0"), 16), int(part.replace("?", "F"), 16)
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text, 16), int(end_text, 16)
+        else:
+            start = end = int(part, 16)
+        codepoints.update(range(start, end + 1))
+    return codepoints
+
+
+def parse_font_faces(css: str) -> List[FontFace]:
+    """Get the @font-face rules of a CSS file that load a font URL."""
+    faces = []
+    for match in _FONT_FACE.finditer(css):
+        text = match.group(0)
+        url = _URL.search(text)
+        ranges = _UNICODE_RANGE.search(text)
+        if url is None:
+            continue
+        faces.append(FontFace(text, url.group(2), parse_unicode_range(ranges.group(2)) if ranges else set()))
+    return faces
+
+
+def retarget_face(face: FontFace, url: str, codepoints: Optional[Iterable[int]] = None) -> str:
+    """Get the text of a rule loading another URL (and codepoints).
+
+    The first url() is replaced, so local() sources and the descriptors
+    (family, weight, style, display) of the rule are kept.
+    """
+    text = _URL.sub(lambda match: f'url("{url}")', face.text, count=1)
+    if codepoints is not None:
+        text = _UNICODE_RANGE.sub(lambda match: match.group(1) + unicode_range(codepoints), text, count=1)
+    return text
+
+
+def _table_bytes(font: TTFont, tags: Iterable[str]) -> bytes:
+    digest = hashlib.sha256()
+    for tag in tags:
+        digest.update(tag.encode("ascii"))
+        digest.update(font.reader[tag] if tag in font.reader.tables else b"-")
+    return digest.digest()
+
+
+def font_signature(font_path: Path, config: FontConfig) -> FontSignature:
+    """Hash the CJK glyphs of a built font and what their rendering depends on.
+
+    Args:
+        font_path: Built TTF
+        config: FontConfig with the CJK ranges
+
+    Returns:
+        FontSignature object
+    """
+    glyphs = {
+        codepoint: digest
+        for codepoint, digest in hash_font_glyphs(str(font_path)).items()
+        if classify_codepoint(codepoint, config) == "cjk"
+    }
+
+    font = TTFont(font_path, lazy=True)
+    try:
+        head, hhea, os2 = font["head"], font["hhea"], font["OS/2"]
+        metrics = repr((
+            head.unitsPerEm,
+            hhea.ascent, hhea.descent, hhea.lineGap,
+            os2.sTypoAscender, os2.sTypoDescender, os2.sTypoLineGap,
+            os2.usWinAscent, os2.usWinDescent,
+        )).encode("ascii")
+        hinting = _table_bytes(font, ("fpgm", "prep", "cvt "))
+
+        cmap = font.getBestCmap() or {}
+        glyph_ids = {name: gid for gid, name in enumerate(font.getGlyphOrder())}
+        glyf_data = font.reader["glyf"]
+        loca = font["loca"]
+        instructed, composite = set(), set()
+        for codepoint in glyphs:
+            gid = glyph_ids[cmap[codepoint]]
+            data = glyf_data[loca[gid]:loca[gid + 1]]
+            if not data:
+                continue
+            contours = int.from_bytes(data[0:2], "big", signed=True)
+            if contours < 0:
+                composite.add(codepoint)
+                continue
+            offset = 10 + 2 * contours
+            if int.from_bytes(data[offset:offset + 2], "big"):
+                instructed.add(codepoint)
+    finally:
+        font.close()
+    return FontSignature(metrics, hinting, glyphs, instructed, composite)
+
+
+def _same_glyphs(member: FontSignature, representative: FontSignature) -> Set[int]:
+    same_hinting = member.hinting == representative.hinting
+    return {
+        codepoint
+        for codepoint, digest in member.glyphs.items()
+        if representative.glyphs.get(codepoint) == digest
+        and codepoint not in member.composite
+        and (same_hinting or codepoint not in member.instructed)
+    }
+
+
+def plan_sharing(font_paths: List[Path], config: FontConfig) -> List[ShareGroup]:
+    """Group the styles that can share CJK chunks.
+
+    Args:
+        font_paths: Built TTFs, in split order
+        config: FontConfig with the CJK ranges
+
+    Returns:
+        ShareGroup objects of two or more styles
+    """
+    groups: List[Tuple[ShareGroup, FontSignature]] = []
+    for font_path in font_paths:
+        signature = font_signature(font_path, config)
+        for group, rep_signature in groups:
+            if rep_signature.metrics != signature.metrics or not signature.glyphs:
+                continue
+            same = _same_glyphs(signature, rep_signature)
+            if len(same) >= MIN_SHARED_SHARE * len(signature.glyphs):
+                group.styles.append(font_path.stem)
+                group.codepoints &= same
+                break
+        else:
+            own = _same_glyphs(signature, signature)
+            groups.append((ShareGroup([font_path.stem], own), signature))
+    return [group for group, _ in groups if len(group.styles) > 1 and group.codepoints]
+
+
+def subset_font(font_path: Path, codepoints: Set[int], output_path: Path) -> Path:
+    """Write a copy of a font with only some codepoints (all tables kept).
+
+    Args:
+        font_path: Built TTF
+        codepoints: Codepoints to keep
+        output_path: Path of the TTF to write
+
+    Returns:
+        Output path
+    """
+    font = TTFont(font_path, recalcTimestamp=False)
+    run_subsetter(
+        font, codepoints, glyph_names=True, name_languages=["*"], name_legacy=True, layout_features=["*"]
+    )
+    font.save(str(output_path), reorderTables=True)
+    font.close()
+    return output_path
+
+
+def store_shared(chunk_path: Path, shared_dir: Path) -> Path:
+    """Move a chunk file to shared_dir under a content-hashed name.
+
+    Returns:
+        Path of the shared file (an identical file already there is reused)
+    """
+    data = chunk_path.read_bytes()
+    shared_path = shared_dir / f"{hashlib.sha256(data).hexdigest()[:16]}{chunk_path.suffix}"
+    shared_dir.mkdir(parents=True, exist_ok=True)
+    if not shared_path.exists():
+        shared_path.write_bytes(data)
+    chunk_path.unlink()
+    return shared_path
+
+
+def rewrite_urls(css_path: Path, urls: Dict[str, str]) -> None:
+    """Point the url() of the rules of a CSS file at new URLs."""
+    css = css_path.read_text(encoding="utf-8")
+    for face in parse_font_faces(css):
+        if face.url in urls:
+            css = css.replace(face.text, retarget_face(face, urls[face.url]), 1)
+    css_path.write_text(css, encoding="utf-8")
+
+
+def dedupe_chunks(split_dirs: List[Path], shared_dir: Path) -> int:
+    """Move byte-identical chunk files of different styles to shared_dir.
+
+    Args:
+        split_dirs: Split output directories (each with a result.css)
+        shared_dir: Directory of shared chunks
+
+    Returns:
+        Number of chunk files replaced by a shared one
+    """
+    by_digest: Dict[str, List[tuple]] = {}
+    for split_dir in split_dirs:
+        css_path = split_dir / "result.css"
+        if not css_path.exists():
+            continue
+        for face in parse_font_faces(css_path.read_text(encoding="utf-8")):
+            chunk_path = (split_dir / face.url).resolve()
+            if chunk_path.parent == shared_dir.resolve() or not chunk_path.is_file():
+                continue
+            digest = hashlib.sha256(chunk_path.read_bytes()).hexdigest()
+            by_digest.setdefault(digest, []).append((split_dir, face.url, chunk_path))
+
+    replaced = 0
+    for copies in by_digest.values():
+        if len({split_dir for split_dir, _, _ in copies}) < 2:
+            continue
+        for split_dir, url, chunk_path in copies:
+            shared_path = store_shared(chunk_path, shared_dir)
+            rewrite_urls(split_dir / "result.css", {url: f"../{shared_dir.name}/{shared_path.name}"})
+            replaced += 1
+    return replaced
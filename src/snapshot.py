@@ -0,0 +1,521 @@
+"""Binary snapshots of parsed source fonts for fast reloading.
+
+Decompiling the glyf/cmap/hmtx tables of a large CJK font is the fixed
+startup cost of every build. A snapshot stores exactly the pieces that
+``merge_fonts`` needs as flat little arrays:
+
+- cmap entries partitioned by glyph class (cjk, nerd, latin, ...)
+- per-glyph records: contour count, bounds, advance width, LSB and
+  offsets into the shared point/endpoint/instruction arrays
+- point coordinates, contour endpoints, point flags and instructions
+
+The file is memory-mapped on load, so any number of worker processes
+share one page-cached copy and read the arrays without copying. A
+snapshot is tied to the SHA-256 of its source font and to the CJK ranges
+used for partitioning, and is rebuilt when either changes.
+
+File layout (all integers little-endian)::
+
+    magic       8 bytes   b"JLNMSNP1"
+    header_len  8 bytes   length of the JSON header
+    header      JSON      metadata and section table
+    sections    8-byte aligned raw arrays
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from fontTools.misc.roundTools import otRound
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables import ttProgram
+from fontTools.ttLib.tables._g_l_y_f import Glyph, GlyphCoordinates
+
+from .config import FontConfig
+from .utils import classify_codepoint, file_sha256
+
+SNAPSHOT_MAGIC = b"JLNMSNP1"
+SNAPSHOT_SUFFIX = ".snapshot"
+# Bumped whenever the header or section layout changes
+SNAPSHOT_VERSION = 2
+
+# Per-glyph record fields (int32 each)
+GLYPH_FIELDS = (
+    "numberOfContours",
+    "xMin",
+    "yMin",
+    "xMax",
+    "yMax",
+    "advance",
+    "lsb",
+    "point_start",
+    "point_count",
+    "endpt_start",
+    "instr_start",
+    "instr_len",
+)
+GLYPH_RECORD_SIZE = len(GLYPH_FIELDS)
+
+# OS/2 fields needed by merge_os2_ranges
+OS2_FIELDS = (
+    "ulUnicodeRange1",
+    "ulUnicodeRange2",
+    "ulUnicodeRange3",
+    "ulUnicodeRange4",
+    "ulCodePageRange1",
+    "ulCodePageRange2",
+)
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot is malformed or stale."""
+
+
+def snapshot_path_for(font_path: Union[str, Path], snapshot_dir: Union[str, Path]) -> Path:
+    """Get the snapshot file path for a source font.
+
+    Args:
+        font_path: Path to the source font
+        snapshot_dir: Directory holding snapshots
+
+    Returns:
+        Snapshot file path
+    """
+    return Path(snapshot_dir) / f"{Path(font_path).stem}{SNAPSHOT_SUFFIX}"
+
+
+def is_snapshot(source) -> bool:
+    """Check if a CN font source refers to a snapshot instead of a font file."""
+    return isinstance(source, FontSnapshot) or str(source).endswith(SNAPSHOT_SUFFIX)
+
+
+def flatten_composite(glyph: Glyph, glyf) -> Glyph:
+    """Get a simple glyph with the outline of a composite glyph.
+
+    Components are resolved with their offsets and transforms and the
+    points rounded to integers; the composite's instructions are dropped.
+    Snapshots store composites this way, and ``merge_fonts`` flattens
+    the composites of plain font files the same way, so the output does
+    not depend on whether snapshots are used.
+
+    Args:
+        glyph: Composite glyph
+        glyf: glyf table holding its components
+
+    Returns:
+        Simple Glyph object (empty if the components have no contours)
+    """
+    coordinates, end_points, flags = glyph.getCoordinates(glyf)
+    flat = Glyph()
+    if not end_points:
+        return flat
+    points = [(otRound(x), otRound(y)) for x, y in coordinates]
+    flat.numberOfContours = len(end_points)
+    flat.coordinates = GlyphCoordinates(points)
+    flat.endPtsOfContours = list(end_points)
+    flat.flags = bytearray(flags)
+    flat.program = ttProgram.Program()
+    flat.program.fromBytecode(b"")
+    flat.xMin = min(x for x, _ in points)
+    flat.yMin = min(y for _, y in points)
+    flat.xMax = max(x for x, _ in points)
+    flat.yMax = max(y for _, y in points)
+    return flat
+
+
+def write_snapshot(
+    font_path: Union[str, Path],
+    snapshot_path: Union[str, Path],
+    config: FontConfig,
+) -> None:
+    """Parse a source font and write its snapshot.
+
+    Composite glyphs are flattened into simple outlines (see
+    flatten_composite) so the snapshot is self-contained and imported
+    glyphs never reference missing components.
+
+    Args:
+        font_path: Path to the source font (e.g., LXGW WenKai Mono)
+        snapshot_path: Output snapshot path
+        config: FontConfig with the CJK ranges used for cmap partitioning
+    """
+    font = TTFont(str(font_path), lazy=True)
+    glyf = font["glyf"]
+    hmtx = font["hmtx"]
+    glyph_order = font.getGlyphOrder()
+    glyph_ids = {name: gid for gid, name in enumerate(glyph_order)}
+
+    records: List[int] = []
+    coords: List[int] = []
+    endpts: List[int] = []
+    flags = bytearray()
+    instructions = bytearray()
+
+    for name in glyph_order:
+        glyph = glyf[name]
+        if glyph.isComposite():
+            glyph = flatten_composite(glyph, glyf)
+        advance, lsb = hmtx[name]
+        point_start = len(coords) // 2
+        endpt_start = len(endpts)
+        instr_start = len(instructions)
+        num_contours = 0
+        bounds = (0, 0, 0, 0)
+
+        if glyph.numberOfContours != 0:
+            glyph_coords, glyph_endpts, glyph_flags = glyph.getCoordinates(glyf)
+            if glyph_endpts:
+                num_contours = len(glyph_endpts)
+                int_coords = [(otRound(x), otRound(y)) for x, y in glyph_coords]
+                for x, y in int_coords:
+                    coords.append(x)
+                    coords.append(y)
+                endpts.extend(glyph_endpts)
+                flags.extend(glyph_flags)
+                xs = [x for x, _ in int_coords]
+                ys = [y for _, y in int_coords]
+                bounds = (min(xs), min(ys), max(xs), max(ys))
+                if hasattr(glyph, "program"):
+                    instructions.extend(glyph.program.getBytecode())
+
+        records.extend((
+            num_contours,
+            *bounds,
+            advance,
+            lsb,
+            point_start,
+            len(coords) // 2 - point_start,
+            endpt_start,
+            instr_start,
+            len(instructions) - instr_start,
+        ))
+
+    # Partition the cmap by glyph class
+    partitions: Dict[str, List[int]] = {}
+    cmap = font["cmap"].getBestCmap() or {}
+    for codepoint in sorted(cmap):
+        glyph_class = classify_codepoint(codepoint, config)
+        partitions.setdefault(glyph_class, []).extend(
+            (codepoint, glyph_ids[cmap[codepoint]])
+        )
+
+    os2 = {}
+    if "OS/2" in font:
+        os2 = {field: getattr(font["OS/2"], field, 0) for field in OS2_FIELDS}
+
+    sections = {
+        "glyphs": ("i", records),
+        "coords": ("h", coords),
+        "endpts": ("H", endpts),
+        "flags": ("B", flags),
+        "instructions": ("B", instructions),
+    }
+    for glyph_class, entries in partitions.items():
+        sections[f"cmap.{glyph_class}"] = ("i", entries)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "source_name": Path(font_path).name,
+        "source_sha256": file_sha256(font_path),
+        "cjk_ranges": [list(r) for r in config.cjk_ranges],
+        "byteorder": "little",
+        "units_per_em": font["head"].unitsPerEm,
+        "head_modified": font["head"].modified,
+        "glyph_order": glyph_order,
+        "os2": os2,
+        "cmap_classes": sorted(partitions),
+        "sections": {},
+    }
+
+    # Lay out sections after the header; the header size depends on the
+    # section offsets, so pack section data first with relative offsets
+    blobs = []
+    relative = 0
+    for section_name, (typecode, values) in sections.items():
+        blob = _pack_array(typecode, values)
+        header["sections"][section_name] = [relative, len(blob), typecode]
+        blobs.append(blob)
+        relative = _align(relative + len(blob))
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = _align(len(SNAPSHOT_MAGIC) + 8 + len(header_bytes))
+
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for blob in blobs:
+            f.write(blob)
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+    # Atomic replace so concurrent readers never see a partial snapshot
+    tmp_path.replace(snapshot_path)
+    font.close()
+
+
+def _align(offset: int, size: int = 8) -> int:
+    return (offset + size - 1) // size * size
+
+
+def _pack_array(typecode: str, values) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+class FontSnapshot:
+    """Memory-mapped view of a source font snapshot.
+
+    Mimics the small part of the TTFont interface that ``merge_fonts``
+    uses (``font["glyf"]``, ``font["hmtx"]``, ``font["cmap"]``,
+    ``font["head"]`` and ``font["OS/2"]``), so a snapshot can be used in
+    place of the CN font.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = view = memoryview(self._mmap)
+
+        if bytes(view[:8]) != SNAPSHOT_MAGIC:
+            self.close()
+            raise SnapshotError(f"Not a font snapshot: {self.path}")
+        (header_len,) = struct.unpack("<Q", view[8:16])
+        self.header = json.loads(bytes(view[16:16 + header_len]))
+        if self.header.get("version") != SNAPSHOT_VERSION:
+            self.close()
+            raise SnapshotError(f"Snapshot format is outdated: {self.path}")
+        if self.header["byteorder"] != sys.byteorder:
+            self.close()
+            raise SnapshotError(f"Snapshot byte order mismatch: {self.path}")
+
+        data_start = _align(16 + header_len)
+        self._sections: Dict[str, memoryview] = {}
+        for section_name, (offset, length, typecode) in self.header["sections"].items():
+            start = data_start + offset
+            self._sections[section_name] = view[start:start + length].cast(typecode)
+
+        self.glyph_order: List[str] = self.header["glyph_order"]
+        self._glyph_ids = {name: gid for gid, name in enumerate(self.glyph_order)}
+        self._tables = {
+            "glyf": _SnapshotGlyf(self),
+            "hmtx": _SnapshotHmtx(self),
+            "cmap": _SnapshotCmap(self),
+            "head": SimpleNamespace(
+                unitsPerEm=self.header["units_per_em"],
+                modified=self.header["head_modified"],
+            ),
+        }
+        if self.header["os2"]:
+            self._tables["OS/2"] = SimpleNamespace(**self.header["os2"])
+
+    @property
+    def source_sha256(self) -> str:
+        return self.header["source_sha256"]
+
+    @property
+    def cjk_ranges(self) -> Tuple[Tuple[int, int], ...]:
+        return tuple(tuple(r) for r in self.header["cjk_ranges"])
+
+    def __contains__(self, tag: str) -> bool:
+        return tag in self._tables
+
+    def __getitem__(self, tag: str):
+        return self._tables[tag]
+
+    def getGlyphOrder(self) -> List[str]:
+        return self.glyph_order
+
+    def glyph_record(self, glyph_name: str) -> memoryview:
+        """Get the raw int32 record for a glyph (see GLYPH_FIELDS)."""
+        gid = self._glyph_ids[glyph_name]
+        start = gid * GLYPH_RECORD_SIZE
+        return self._sections["glyphs"][start:start + GLYPH_RECORD_SIZE]
+
+    def get_cmap(self, glyph_class: str) -> Dict[int, str]:
+        """Get the cmap entries of one glyph class.
+
+        Args:
+            glyph_class: Class name as returned by classify_codepoint
+
+        Returns:
+            Dict mapping codepoint -> glyph_name
+        """
+        entries = self._sections.get(f"cmap.{glyph_class}")
+        if entries is None:
+            return {}
+        glyph_order = self.glyph_order
+        return {
+            entries[i]: glyph_order[entries[i + 1]]
+            for i in range(0, len(entries), 2)
+        }
+
+    def iter_cmap(self) -> Iterator[Tuple[int, str]]:
+        """Iterate over all (codepoint, glyph_name) entries of every class."""
+        for glyph_class in self.header["cmap_classes"]:
+            yield from self.get_cmap(glyph_class).items()
+
+    def glyph_digest(self, glyph_name: str) -> bytes:
+        """Get the SHA-256 of a glyph's outline, instructions and metrics.
+
+        Equal for the same glyph in snapshots of different source
+        versions, so unchanged glyphs keep their glyph cache entries.
+        """
+        (
+            num_contours, _, _, _, _, _, _,
+            point_start, point_count, endpt_start, instr_start, instr_len,
+        ) = record = self.glyph_record(glyph_name)
+        digest = hashlib.sha256(record[:7])
+        digest.update(self._sections["coords"][2 * point_start:2 * (point_start + point_count)])
+        digest.update(self._sections["endpts"][endpt_start:endpt_start + num_contours])
+        digest.update(self._sections["flags"][point_start:point_start + point_count])
+        digest.update(self._sections["instructions"][instr_start:instr_start + instr_len])
+        return digest.digest()
+
+    def make_glyph(self, glyph_name: str) -> Glyph:
+        """Build a fresh, expanded Glyph object from snapshot arrays."""
+        (
+            num_contours, x_min, y_min, x_max, y_max, _, _,
+            point_start, point_count, endpt_start, instr_start, instr_len,
+        ) = self.glyph_record(glyph_name)
+
+        glyph = Glyph()
+        if num_contours == 0:
+            return glyph
+
+        coords = self._sections["coords"][2 * point_start:2 * (point_start + point_count)]
+        values = iter(coords)
+        glyph.numberOfContours = num_contours
+        glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax = x_min, y_min, x_max, y_max
+        glyph.coordinates = GlyphCoordinates(zip(values, values))
+        glyph.endPtsOfContours = list(
+            self._sections["endpts"][endpt_start:endpt_start + num_contours]
+        )
+        glyph.flags = bytearray(self._sections["flags"][point_start:point_start + point_count])
+        glyph.program = ttProgram.Program()
+        glyph.program.fromBytecode(
+            bytes(self._sections["instructions"][instr_start:instr_start + instr_len])
+        )
+        return glyph
+
+    def close(self) -> None:
+        """Release the memory map and file handle."""
+        for section in getattr(self, "_sections", {}).values():
+            section.release()
+        self._sections = {}
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, "_mmap", None) is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views still exported by callers; the map is freed with them
+                pass
+            self._mmap = None
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+
+class _SnapshotGlyf:
+    """glyf-table stand-in: ``glyphs`` membership and ``[name]`` access."""
+
+    def __init__(self, snapshot: FontSnapshot):
+        self._snapshot = snapshot
+        self.glyphs = snapshot._glyph_ids
+
+    def __contains__(self, glyph_name: str) -> bool:
+        return glyph_name in self.glyphs
+
+    def __getitem__(self, glyph_name: str) -> Glyph:
+        return self._snapshot.make_glyph(glyph_name)
+
+
+class _SnapshotHmtx:
+    """hmtx-table stand-in returning (advance, lsb) tuples."""
+
+    def __init__(self, snapshot: FontSnapshot):
+        self._snapshot = snapshot
+
+    def __getitem__(self, glyph_name: str) -> Tuple[int, int]:
+        record = self._snapshot.glyph_record(glyph_name)
+        return record[5], record[6]
+
+
+class _SnapshotCmap:
+    """cmap-table stand-in exposing getBestCmap()."""
+
+    def __init__(self, snapshot: FontSnapshot):
+        self._snapshot = snapshot
+
+    def getBestCmap(self) -> Dict[int, str]:
+        return dict(self._snapshot.iter_cmap())
+
+
+def load_snapshot(
+    snapshot_path: Union[str, Path],
+    source_path: Optional[Union[str, Path]] = None,
+    config: Optional[FontConfig] = None,
+) -> FontSnapshot:
+    """Open a snapshot, optionally validating it against its source.
+
+    Args:
+        snapshot_path: Path to the snapshot file
+        source_path: Source font path; if given, its SHA-256 must match
+        config: FontConfig; if given, its CJK ranges must match
+
+    Returns:
+        FontSnapshot object
+
+    Raises:
+        SnapshotError: If the snapshot is malformed or stale
+    """
+    snapshot = FontSnapshot(snapshot_path)
+    if source_path is not None and snapshot.source_sha256 != file_sha256(source_path):
+        snapshot.close()
+        raise SnapshotError(f"Snapshot is stale (source changed): {snapshot_path}")
+    if config is not None and snapshot.cjk_ranges != tuple(config.cjk_ranges):
+        snapshot.close()
+        raise SnapshotError(f"Snapshot is stale (CJK ranges changed): {snapshot_path}")
+    return snapshot
+
+
+def ensure_snapshot(
+    font_path: Union[str, Path],
+    snapshot_dir: Union[str, Path],
+    config: FontConfig,
+) -> Path:
+    """Get a valid snapshot for a source font, (re)building it if needed.
+
+    Args:
+        font_path: Path to the source font
+        snapshot_dir: Directory holding snapshots
+        config: FontConfig object
+
+    Returns:
+        Path to the up-to-date snapshot
+    """
+    snapshot_path = snapshot_path_for(font_path, snapshot_dir)
+    if snapshot_path.exists():
+        try:
+            load_snapshot(snapshot_path, font_path, config).close()
+            print(f"  Using snapshot: {snapshot_path}")
+            return snapshot_path
+        except (SnapshotError, KeyError, ValueError) as e:
+            print(f"  Rebuilding snapshot: {e}")
+
+    print(f"  Writing snapshot: {snapshot_path}")
+    write_snapshot(font_path, snapshot_path, config)
+    return snapshot_path
@@ -0,0 +1,371 @@
+"""Web font splitting with cn-font-split for the split.py CLI and the async orchestrator.
+
+Each built TTF is split into unicode-range chunks with a result.css, and
+all.css imports them. Styles with identical CJK glyphs share their CJK
+chunks (see sharedchunks.py). fontTools-backed modules are imported
+inside the functions that need them, so importing this module stays
+cheap.
+"""
+
+import logging
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set
+
+from .config import FontConfig
+
+if TYPE_CHECKING:
+    from .sharedchunks import FontFace, ShareGroup
+
+logger = logging.getLogger(__name__)
+
+# Mapping from style key to display name for local() matching
+STYLE_DISPLAY_NAMES = {
+    "Regular": "Regular",
+    "Medium": "Medium",
+    "Italic": "Italic",
+    "MediumItalic": "Medium Italic",
+    "Bold": "Bold",
+    "BoldItalic": "Bold Italic",
+}
+
+# All supported style keys, sorted by length descending for matching
+STYLE_KEYS = ["MediumItalic", "BoldItalic", "Medium", "Italic", "Bold", "Regular"]
+
+# Progress steps of a split, in order (fonts split whole start at "split")
+SPLIT_STEPS = ("subset", "split", "css")
+
+
+def check_cn_font_split_installed() -> bool:
+    """Check if cn-font-split is installed."""
+    return shutil.which("cn-font-split") is not None
+
+
+def enhance_local_font_matching(css_path: Path, family_name: str, style_key: str) -> None:
+    """Enhance local() values in CSS for better local font matching.
+
+    Browsers may use different font names for local() matching:
+    - Family name: "JetBrainsLxgwNerdMono"
+    - Full name: "JetBrainsLxgwNerdMono Regular"
+    - PostScript name: "JetBrainsLxgwNerdMono-Regular"
+
+    This function replaces single local() with multiple local() values.
+    """
+    if not css_path.exists():
+        logger.warning(f"CSS file not found: {css_path}")
+        return
+
+    display_name = STYLE_DISPLAY_NAMES.get(style_key, "Regular")
+    # PostScript name uses hyphen, no space
+    postscript_name = f"{family_name}-{style_key}"
+    # Full name uses space
+    full_name = f"{family_name} {display_name}"
+
+    # Build replacement with multiple local() values
+    # Order: PostScript name first (most specific), then full name, then family name
+    local_values = f'local("{postscript_name}"),local("{full_name}"),local("{family_name}")'
+
+    content = css_path.read_text(encoding="utf-8")
+
+    # Replace local("FamilyName") with multiple local() values
+    # Pattern matches: local("FamilyName"),url(
+    pattern = rf'local\("{re.escape(family_name)}"\),url\('
+    replacement = f'{local_values},url('
+
+    new_content = re.sub(pattern, replacement, content)
+
+    if new_content != content:
+        css_path.write_text(new_content, encoding="utf-8")
+        logger.info(f"Enhanced local() matching in {css_path.name}")
+
+
+def split_font(
+    font_path: Path,
+    output_base_dir: Path,
+    config: FontConfig,
+    test_html: bool = True,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Path:
+    """Split a single font file using cn-font-split.
+
+    Args:
+        font_path: Path to the font file
+        output_base_dir: Base directory for output (e.g., output/split)
+        config: FontConfig object
+        test_html: Whether to generate a test HTML file
+        progress: Called with the "split" and "css" steps before they run
+
+    Returns:
+        Path to the output directory for this font
+    """
+    if not check_cn_font_split_installed():
+        raise RuntimeError(
+            "cn-font-split is not installed. Please run 'npm install -g cn-font-split' first."
+        )
+
+    font_name = font_path.stem
+    output_dir = output_base_dir / font_name
+
+    # Determine font weight and style for CSS
+    style_key = None
+    # Use pre-sorted style keys (longest first) to ensure proper matching
+    for key in STYLE_KEYS:
+        if key in font_name:
+            style_key = key
+            break
+
+    # Default values
+    font_weight = "400"
+    font_style = "normal"
+
+    if style_key:
+        if "Bold" in style_key:
+            font_weight = "700"
+        elif "Medium" in style_key:
+            font_weight = "500"
+        if "Italic" in style_key:
+            font_style = "italic"
+
+    logger.info(f"Splitting font: {font_path}")
+    logger.info(f"Output directory: {output_dir}")
+
+    cmd = [
+        "cn-font-split",
+        "run",
+        "-i", str(font_path),
+        "-o", str(output_dir),
+        "--css.fontFamily", config.family_name,
+        "--css.fontWeight", font_weight,
+        "--css.fontStyle", font_style,
+        "--css.fontDisplay", "swap",
+        "--renameOutputFont", "[index].[ext]",
+        "--testHtml", str(test_html).lower(),
+    ]
+
+    if progress is not None:
+        progress("split")
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        logger.info(f"Successfully split {font_name}")
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Failed to split {font_name}: {e.stderr}")
+        raise
+
+    # Enhance local() matching in generated CSS
+    if progress is not None:
+        progress("css")
+    css_path = output_dir / "result.css"
+    enhance_local_font_matching(css_path, config.family_name, style_key or "Regular")
+
+    return output_dir
+
+
+def generate_merged_css(split_dirs: List[Path], output_file: Path) -> None:
+    """Generate a merged CSS file that imports all font subsets.
+
+    This function reads the result.css from each split directory and creates a new
+    CSS file that imports them.
+    """
+    logger.info(f"Generating merged CSS: {output_file}")
+
+    import_statements = []
+
+    for split_dir in split_dirs:
+        css_file = split_dir / "result.css"
+        if not css_file.exists():
+            logger.warning(f"CSS file not found: {css_file}")
+            continue
+
+        font_name = split_dir.name
+        # Use relative path for import
+        import_path = f"./{font_name}/result.css"
+        import_statements.append(f'@import "{import_path}";')
+
+    output_file.write_text("\n".join(import_statements), encoding="utf-8")
+    logger.info("Merged CSS generated successfully")
+
+
+def split_shared_chunks(
+    font_path: Path,
+    codepoints: Set[int],
+    config: FontConfig,
+    shared_dir: Path,
+    progress: Optional[Callable[[str], None]] = None,
+) -> List["FontFace"]:
+    """Split the CJK codepoints a group of styles shares into shared chunks.
+
+    Args:
+        font_path: Font of the group's representative style
+        codepoints: CJK codepoints with the same glyph in every style
+        config: FontConfig object
+        shared_dir: Directory of shared chunks
+        progress: Called with each of SPLIT_STEPS before it runs
+
+    Returns:
+        FontFace objects of the shared chunks (URLs relative to a result.css)
+    """
+    from .sharedchunks import parse_font_faces, store_shared, subset_font
+
+    if progress is not None:
+        progress("subset")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cjk_font = subset_font(font_path, codepoints, Path(tmp_dir) / font_path.name)
+        split_dir = split_font(cjk_font, Path(tmp_dir) / "split", config, test_html=False, progress=progress)
+        faces = parse_font_faces((split_dir / "result.css").read_text(encoding="utf-8"))
+        for face in faces:
+            shared_path = store_shared(split_dir / face.url, shared_dir)
+            face.url = f"../{shared_dir.name}/{shared_path.name}"
+    return faces
+
+
+def split_style_font(
+    font_path: Path,
+    output_base_dir: Path,
+    config: FontConfig,
+    shared: Optional[List["FontFace"]] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Path:
+    """Split a style, without the codepoints of its shared chunks if it has any.
+
+    The shared chunks are added to its result.css with its own weight and
+    style, so every style of the group loads them from the same URL.
+
+    Args:
+        font_path: Path to the font file
+        output_base_dir: Base directory for output (e.g., output/split)
+        config: FontConfig object
+        shared: FontFace objects of the shared chunks (None splits the
+            whole font)
+        progress: Called with each of SPLIT_STEPS before it runs
+
+    Returns:
+        Path to the output directory for this font
+    """
+    if not shared:
+        return split_font(font_path, output_base_dir, config, progress=progress)
+
+    from fontTools.ttLib import TTFont
+
+    from .sharedchunks import parse_font_faces, retarget_face, subset_font
+
+    if progress is not None:
+        progress("subset")
+    covered = set().union(*(face.codepoints for face in shared))
+    font = TTFont(font_path, lazy=True)
+    codepoints = set(font.getBestCmap() or {}) - covered
+    font.close()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Same file name, so the split directory and style match the original
+        stripped = subset_font(font_path, codepoints, Path(tmp_dir) / font_path.name)
+        output_dir = split_font(stripped, output_base_dir, config, progress=progress)
+
+    css_path = output_dir / "result.css"
+    css = css_path.read_text(encoding="utf-8")
+    template = parse_font_faces(css)[0]
+    rules = [retarget_face(template, face.url, face.codepoints) for face in shared]
+    css_path.write_text(css.rstrip("\n") + "\n" + "\n".join(rules) + "\n", encoding="utf-8")
+    return output_dir
+
+
+def plan_shared_splits(font_files: List[Path], output_dir: Path, config: FontConfig) -> List["ShareGroup"]:
+    """Drop the shared chunks of earlier splits and group the styles that share chunks.
+
+    Args:
+        font_files: Built TTFs, in split order
+        output_dir: Base directory for split output (e.g., output/split/)
+        config: FontConfig object
+
+    Returns:
+        ShareGroup objects (see src/sharedchunks.py)
+    """
+    from .sharedchunks import SHARED_DIR, plan_sharing
+
+    shared_dir = output_dir / SHARED_DIR
+    # Shared chunks are content-hashed; drop those of earlier splits
+    if shared_dir.is_dir():
+        shutil.rmtree(shared_dir)
+    return plan_sharing(font_files, config)
+
+
+def log_shared_chunks(group: "ShareGroup", faces: List["FontFace"], shared_dir: Path) -> None:
+    """Log how many chunks (and bytes) a group of styles shares."""
+    size = sum((shared_dir / Path(face.url).name).stat().st_size for face in faces)
+    logger.info(
+        f"Shared {len(faces)} CJK chunks ({len(group.codepoints)} codepoints, {size / 1024:.0f} KB) "
+        f"across {', '.join(group.styles)}"
+    )
+
+
+def finish_split(split_dirs: List[Path], output_dir: Path, share_chunks: bool = True) -> None:
+    """Share the remaining byte-identical chunks and write all.css.
+
+    Args:
+        split_dirs: Split output directories, in split order
+        output_dir: Base directory for split output (e.g., output/split/)
+        share_chunks: Whether byte-identical chunks of different styles
+            are moved to the shared directory
+    """
+    if share_chunks:
+        from .sharedchunks import SHARED_DIR, dedupe_chunks
+
+        replaced = dedupe_chunks(split_dirs, output_dir / SHARED_DIR)
+        if replaced:
+            logger.info(f"Moved {replaced} byte-identical chunk files to {SHARED_DIR}/")
+
+    # Generate merged CSS
+    if split_dirs:
+        generate_merged_css(split_dirs, output_dir / "all.css")
+
+
+def split_all_fonts(
+    input_dir: Path,
+    output_dir: Path,
+    config: FontConfig,
+    share_chunks: bool = True,
+) -> None:
+    """Split all fonts in the input directory.
+
+    Args:
+        input_dir: Directory containing font files (e.g., output/)
+        output_dir: Base directory for split output (e.g., output/split/)
+        config: FontConfig object
+        share_chunks: Whether styles with identical CJK glyphs share their
+            CJK chunks (see src/sharedchunks.py)
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    font_files = sorted(input_dir.glob("*.ttf"))
+    if not font_files:
+        logger.warning(f"No .ttf files found in {input_dir}")
+        return
+
+    groups = []
+    if share_chunks:
+        from .sharedchunks import SHARED_DIR
+
+        shared_dir = output_dir / SHARED_DIR
+        groups = plan_shared_splits(font_files, output_dir, config)
+
+    font_paths = {font_file.stem: font_file for font_file in font_files}
+    shared_faces: Dict[str, List["FontFace"]] = {}
+    for group in groups:
+        try:
+            faces = split_shared_chunks(font_paths[group.styles[0]], group.codepoints, config, shared_dir)
+        except Exception as e:
+            logger.error(f"Error splitting shared chunks of {group.styles[0]}: {e}")
+            continue
+        log_shared_chunks(group, faces, shared_dir)
+        for stem in group.styles:
+            shared_faces[stem] = faces
+
+    split_dirs = []
+    for font_file in font_files:
+        try:
+            split_dirs.append(split_style_font(font_file, output_dir, config, shared_faces.get(font_file.stem)))
+        except Exception as e:
+            logger.error(f"Error processing {font_file}: {e}")
+
+    finish_split(split_dirs, output_dir, share_chunks)
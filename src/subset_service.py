@@ -0,0 +1,452 @@
+"""Asyncio HTTP service that serves per-page WOFF2 subsets of built fonts.
+
+Each built style is read once into memory. Requests name a style and a set
+of characters (text or codepoints); the subset is produced in a process
+pool so the event loop never blocks, and results are kept in a size-bounded
+LRU cache keyed by style and the hash of the normalised codepoint set.
+
+Endpoints:
+    GET  /styles                                  list of available styles
+    GET  /subset/<style>.woff2?text=...           subset for the given text
+    GET  /subset/<style>.woff2?codepoints=4E00,41 subset for codepoints (hex)
+    POST /subset/<style>.woff2                    JSON {"text": ..., "codepoints": [...]}
+    GET  /metrics                                 latency and cache metrics
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Optional, Tuple
+from urllib.parse import SplitResult, parse_qs, unquote, urlsplit
+
+from .utils import run_subsetter
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on codepoints per request to keep subsetting bounded
+MAX_CODEPOINTS = 20000
+MAX_BODY_SIZE = 1 << 20
+
+# Fonts held by each worker process: style -> TTF bytes
+_worker_fonts: Dict[str, bytes] = {}
+
+
+def check_brotli_installed() -> bool:
+    """Check if brotli (required for WOFF2 output) is installed."""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def normalise_codepoints(
+    text: Optional[str] = None,
+    codepoints: Optional[Iterable] = None,
+) -> Tuple[int, ...]:
+    """Normalise a text and/or codepoint list into a sorted codepoint tuple.
+
+    Codepoints may be ints or strings like "4E00", "U+4E00" or "0x4E00".
+    Anything else, including a non-string text, is rejected.
+
+    Args:
+        text: Characters to include
+        codepoints: Codepoints to include
+
+    Returns:
+        Sorted tuple of unique codepoints
+
+    Raises:
+        ValueError: If the input is malformed, a codepoint is invalid or too
+            many are requested
+    """
+    if text is not None and not isinstance(text, str):
+        raise ValueError("text must be a string")
+    if codepoints is not None and not isinstance(codepoints, (list, tuple)):
+        raise ValueError("codepoints must be a list")
+    result = set()
+    if text:
+        result.update(ord(ch) for ch in text)
+    for value in codepoints or ():
+        if isinstance(value, str):
+            raw = value
+            value = value.strip().upper()
+            if not value:
+                continue
+            for prefix in ("U+", "0X"):
+                if value.startswith(prefix):
+                    value = value[len(prefix):]
+            try:
+                value = int(value, 16)
+            except ValueError:
+                raise ValueError(f"Invalid codepoint: {raw!r}") from None
+        elif not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f"Invalid codepoint: {value!r}")
+        if not 0 <= value <= 0x10FFFF:
+            raise ValueError(f"Invalid codepoint: {value}")
+        result.add(value)
+    if len(result) > MAX_CODEPOINTS:
+        raise ValueError(f"Too many codepoints ({len(result)} > {MAX_CODEPOINTS})")
+    return tuple(sorted(result))
+
+
+def subset_cache_key(style: str, codepoints: Tuple[int, ...]) -> str:
+    """Get the cache key for a style and normalised codepoint set."""
+    digest = hashlib.sha256(",".join(f"{cp:X}" for cp in codepoints).encode("ascii"))
+    return f"{style}:{digest.hexdigest()}"
+
+
+class LRUCache:
+    """Byte-size-bounded LRU cache with hit/miss counters."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= len(old)
+        self._entries[key] = value
+        self.current_bytes += len(value)
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _init_worker(font_files: Dict[str, str]) -> None:
+    """Process pool initializer: load every style once per worker."""
+    for style, path in font_files.items():
+        _worker_fonts[style] = Path(path).read_bytes()
+
+
+def subset_to_woff2(font_data: bytes, codepoints: Iterable[int]) -> bytes:
+    """Subset a compiled font to the given codepoints as WOFF2.
+
+    head timestamps are kept from the source, so the same font and
+    codepoints always give the same bytes.
+
+    Args:
+        font_data: TTF bytes
+        codepoints: Codepoints to keep
+
+    Returns:
+        WOFF2 font bytes
+    """
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(BytesIO(font_data), lazy=True, recalcTimestamp=False)
+    run_subsetter(font, codepoints, flavor="woff2", layout_features=["*"])
+
+    buffer = BytesIO()
+    font.flavor = "woff2"
+    font.save(buffer)
+    font.close()
+    return buffer.getvalue()
+
+
+def subset_woff2(style: str, codepoints: Tuple[int, ...]) -> bytes:
+    """Subset a loaded style to the given codepoints as WOFF2 (worker side).
+
+    Args:
+        style: Style name loaded by the worker initializer
+        codepoints: Normalised codepoints
+
+    Returns:
+        WOFF2 font bytes
+    """
+    return subset_to_woff2(_worker_fonts[style], codepoints)
+
+
+class SubsetService:
+    """Subsetting service state: fonts, worker pool, cache and metrics."""
+
+    def __init__(
+        self,
+        font_files: Dict[str, Path],
+        cache_bytes: int = 64 << 20,
+        workers: int = 2,
+        latency_window: int = 1000,
+    ):
+        self.font_files = {style: str(path) for style, path in font_files.items()}
+        self.cache = LRUCache(cache_bytes)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.font_files,),
+        )
+        self.requests = 0
+        self.errors = 0
+        self.subsets = 0
+        self.subset_seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    async def get_subset(self, style: str, codepoints: Tuple[int, ...]) -> Tuple[bytes, str]:
+        """Get a WOFF2 subset, from cache or by subsetting in the pool.
+
+        Concurrent requests for the same key share one subsetting job.
+
+        Returns:
+            Tuple of (WOFF2 bytes, cache key)
+        """
+        if style not in self.font_files:
+            raise KeyError(style)
+        key = subset_cache_key(style, codepoints)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, key
+
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            future = loop.run_in_executor(self.executor, subset_woff2, style, codepoints)
+            self._inflight[key] = future
+            try:
+                data = await future
+            finally:
+                del self._inflight[key]
+            self.subsets += 1
+            self.subset_seconds += time.perf_counter() - start
+            self.cache.put(key, data)
+            return data, key
+        return await future, key
+
+    def metrics(self) -> dict:
+        """Get latency and cache metrics."""
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache": {
+                "entries": len(self.cache),
+                "bytes": self.cache.current_bytes,
+                "max_bytes": self.cache.max_bytes,
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "hit_rate": round(self.cache.hit_rate, 4),
+                "evictions": self.cache.evictions,
+            },
+            "subsets": {
+                "count": self.subsets,
+                "mean_ms": round(self.subset_seconds / self.subsets * 1000, 3) if self.subsets else 0.0,
+            },
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": percentile(1.0),
+                "window": len(latencies),
+            },
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve HTTP/1.1 requests on one connection (keep-alive aware)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Bad request line"})
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                content_length = headers.get("content-length", "0") or "0"
+                if not (content_length.isascii() and content_length.isdigit()):
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"})
+                    break
+                length = int(content_length)
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {"error": "Request body too large"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version == "HTTP/1.1"
+                )
+                await self._dispatch(writer, method, target, headers, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # StreamReader.readline: request or header line over the stream limit
+            await self._respond(writer, 400, {"error": "Request line or header too long"})
+        finally:
+            writer.close()
+
+    async def _dispatch(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        target: str,
+        headers: Dict[str, str],
+        body: bytes,
+        keep_alive: bool,
+    ) -> None:
+        start = time.perf_counter()
+        self.requests += 1
+        url = urlsplit(target)
+        path = unquote(url.path)
+
+        if method == "GET" and path == "/metrics":
+            await self._respond(writer, 200, self.metrics(), keep_alive=keep_alive)
+            return
+        if method == "GET" and path == "/styles":
+            await self._respond(writer, 200, {"styles": sorted(self.font_files)}, keep_alive=keep_alive)
+            return
+        if not path.startswith("/subset/") or method not in ("GET", "POST"):
+            self.errors += 1
+            await self._respond(writer, 404, {"error": "Not found"}, keep_alive=keep_alive)
+            return
+
+        # Error responses count towards latency too, so a burst of fast
+        # 400s or slow 500s shows up in the percentiles
+        try:
+            await self._serve_subset(writer, method, url, path, headers, body, keep_alive)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    async def _serve_subset(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        url: SplitResult,
+        path: str,
+        headers: Dict[str, str],
+        body: bytes,
+        keep_alive: bool,
+    ) -> None:
+        style = path[len("/subset/"):]
+        if style.endswith(".woff2"):
+            style = style[:-len(".woff2")]
+
+        try:
+            if method == "POST":
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("Request body must be a JSON object")
+                text = payload.get("text")
+                codepoints = payload.get("codepoints")
+            else:
+                query = parse_qs(url.query)
+                text = "".join(query.get("text", []))
+                codepoints = ",".join(query.get("codepoints", [])).split(",")
+            normalised = normalise_codepoints(text, codepoints)
+            if not normalised:
+                raise ValueError("No characters requested")
+            data, key = await self.get_subset(style, normalised)
+        except KeyError:
+            self.errors += 1
+            await self._respond(writer, 404, {"error": f"Unknown style: {style}"}, keep_alive=keep_alive)
+            return
+        except ValueError as e:
+            self.errors += 1
+            await self._respond(writer, 400, {"error": str(e)}, keep_alive=keep_alive)
+            return
+        except Exception as e:
+            self.errors += 1
+            logger.exception("Subsetting failed")
+            await self._respond(writer, 500, {"error": str(e)}, keep_alive=keep_alive)
+            return
+
+        etag = f'"{key.split(":", 1)[1][:32]}"'
+        if headers.get("if-none-match") == etag:
+            await self._respond(writer, 304, b"", keep_alive=keep_alive, extra_headers={"ETag": etag})
+        else:
+            await self._respond(
+                writer,
+                200,
+                data,
+                content_type="font/woff2",
+                keep_alive=keep_alive,
+                extra_headers={"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"},
+            )
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload,
+        content_type: str = "application/json",
+        keep_alive: bool = False,
+        extra_headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        reasons = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+                   413: "Payload Too Large", 500: "Internal Server Error"}
+        if isinstance(payload, (dict, list)):
+            payload = json.dumps(payload, indent=2).encode("utf-8")
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(len(payload)),
+            "Access-Control-Allow-Origin": "*",
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + payload)
+        await writer.drain()
+
+
+async def serve(service: SubsetService, host: str, port: int) -> None:
+    """Run the HTTP server until cancelled."""
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    logger.info(f"Serving font subsets on {addresses}")
+    async with server:
+        await server.serve_forever()
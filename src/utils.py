@@ -1,8 +1,20 @@
 """Utility functions for font manipulation."""
 
-from typing import List, Tuple, Optional
+from __future__ import annotations
 
-from fontTools.ttLib import TTFont
+import hashlib
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, List, Tuple, Optional, Union
+
+from .config import FontConfig
+
+# Only needed for annotations; keeps this module (and the plan/manifest
+# code that uses it) free of the fontTools import cost
+if TYPE_CHECKING:
+    from fontTools.ttLib import TTFont
 
 
 def set_font_name(
@@ -128,6 +140,141 @@ def update_font_names(
     set_font_name(font, style_name, 17, mac=False, lang_id=cn_lang_id)
 
 
+def set_font_revision(font: TTFont, version: str) -> None:
+    """Set head.fontRevision from a version string like "1.3".
+
+    Args:
+        font: TTFont object
+        version: Version string; leading "Version " and suffixes are ignored
+    """
+    match = re.search(r"\d+(\.\d+)?", version)
+    if match:
+        font["head"].fontRevision = float(match.group(0))
+
+
+def set_reproducible_timestamp(font: TTFont) -> None:
+    """Pin head timestamps so saving the same font twice gives identical bytes.
+
+    If SOURCE_DATE_EPOCH is set, it is used for head.created and
+    head.modified; otherwise the existing (source-derived) values are kept.
+    Either way fontTools is told not to stamp the current time on save.
+
+    Args:
+        font: TTFont object
+    """
+    font.recalcTimestamp = False
+    source_date_epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if source_date_epoch:
+        from fontTools.misc.timeTools import epoch_diff
+
+        # head timestamps count seconds since 1904-01-01
+        timestamp = int(source_date_epoch) - epoch_diff
+        font["head"].created = timestamp
+        font["head"].modified = timestamp
+
+
+def compile_for_measuring(font: TTFont, reorder_tables: bool = False) -> bytes:
+    """Compile a font to memory, leaving it as it was for the final save.
+
+    ``TTFont.save`` changes the font it compiles: it recalculates glyph
+    bounds and head.modified, loads the tables other tables need while
+    compiling, and appends the names of new glyphs to a format 2 post
+    table in the current glyph order. Measuring a font and then
+    reordering its glyphs would make the final save differ from a build
+    that never measured, so all of this is undone.
+
+    Args:
+        font: TTFont object
+        reorder_tables: Write tables in the recommended order
+
+    Returns:
+        Compiled font bytes
+    """
+    from io import BytesIO
+
+    loaded = [tag for tag in font.keys() if font.isLoaded(tag)]
+    post = font["post"] if "post" in loaded and font["post"].formatType == 2.0 else None
+    extra_names = post.extraNames if post is not None else None
+    recalc = (font.recalcBBoxes, font.recalcTimestamp)
+    font.recalcBBoxes = font.recalcTimestamp = False
+    buffer = BytesIO()
+    try:
+        font.save(buffer, reorderTables=reorder_tables)
+    finally:
+        font.recalcBBoxes, font.recalcTimestamp = recalc
+        if post is not None:
+            post.extraNames = extra_names
+        # Tables loaded while compiling are read again from the source when needed
+        if font.reader is not None:
+            for tag in list(font.tables):
+                if tag not in loaded and tag in font.reader:
+                    del font.tables[tag]
+    return buffer.getvalue()
+
+
+def run_subsetter(font: TTFont, unicodes: Iterable[int], **options: Any) -> None:
+    """Subset a font in place to some codepoints with the fontTools subsetter.
+
+    Every name ID and the .notdef outline are kept, and the FontForge
+    private data table (PfEd), which the subsetter cannot subset, is
+    dropped instead of warning on every call.
+
+    Args:
+        font: TTFont object
+        unicodes: Codepoints to keep
+        options: Further subsetter options (e.g. layout_features=["*"])
+    """
+    # Imported here: most builds never subset
+    from fontTools import subset
+
+    subset_options = subset.Options(notdef_outline=True, name_IDs=["*"])
+    subset_options.set(**options)
+    subset_options.drop_tables += ["PfEd"]
+    subsetter = subset.Subsetter(subset_options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+
+
+def apply_style_names(
+    font: TTFont,
+    config: FontConfig,
+    style: str,
+    display_name: str,
+    metadata: dict,
+) -> str:
+    """Apply family/style names, metadata and version from config to a font.
+
+    Only the name and head tables are touched.
+
+    Args:
+        font: TTFont object
+        config: FontConfig object
+        style: Font style (Regular, Medium, Italic, MediumItalic)
+        display_name: Display name for the style in font metadata
+        metadata: Font metadata dict (author, copyright, description, url, license, license_url)
+
+    Returns:
+        PostScript name of the font
+    """
+    postscript_name = f"{config.family_name_compact}-{style}"
+    update_font_names(
+        font=font,
+        family_name=config.family_name,
+        style_name=display_name,
+        full_name=f"{config.family_name} {display_name}",
+        postscript_name=postscript_name,
+        version_str=f"Version {config.version}",
+        author=metadata.get("author", ""),
+        copyright_str=metadata.get("copyright", ""),
+        description=metadata.get("description", ""),
+        url=metadata.get("url", ""),
+        license_desc=metadata.get("license", ""),
+        license_url=metadata.get("license_url", ""),
+    )
+    set_font_revision(font, config.version)
+    return postscript_name
+
+
 def merge_os2_ranges(target_font: TTFont, source_font: TTFont) -> None:
     """Merge OS/2 table ranges (Unicode ranges and Code Page ranges).
 
@@ -211,3 +358,61 @@ def verify_glyph_width(
         f"Found {len(unexpected)} glyphs with unexpected widths "
         f"(expected {expected_widths}):\n{sample_str}"
     )
+
+
+def classify_codepoint(codepoint: int, config: FontConfig) -> str:
+    """Classify a Unicode codepoint into the glyph class it is built from.
+
+    Args:
+        codepoint: Unicode codepoint
+        config: FontConfig with CJK, NerdFont and Powerline ranges
+
+    Returns:
+        One of "cjk", "powerline", "nerd", "latin" or "other"
+    """
+    if is_cjk_codepoint(codepoint, config.cjk_ranges):
+        return "cjk"
+    if config.powerline_range[0] <= codepoint <= config.powerline_range[1]:
+        return "powerline"
+    for start, end in config.nerd_ranges:
+        if start <= codepoint <= end:
+            return "nerd"
+    # Basic Latin through IPA Extensions, plus Latin Extended Additional
+    if codepoint < 0x0250 or 0x1E00 <= codepoint <= 0x1EFF:
+        return "latin"
+    return "other"
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    """Compute the SHA-256 hex digest of a file.
+
+    Args:
+        path: File path
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_file_atomic(path: Path, data: bytes) -> None:
+    """Write a file through a temporary file and ``os.replace``.
+
+    Readers see the old file or the new one, never a partial write. The
+    temporary name is unique, so processes writing the same output (e.g.
+    queue workers on different hosts) do not share a temporary file.
+
+    Args:
+        path: File to write
+        data: File contents
+    """
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
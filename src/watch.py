@@ -0,0 +1,180 @@
+"""Watch mode: detect config/font changes and plan minimal rebuilds.
+
+Changes are classified per style into one of two rebuild levels:
+
+- ``REBUILD_FULL``: re-run the whole pipeline (merge, icons, centring, names)
+- ``REBUILD_NAMES``: only rewrite name tables on the already-built font
+
+Polling file modification times keeps this dependency-free.
+"""
+
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from .plan import METADATA_KEYS, BuildPlan
+
+REBUILD_FULL = "full"
+REBUILD_NAMES = "names"
+
+# Flattened config keys that never require a rebuild
+IGNORED_KEYS = {
+    "build.parallel",
+    "build.snapshot_dir",
+    "build.checkpoint_dir",
+    "build.checkpoint_after",
+    "build.pipeline",
+    "build.max_inflight",
+    "build.previews",
+    "build.ttc",
+    "build.glyph_cache_dir",
+}
+
+# Flattened config keys that only affect name tables
+NAME_KEYS = {f"font.{key}" for key in METADATA_KEYS} | {"font.version"}
+
+
+def flatten_config(yaml_config: Any, prefix: str = "") -> Dict[str, Any]:
+    """Flatten a nested config dict into dotted keys.
+
+    Args:
+        yaml_config: Configuration dictionary (or leaf value)
+        prefix: Key prefix for nested values
+
+    Returns:
+        Dict mapping dotted key -> leaf value
+    """
+    if not isinstance(yaml_config, dict):
+        return {prefix: yaml_config}
+    flat = {}
+    for key, value in yaml_config.items():
+        child = f"{prefix}.{key}" if prefix else str(key)
+        flat.update(flatten_config(value, child))
+    return flat
+
+
+def changed_config_keys(old_config: Dict[str, Any], new_config: Dict[str, Any]) -> Set[str]:
+    """Get the dotted keys whose values differ between two configs."""
+    old_flat = flatten_config(old_config)
+    new_flat = flatten_config(new_config)
+    return {
+        key for key in old_flat.keys() | new_flat.keys()
+        if old_flat.get(key) != new_flat.get(key)
+    }
+
+
+def plan_rebuild(
+    changed_keys: Iterable[str],
+    changed_files: Iterable[Path],
+    old_plan: Optional[BuildPlan],
+    new_plan: BuildPlan,
+) -> Dict[str, str]:
+    """Decide which styles need rebuilding, and how much.
+
+    Args:
+        changed_keys: Dotted config keys that changed
+        changed_files: Source font files that changed
+        old_plan: Plan of the previous build (None for the first build)
+        new_plan: Plan resolved from the current config
+
+    Returns:
+        Dict mapping style -> REBUILD_FULL or REBUILD_NAMES
+    """
+    rebuild: Dict[str, str] = {}
+    all_styles = [s.style for s in new_plan.styles]
+    old_styles = {s.style for s in old_plan.styles} if old_plan else set()
+
+    def mark(styles: Iterable[str], level: str) -> None:
+        for style in styles:
+            if rebuild.get(style) != REBUILD_FULL:
+                rebuild[style] = level
+
+    for key in changed_keys:
+        if key in IGNORED_KEYS or key == "build.styles":
+            continue
+        if key in NAME_KEYS:
+            mark(all_styles, REBUILD_NAMES)
+        elif key.startswith("styles."):
+            style = key.split(".")[1]
+            if style in all_styles:
+                level = REBUILD_NAMES if key.endswith(".display_name") else REBUILD_FULL
+                mark([style], level)
+        else:
+            # Widths, visual scale, family name, directories: everything
+            mark(all_styles, REBUILD_FULL)
+
+    changed_files = {Path(p) for p in changed_files}
+    # Companion layout: CJK-only fonts whose sources changed
+    changed_cjk = {
+        cjk_plan.style
+        for cjk_plan in new_plan.cjk_fonts
+        if {cjk_plan.en_font_path, cjk_plan.cn_font_path} & changed_files
+    }
+    for style_plan in new_plan.styles:
+        if {style_plan.en_font_path, style_plan.cn_font_path} & changed_files:
+            mark([style_plan.style], REBUILD_FULL)
+        if style_plan.cjk_style and (
+            style_plan.cjk_style in changed_cjk or not new_plan.cjk_path(style_plan.cjk_style).exists()
+        ):
+            mark([style_plan.style], REBUILD_FULL)
+        # Newly selected styles and missing outputs need a full build
+        if style_plan.style not in old_styles and old_plan is not None:
+            mark([style_plan.style], REBUILD_FULL)
+        if not new_plan.output_path(style_plan.style).exists():
+            mark([style_plan.style], REBUILD_FULL)
+
+    return rebuild
+
+
+def source_files(plan: BuildPlan) -> Set[Path]:
+    """Get all source font files used by a plan."""
+    files = set()
+    for style_plan in plan.styles + plan.cjk_fonts:
+        files.add(style_plan.en_font_path)
+        files.add(style_plan.cn_font_path)
+    return files
+
+
+def file_mtimes(paths: Iterable[Path]) -> Dict[Path, int]:
+    """Get modification times (ns) of files, -1 for missing files."""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtimes[path] = -1
+    return mtimes
+
+
+def poll_changes(
+    paths: Callable[[], Iterable[Path]],
+    on_change: Callable[[Set[Path]], None],
+    interval: float = 1.0,
+) -> None:
+    """Poll files for modification and call on_change with the changed set.
+
+    Runs until interrupted with Ctrl+C.
+
+    Args:
+        paths: Callable returning the current set of paths to watch
+        on_change: Callback receiving the set of changed paths
+        interval: Polling interval in seconds
+    """
+    mtimes = file_mtimes(paths())
+    try:
+        while True:
+            time.sleep(interval)
+            current = file_mtimes(paths())
+            changed = {
+                path for path in current.keys() | mtimes.keys()
+                if current.get(path) != mtimes.get(path)
+            }
+            mtimes = current
+            if changed:
+                on_change(changed)
+                # Start tracking files added by the change without
+                # reporting them as changed on the next poll
+                for path, mtime in file_mtimes(paths()).items():
+                    mtimes.setdefault(path, mtime)
+    except KeyboardInterrupt:
+        print("\nWatch stopped")